@@ -0,0 +1,245 @@
+"""
+Contrôle d'admission : files séparées pour les requêtes lourdes et légères.
+
+Des uploads volumineux simultanés occupent les threads, les connexions du
+pool et la bande passante disque ; sans limite, les lectures ordinaires
+attendent derrière eux. Chaque requête est classée dans une voie :
+- heavy : uploads, soumissions complètes, import et export en masse ;
+- light : tout le reste (lectures, petites écritures JSON) ;
+- les sondes, /metrics et le flux /changes/stream (connexion longue) ne
+  sont jamais retenus.
+
+Chaque voie a sa limite de requêtes simultanées et sa file d'attente (FIFO,
+délai maximal). Les corps de requête annoncés (Content-Length) sont en outre
+réservés sur un budget d'octets en cours par worker. Une requête en attente
+n'est pas lue : le client est ralenti par TCP. File pleine ou délai dépassé :
+429 avec Retry-After, estimé à partir de la durée moyenne des requêtes de la
+voie.
+
+Les limites sont propres à chaque worker (voir WEB_CONCURRENCY).
+"""
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from collections import deque
+
+from app.metrics import (
+    admission_bytes_in_flight,
+    admission_in_flight,
+    admission_queued,
+    admission_rejected_total,
+    admission_wait_seconds,
+)
+
+ADMISSION_HEAVY_LIMIT = int(os.getenv("ADMISSION_HEAVY_LIMIT", "4"))
+ADMISSION_HEAVY_QUEUE = int(os.getenv("ADMISSION_HEAVY_QUEUE", "16"))
+ADMISSION_HEAVY_TIMEOUT = float(os.getenv("ADMISSION_HEAVY_TIMEOUT", "30"))
+# Sous les 40 threads du pool d'AnyIO partagé par les routes synchrones
+ADMISSION_LIGHT_LIMIT = int(os.getenv("ADMISSION_LIGHT_LIMIT", "32"))
+ADMISSION_LIGHT_QUEUE = int(os.getenv("ADMISSION_LIGHT_QUEUE", "256"))
+ADMISSION_LIGHT_TIMEOUT = float(os.getenv("ADMISSION_LIGHT_TIMEOUT", "10"))
+ADMISSION_MAX_BYTES_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_BYTES_IN_FLIGHT", str(256 * 1024 * 1024)))
+# Réservation d'un upload sans Content-Length (transfert chunked)
+ADMISSION_UNKNOWN_LENGTH_BYTES = int(os.getenv("ADMISSION_UNKNOWN_LENGTH_BYTES", str(64 * 1024 * 1024)))
+
+EXEMPT_PATHS = {"/livez", "/readyz", "/health", "/metrics", "/changes/stream"}
+HEAVY_RULES = (
+    ({"POST", "PUT"}, re.compile(r"^/(donnees/upload|files/upload|complete|import|storage)(/|$)")),
+    ({"GET"}, re.compile(r"^/(export/?$|articles/\d+/export$)")),
+)
+BODY_METHODS = {"POST", "PUT", "PATCH"}
+
+
+def classify(method, path):
+    """Voie d'une requête : "heavy", "light", ou None si exemptée."""
+    if path in EXEMPT_PATHS:
+        return None
+    for methods, pattern in HEAVY_RULES:
+        if method in methods and pattern.match(path):
+            return "heavy"
+    return "light"
+
+
+class Rejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Lane:
+    """Voie d'admission : limite de concurrence et file FIFO bornée."""
+
+    def __init__(self, name, limit, queue_size, timeout, initial_service):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.waiters = deque()  # (future, octets)
+        # Durée moyenne de service (moyenne mobile exponentielle, secondes)
+        self.avg_service = initial_service
+
+    def observe(self, elapsed):
+        self.avg_service += 0.2 * (elapsed - self.avg_service)
+
+    def retry_after(self):
+        """Délai estimé avant qu'une place se libère (secondes, entre 1 et 60)."""
+        backlog = (len(self.waiters) + 1) / max(self.limit, 1)
+        return min(60, max(1, math.ceil(self.avg_service * backlog)))
+
+
+class AdmissionController:
+    """
+    Attribue les places des voies et le budget d'octets.
+
+    Toutes les opérations s'exécutent dans la boucle asyncio du worker :
+    aucun verrou n'est nécessaire.
+    """
+
+    def __init__(self, lanes, max_bytes):
+        self.lanes = {lane.name: lane for lane in lanes}
+        self.max_bytes = max_bytes
+        self.bytes_in_flight = 0
+
+    def _fits(self, lane, size):
+        if lane.active >= lane.limit:
+            return False
+        # Un corps plus grand que le budget passe seul plutôt que jamais
+        return self.bytes_in_flight + size <= self.max_bytes or self.bytes_in_flight == 0
+
+    def _grant(self, lane, size):
+        lane.active += 1
+        self.bytes_in_flight += size
+        admission_in_flight.set(lane.active, lane.name)
+        admission_bytes_in_flight.set(self.bytes_in_flight)
+
+    def _wake(self):
+        # FIFO par voie : le premier en attente bloque les suivants
+        for lane in self.lanes.values():
+            while lane.waiters:
+                future, size = lane.waiters[0]
+                if future.done():  # délai dépassé entre-temps
+                    lane.waiters.popleft()
+                    continue
+                if not self._fits(lane, size):
+                    break
+                lane.waiters.popleft()
+                self._grant(lane, size)
+                future.set_result(None)
+            admission_queued.set(len(lane.waiters), lane.name)
+
+    async def acquire(self, lane_name, size):
+        """Réserve une place (attend au plus lane.timeout) ; lève Rejected sinon."""
+        lane = self.lanes[lane_name]
+        if not lane.waiters and self._fits(lane, size):
+            self._grant(lane, size)
+            admission_wait_seconds.observe(0.0, lane.name)
+            return
+        if len(lane.waiters) >= lane.queue_size:
+            admission_rejected_total.inc(1, lane.name, "queue_full")
+            raise Rejected("queue_full", lane.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        lane.waiters.append((future, size))
+        admission_queued.set(len(lane.waiters), lane.name)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait({future}, timeout=lane.timeout)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Place accordée au moment où la requête est annulée
+                self._return(lane, size)
+            raise
+        finally:
+            if not future.done():
+                # Délai dépassé ou client parti : on libère la file
+                future.cancel()
+                try:
+                    lane.waiters.remove((future, size))
+                except ValueError:
+                    pass
+                admission_queued.set(len(lane.waiters), lane.name)
+        admission_wait_seconds.observe(time.perf_counter() - started, lane.name)
+        if future.cancelled():
+            admission_rejected_total.inc(1, lane.name, "timeout")
+            raise Rejected("timeout", lane.retry_after())
+
+    def _return(self, lane, size):
+        lane.active -= 1
+        self.bytes_in_flight -= size
+        admission_in_flight.set(lane.active, lane.name)
+        admission_bytes_in_flight.set(self.bytes_in_flight)
+        self._wake()
+
+    def release(self, lane_name, size, elapsed):
+        lane = self.lanes[lane_name]
+        lane.observe(elapsed)
+        self._return(lane, size)
+
+
+def _request_size(scope, lane):
+    """Octets à réserver : Content-Length, ou forfait pour un upload de taille inconnue."""
+    if scope["method"] not in BODY_METHODS:
+        return 0
+    unknown = ADMISSION_UNKNOWN_LENGTH_BYTES if lane == "heavy" else 0
+    for key, value in scope["headers"]:
+        if key == b"content-length":
+            try:
+                return max(int(value), 0)
+            except ValueError:
+                return unknown
+    return unknown
+
+
+async def _send_rejection(send, rejection):
+    body = json.dumps({
+        "detail": "Serveur saturé, réessayez plus tard",
+        "reason": rejection.reason,
+    }).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(rejection.retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI : admission par voie, 429 + Retry-After en cas de saturation."""
+
+    def __init__(self, app):
+        self.app = app
+        self.controller = AdmissionController(
+            [
+                Lane("heavy", ADMISSION_HEAVY_LIMIT, ADMISSION_HEAVY_QUEUE, ADMISSION_HEAVY_TIMEOUT, 5.0),
+                Lane("light", ADMISSION_LIGHT_LIMIT, ADMISSION_LIGHT_QUEUE, ADMISSION_LIGHT_TIMEOUT, 0.1),
+            ],
+            ADMISSION_MAX_BYTES_IN_FLIGHT,
+        )
+
+    async def __call__(self, scope, receive, send):
+        lane = classify(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        size = _request_size(scope, lane)
+        try:
+            await self.controller.acquire(lane, size)
+        except Rejected as rejection:
+            await _send_rejection(send, rejection)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(lane, size, time.perf_counter() - started)
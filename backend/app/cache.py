@@ -0,0 +1,422 @@
+"""
+Cache des réponses GET, avec ETag et invalidation par génération.
+
+- Les réponses JSON des routes de lecture sont conservées en mémoire (LRU
+  borné en octets) et, si CACHE_DIR est défini, sur disque (second niveau
+  partagé par les workers). Une entrée servie depuis le cache ne touche pas
+  la base de données.
+- Invalidation : un compteur de génération est incrémenté à chaque requête
+  d'écriture (POST/PUT/PATCH/DELETE, hors POST en lecture seule : READ_ONLY_POSTS). Une entrée n'est valide que pour la
+  génération lue au début de la requête qui l'a produite. Le compteur est
+  stocké dans un fichier partagé par les workers d'un même hôte.
+- Les ressources immuables (Donnee et son fichier) ne dépendent pas de la
+  génération et sont servies avec Cache-Control: immutable.
+- ETag fort (empreinte du corps) et GET conditionnel : If-None-Match -> 304.
+- Les réponses lues sur une réplique (app/replicas.py, scope[READ_REPLICA_SCOPE])
+  ne sont pas conservées : une réplique en retard servirait sinon un état
+  antérieur sous la génération courante.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+
+from app.metrics import record_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows : incréments non verrouillés
+    fcntl = None
+
+CACHE_DIR = os.getenv("CACHE_DIR")
+# Clé du scope ASGI posée par get_read_db quand la session lit une réplique
+READ_REPLICA_SCOPE = "rdh.read_replica"
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_MAX_ENTRY_BYTES = int(os.getenv("CACHE_MAX_ENTRY_BYTES", str(4 * 1024 * 1024)))
+CACHE_DISK_MAX_BYTES = int(os.getenv("CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# (motif de chemin, Cache-Control) ; première règle applicable, None = pas de cache
+CACHE_RULES = (
+    (re.compile(r"^/articles/\d+/export$"), None),
+    (re.compile(r"^/donnees/\d+/file$"), None),  # ETag et Cache-Control posés par la route
+    (re.compile(r"^/donnees/\d+/download-url$"), None),  # URL signée, expire
+    (re.compile(r"^/donnees/\d+$"), IMMUTABLE),
+    (re.compile(r"^/(articles|experiences|donnees|machines|detectors|phantoms)(/|$)"), REVALIDATE),
+)
+
+UNSAFE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+# POST de lecture seule (corps de requête volumineux) : n'invalident pas le cache
+READ_ONLY_POSTS = (
+    re.compile(r"^/donnees/similar$"),
+    re.compile(r"^/donnees/preview$"),
+    re.compile(r"^/experiences/summaries$"),
+    re.compile(r"^/donnees/upload-url/\d+$"),
+)
+
+
+def is_write(method, path) -> bool:
+    """La requête peut-elle modifier la base (invalidation du cache) ?"""
+    if method not in UNSAFE_METHODS:
+        return False
+    return not (method == "POST" and any(pattern.match(path) for pattern in READ_ONLY_POSTS))
+
+
+def cache_policy(path):
+    """Cache-Control applicable à `path`, ou None si la réponse n'est pas mise en cache."""
+    for pattern, policy in CACHE_RULES:
+        if pattern.match(path):
+            return policy
+    return None
+
+
+def make_etag(body: bytes) -> str:
+    """ETag fort : empreinte du corps de la réponse."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag) -> bool:
+    """Compare un en-tête If-None-Match (liste ou *) à un ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+# --- Génération ---
+
+class _Generation:
+    """Compteur de génération dans un fichier (20 chiffres, lu par pread)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._pid = None
+
+    def _file(self):
+        if self._fd is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def current(self) -> int:
+        data = os.pread(self._file(), 20, 0)
+        return int(data) if data.strip() else 0
+
+    def bump(self):
+        fd = self._file()
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            os.pwrite(fd, f"{self.current() + 1:020d}".encode(), 0)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+generation = _Generation(os.path.join(CACHE_DIR or tempfile.gettempdir(), "rdh-cache-generation"))
+
+
+def bump_generation():
+    """Invalide les réponses en cache (à appeler après une écriture hors HTTP, ex. import en masse)."""
+    generation.bump()
+
+
+# --- Stockage ---
+
+class CacheEntry:
+    __slots__ = ("generation", "status", "headers", "body", "etag", "route_path", "immutable")
+
+    def __init__(self, generation, status, headers, body, etag, route_path, immutable):
+        self.generation = generation
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.route_path = route_path
+        self.immutable = immutable
+
+    def is_valid(self, current_generation):
+        return self.immutable or self.generation == current_generation
+
+    def to_bytes(self):
+        header = json.dumps({
+            "generation": self.generation,
+            "status": self.status,
+            "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in self.headers],
+            "etag": self.etag,
+            "route_path": self.route_path,
+            "immutable": self.immutable,
+        }).encode()
+        return header + b"\n" + self.body
+
+    @classmethod
+    def from_bytes(cls, data):
+        header, body = data.split(b"\n", 1)
+        meta = json.loads(header)
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in meta["headers"]]
+        return cls(meta["generation"], meta["status"], headers, body, meta["etag"],
+                   meta["route_path"], meta["immutable"])
+
+
+class MemoryCache:
+    """LRU borné par la taille cumulée des corps."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.body)
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= len(entry.body)
+
+
+class DiskCache:
+    """Second niveau sur disque, partagé par les workers ; élagage des plus anciennes écritures."""
+
+    PRUNE_EVERY = 200  # écritures entre deux élagages
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return CacheEntry.from_bytes(f.read())
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set(self, key, entry):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(entry.to_bytes())
+        os.replace(tmp_path, path)
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def prune(self):
+        """Supprime les entrées les plus anciennes au-delà de max_bytes."""
+        files = []
+        with os.scandir(self.directory) as it:
+            for item in it:
+                try:
+                    stat = item.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, item.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+class _CachedRoute:
+    """Route minimale (gabarit de chemin) pour les métriques des réponses servies du cache."""
+    __slots__ = ("path",)
+
+    def __init__(self, path):
+        self.path = path
+
+
+# --- Middleware ---
+
+class ResponseCacheMiddleware:
+    """Middleware ASGI : cache des GET, ETag / 304, invalidation sur écriture."""
+
+    def __init__(self, app):
+        self.app = app
+        self.memory = MemoryCache(CACHE_MAX_BYTES)
+        self.disk = DiskCache(os.path.join(CACHE_DIR, "responses"), CACHE_DISK_MAX_BYTES) if CACHE_DIR else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        if is_write(method, scope["path"]):
+            await self._call_write(scope, receive, send)
+            return
+
+        policy = cache_policy(scope["path"]) if method == "GET" else None
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = None
+        for key, value in scope["headers"]:
+            if key == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+                break
+
+        cache_key = scope["path"] + "?" + scope["query_string"].decode("latin-1")
+        current = generation.current()
+        entry = await self._lookup(cache_key, current)
+        record_cache("response", entry is not None)
+        if entry is not None:
+            scope["route"] = _CachedRoute(entry.route_path)
+            await self._send_entry(send, entry, policy, if_none_match)
+            return
+
+        await self._call_and_store(scope, receive, send, cache_key, current, policy, if_none_match)
+
+    async def _call_write(self, scope, receive, send):
+        """Écriture : génération incrémentée avant l'appel et à l'envoi de la réponse.
+
+        Le premier incrément écarte les entrées produites avant la requête ; le
+        second, une fois la transaction validée, celles qu'un GET concurrent a
+        pu produire pendant l'écriture. Le client qui relit juste après sa
+        réponse (201) ne reçoit donc pas d'état antérieur, même si des
+        BackgroundTasks s'exécutent encore. Sans envoi de réponse (exception),
+        l'incrément final tient lieu de repli.
+        """
+        responded = False
+
+        async def send_wrapper(message):
+            nonlocal responded
+            if message["type"] == "http.response.start" and not responded:
+                generation.bump()
+                responded = True
+            await send(message)
+
+        generation.bump()
+        failed = True
+        try:
+            await self.app(scope, receive, send_wrapper)
+            failed = False
+        finally:
+            if failed or not responded:
+                generation.bump()
+
+    async def _lookup(self, key, current):
+        entry = self.memory.get(key)
+        if entry is not None and not entry.is_valid(current):
+            self.memory.delete(key)
+            entry = None
+        if entry is None and self.disk is not None:
+            # Un autre worker a pu produire une entrée à jour
+            entry = await run_in_threadpool(self.disk.get, key)
+            if entry is not None and not entry.is_valid(current):
+                await run_in_threadpool(self.disk.delete, key)
+                entry = None
+            if entry is not None:
+                self.memory.set(key, entry)
+        return entry
+
+    async def _send_entry(self, send, entry, policy, if_none_match):
+        if etag_matches(if_none_match, entry.etag):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", entry.etag.encode()), (b"cache-control", policy.encode())],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": entry.status, "headers": entry.headers})
+        await send({"type": "http.response.body", "body": entry.body})
+
+    async def _call_and_store(self, scope, receive, send, cache_key, current, policy, if_none_match):
+        start_message = None
+        chunks = []
+        size = 0
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, size, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            # http.response.body
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if message.get("more_body", False):
+                if size > CACHE_MAX_ENTRY_BYTES:
+                    # Réponse trop volumineuse : transmise telle quelle, sans ETag
+                    passthrough = True
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+                return
+            await self._finish(send, start_message, b"".join(chunks), scope, cache_key, current,
+                               policy, if_none_match)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _finish(self, send, start_message, body, scope, cache_key, current, policy, if_none_match):
+        status = start_message["status"]
+        if status != 200:
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        etag = make_etag(body)
+        headers = [
+            (k, v) for k, v in start_message.get("headers", [])
+            if k.lower() not in (b"etag", b"cache-control")
+        ]
+        headers += [(b"etag", etag.encode()), (b"cache-control", policy.encode())]
+        route_path = getattr(scope.get("route"), "path", "unmatched")
+        entry = CacheEntry(current, status, headers, body, etag, route_path, policy == IMMUTABLE)
+
+        if len(body) <= CACHE_MAX_ENTRY_BYTES and not scope.get(READ_REPLICA_SCOPE):
+            self.memory.set(cache_key, entry)
+            if self.disk is not None:
+                await run_in_threadpool(self.disk.set, cache_key, entry)
+
+        await self._send_entry(send, entry, policy, if_none_match)
@@ -0,0 +1,109 @@
+"""
+Cycle de vie d'un worker : arrêt progressif et sondes de disponibilité.
+
+- Sur SIGTERM/SIGINT, le worker passe en mode "drain" avant que le serveur
+  (uvicorn) ne cesse d'accepter des connexions : /readyz répond 503 pour que
+  le répartiteur n'envoie plus de trafic, et les requêtes en cours (uploads
+  compris) se terminent dans la limite de graceful_timeout (gunicorn.conf.py).
+- /livez : le processus répond (aucune dépendance externe).
+- /readyz : base joignable (SELECT 1), pool de connexions non saturé,
+  espace libre suffisant sur le volume d'upload, worker pas en drain.
+"""
+import logging
+import os
+import shutil
+import signal
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.metrics import admission_in_flight, http_requests_in_flight
+
+logger = logging.getLogger(__name__)
+
+# Espace libre minimal sur le volume d'upload pour accepter du trafic
+READINESS_MIN_FREE_BYTES = int(os.getenv("READINESS_MIN_FREE_BYTES", str(1024 * 1024 * 1024)))
+
+draining = threading.Event()
+
+
+def start_draining(signum=None):
+    """Passe le worker en drain (idempotent)."""
+    if draining.is_set():
+        return
+    draining.set()
+    logger.info(
+        "Draining worker: %s request(s) in flight, %s heavy (uploads, imports, exports)",
+        http_requests_in_flight.value(),
+        admission_in_flight.value("heavy"),
+        extra={"signal": signum},
+    )
+
+
+def install_drain_handlers():
+    """
+    Chaîne SIGTERM/SIGINT : drain d'abord, puis le gestionnaire du serveur.
+
+    À appeler au démarrage (lifespan), une fois les gestionnaires d'uvicorn
+    installés ; ne fait rien hors du thread principal.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(signum)
+
+        def handler(received, frame, previous=previous):
+            start_draining(received)
+            if callable(previous):
+                previous(received, frame)
+            elif previous == signal.SIG_DFL:
+                signal.signal(received, signal.SIG_DFL)
+                signal.raise_signal(received)
+
+        signal.signal(signum, handler)
+
+
+def _check_database(engine):
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:  # noqa: BLE001 - toute erreur rend le worker indisponible
+        return {"ok": False, "error": str(e).splitlines()[0]}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+def _check_pool(engine):
+    pool = engine.pool
+    if not callable(getattr(pool, "checkedout", None)):  # NullPool/StaticPool
+        return {"ok": True}
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    checked_out = pool.checkedout()
+    return {"ok": checked_out < capacity, "checked_out": checked_out, "capacity": capacity}
+
+
+def _check_upload_volume(upload_dir):
+    try:
+        free = shutil.disk_usage(upload_dir).free
+    except OSError as e:
+        return {"ok": False, "error": str(e)}
+    return {"ok": free >= READINESS_MIN_FREE_BYTES, "free_bytes": free,
+            "min_free_bytes": READINESS_MIN_FREE_BYTES}
+
+
+def readiness(engine, upload_dir):
+    """
+    Évalue la disponibilité du worker.
+
+    Returns:
+        (bool, dict): prêt ou non, détail de chaque vérification
+    """
+    checks = {"draining": {"ok": not draining.is_set()}}
+    if not draining.is_set():
+        checks["pool"] = _check_pool(engine)
+        # Pool saturé : inutile d'attendre une connexion pour le SELECT 1
+        if checks["pool"]["ok"]:
+            checks["database"] = _check_database(engine)
+        checks["upload_volume"] = _check_upload_volume(upload_dir)
+    return all(check["ok"] for check in checks.values()), checks
@@ -0,0 +1,107 @@
+"""
+Journalisation structurée de l'API.
+
+Les enregistrements sont mis en file (QueueHandler) par le thread qui journalise
+et écrits par un thread dédié (QueueListener) : une requête ne fait jamais
+d'écriture bloquante sur stdout. Chaque enregistrement porte l'identifiant de
+corrélation de la requête en cours (en-tête X-Request-ID).
+
+Variables d'environnement :
+    LOG_LEVEL   niveau minimal (DEBUG, INFO, WARNING...), INFO par défaut
+    LOG_FORMAT  "json" (par défaut) ou "text"
+"""
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+# Identifiant de la requête en cours, propagé aux threads du threadpool
+# (run_in_threadpool copie le contexte)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributs standards d'un LogRecord, exclus des champs additionnels (extra=...)
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Ajoute request_id à l'enregistrement, dans le thread qui journalise."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par enregistrement ; les champs passés via extra=... sont conservés."""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+                  + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging():
+    """
+    Installe le handler non bloquant sur le logger racine.
+
+    Idempotent : peut être appelé à chaque démarrage de worker.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "text":
+        stream_handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s"
+        ))
+    else:
+        stream_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+
+    # Les traces de uvicorn passent par la même file, au niveau LOG_LEVEL
+    # (le worker gunicorn leur impose sinon ses propres handlers et niveaux)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).setLevel(logging.NOTSET)
+        logging.getLogger(name).propagate = True
+    # Le log d'accès est écrit par RequestContextMiddleware (logger app.access)
+    logging.getLogger("uvicorn.access").disabled = True
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Vide la file et arrête le thread d'écriture."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,58 +1,86 @@
 # Entry point for the FastAPI
+import logging
 import os
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from app.database import engine, Base
-from app.models import (
-    article,
-    experience,
-    donnee,
-    detector,
-    machine,
-    phantom,
-    column_mapping,
-    )
-from app.routes import (
-    articles,
-    experiences,
-    files,
-    donnees,
-    detectors,
-    experience_detectors,
-    machines,
-    experience_machines,
-    phantoms,
-    experience_phantoms,
-    complete_submission,
-)
+from app.admission import AdmissionMiddleware
+from app.cache import ResponseCacheMiddleware
+from app.database import engine
+from app.lifecycle import install_drain_handlers, readiness
+from app.logging_config import configure_logging, shutdown_logging
+from app.metrics import MetricsMiddleware, instrument_engine, render as render_metrics
+from app.replicas import ConsistencyMiddleware, replica_set
+from app.routes import include_routers
+from app.signed_storage import storage_app
+from app.storage import SIGNED_PATH, UPLOAD_DIR
+from app.serialization import FastJSONResponse
+from app.tracing import RequestContextMiddleware, shutdown_tracing
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Démarrage et arrêt d'un worker.
+
+    Aucune connexion ni DDL ici : le schéma est géré par les migrations Alembic
+    (alembic upgrade head), appliquées une seule fois avant de lancer les workers.
+    Le pool de connexions s'ouvre à la première requête.
+    """
+    configure_logging()
+    started = time.perf_counter()
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    # SIGTERM : /readyz passe à 503 pendant que les requêtes en cours se terminent
+    install_drain_handlers()
+    # Surveillance des répliques de lecture en arrière-plan (READ_REPLICA_URLS)
+    replica_set.start()
+    logger.info("Startup complete in %.1f ms", (time.perf_counter() - started) * 1000)
+    yield
+    engine.dispose()
+    shutdown_tracing()
+    shutdown_logging()
 
 
-app = FastAPI(title="Dosimetry Database API")
+# Réponses JSON encodées par orjson (voir app/serialization.py)
+app = FastAPI(title="Dosimetry Database API", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # CORS configuration from environment variable
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:5173,http://localhost:8080")
 ALLOWED_ORIGINS = [origin.strip() for origin in CORS_ORIGINS.split(",")]
 
+# Jeton de cohérence des écritures (lecture de ses écritures sur les
+# répliques, voir app/replicas.py) ; sans effet si READ_REPLICA_URLS est vide
+app.add_middleware(ConsistencyMiddleware)
+
+# Admission par voie (uploads / lectures), 429 si saturé ; à l'intérieur du
+# cache pour que les réponses servies du cache ne fassent jamais la queue
+app.add_middleware(AdmissionMiddleware)
+
+# Cache des GET (ETag, 304, invalidation à chaque écriture), à l'intérieur
+# de CORS pour que les réponses servies du cache portent les en-têtes CORS
+app.add_middleware(ResponseCacheMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "ETag", "Retry-After", "Idempotent-Replayed", "X-Consistency-Token"],
 )
 
-# Creating database tables at startup
-print("🔧 Creating database tables...")
-Base.metadata.create_all(bind=engine)
-print("✅ Database tables created successfully!")
+# Latence par route, requêtes en cours, octets reçus, requêtes SQL par requête
+instrument_engine(engine)
+app.add_middleware(MetricsMiddleware)
 
-# Creating routers
-app.include_router(articles.router)
-app.include_router(experiences.router)
-app.include_router(files.router)
-app.include_router(donnees.router)
+# Identifiant de corrélation, trace des étapes et log d'accès par requête
+app.add_middleware(RequestContextMiddleware)
 
 @app.get("/")
 def root():
@@ -63,22 +91,34 @@ def health_check():
     """Health check endpoint for monitoring"""
     return {"status": "healthy", "service": "radiotherapy-api"}
 
+@app.get("/livez", include_in_schema=False)
+def liveness():
+    """Sonde de vie : le processus répond, sans dépendance externe"""
+    return {"status": "alive"}
 
-from app.routes import (
-    machines,
-    phantoms,
-    detectors,
-)
+@app.get("/readyz", include_in_schema=False)
+def readiness_probe():
+    """Sonde de disponibilité : base, pool, volume d'upload, drain (503 si indisponible)"""
+    ready, checks = readiness(engine, UPLOAD_DIR)
+    return JSONResponse(
+        {"status": "ready" if ready else "unavailable", "checks": checks},
+        status_code=200 if ready else 503,
+    )
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métriques du worker au format texte Prometheus"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# Creating routers (see app/routes/__init__.py for the list)
+include_routers(app)
 
-app.include_router(machines.router)
-app.include_router(phantoms.router)
-app.include_router(detectors.router)
-app.include_router(experience_machines.router)
-app.include_router(experience_phantoms.router)
-app.include_router(experience_detectors.router)
-app.include_router(complete_submission.router)
+# URL signées du stockage local (envoi et téléchargement directs, voir
+# app/signed_storage.py) ; avec STORAGE_BACKEND=s3 les URL pointent vers le bucket
+app.mount(SIGNED_PATH, storage_app)
 
 # Mount frontend static after API routers so API endpoints are not shadowed
 # NOTE: In development, the frontend runs on a separate dev server (npm run dev)
-# Uncomment the line below only when you have built the frontend (npm run build)
+# Uncomment the lines below only when you have built the frontend (npm run build)
+# from fastapi.staticfiles import StaticFiles
 # app.mount("/", StaticFiles(directory="../frontend/dist", html=True), name="static")
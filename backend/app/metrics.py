@@ -0,0 +1,331 @@
+"""
+Métriques de l'API au format texte Prometheus (exposées sur /metrics).
+
+- MetricsMiddleware : latence par route (gabarit de chemin, ex. /articles/{article_id}),
+  requêtes en cours, octets reçus et débit des uploads ;
+- événements SQLAlchemy : nombre et durée des requêtes SQL, au total et par requête HTTP ;
+- état du pool de connexions, lu au moment du scrape ;
+- compteurs de cache (record_cache), pour les caches applicatifs ;
+- admission : places occupées, files d'attente et refus par voie (app/admission.py).
+
+Les métriques sont propres à chaque processus worker. Le coût par requête
+se limite à quelques perf_counter et incréments sous verrou.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+# Bornes des histogrammes (secondes / octets par seconde)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERIES_PER_REQUEST_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+THROUGHPUT_BUCKETS = (1e5, 1e6, 5e6, 1e7, 5e7, 1e8, 5e8, 1e9)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, collect=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+        # collect() -> {labels: valeur}, appelé au scrape (valeurs calculées)
+        self._collect = collect
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, amount=1, *labels):
+        self.inc(-amount, *labels)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def _samples(self):
+        if self._collect is not None:
+            items = list(self._collect().items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [compteurs par borne (non cumulés) + +Inf, somme, total]
+        self._series = {}
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _samples(self):
+        with self._lock:
+            items = [(labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items()]
+        lines = []
+        names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (bound,))} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {total}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+def render():
+    """Texte d'exposition Prometheus de toutes les métriques du processus."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- HTTP ---
+
+http_requests_total = Counter(
+    "http_requests_total", "Requêtes HTTP traitées", ("method", "route", "status"))
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "Latence des requêtes HTTP", ("method", "route"))
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "Requêtes HTTP en cours de traitement")
+http_request_body_bytes_total = Counter(
+    "http_request_body_bytes_total", "Octets reçus dans le corps des requêtes", ("route",))
+http_upload_throughput_bytes_per_second = Histogram(
+    "http_upload_throughput_bytes_per_second", "Débit apparent des requêtes avec corps (octets / durée totale)",
+    ("route",), buckets=THROUGHPUT_BUCKETS)
+
+# --- Admission (app/admission.py) ---
+
+ADMISSION_WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+admission_in_flight = Gauge(
+    "admission_in_flight", "Requêtes admises en cours, par voie", ("lane",))
+admission_queued = Gauge(
+    "admission_queued", "Requêtes en file d'attente d'admission, par voie", ("lane",))
+admission_bytes_in_flight = Gauge(
+    "admission_bytes_in_flight", "Octets de corps de requête réservés par les requêtes admises")
+admission_rejected_total = Counter(
+    "admission_rejected_total", "Requêtes refusées (429) par voie et motif", ("lane", "reason"))
+admission_wait_seconds = Histogram(
+    "admission_wait_seconds", "Attente avant admission", ("lane",), buckets=ADMISSION_WAIT_BUCKETS)
+
+# --- Base de données ---
+
+db_queries_total = Counter(
+    "db_queries_total", "Requêtes SQL exécutées")
+db_query_duration_seconds = Histogram(
+    "db_query_duration_seconds", "Durée des requêtes SQL", buckets=QUERY_BUCKETS)
+db_queries_per_request = Histogram(
+    "db_queries_per_request", "Requêtes SQL par requête HTTP", ("route",),
+    buckets=QUERIES_PER_REQUEST_BUCKETS)
+db_time_per_request_seconds = Histogram(
+    "db_time_per_request_seconds", "Temps SQL cumulé par requête HTTP", ("route",),
+    buckets=QUERY_BUCKETS + (2.5, 5.0))
+db_read_routing_total = Counter(
+    "db_read_routing_total", "Sessions de lecture par cible (replica, primary) et motif", ("target", "reason"))
+db_replica_lag_seconds = Gauge(
+    "db_replica_lag_seconds", "Retard de réplication mesuré (-1 : réplique injoignable)", ("replica",))
+
+# --- Caches applicatifs ---
+
+cache_requests_total = Counter(
+    "cache_requests_total", "Consultations des caches applicatifs", ("cache", "result"))
+
+
+def _cache_hit_ratios():
+    with cache_requests_total._lock:
+        values = dict(cache_requests_total._values)
+    ratios = {}
+    for cache in {labels[0] for labels in values}:
+        hits = values.get((cache, "hit"), 0)
+        total = hits + values.get((cache, "miss"), 0)
+        ratios[(cache,)] = hits / total if total else 0
+    return ratios
+
+
+cache_hit_ratio = Gauge(
+    "cache_hit_ratio", "Taux de succès des caches depuis le démarrage du worker", ("cache",),
+    collect=_cache_hit_ratios)
+
+
+def record_cache(cache, hit):
+    """À appeler par les caches applicatifs à chaque consultation."""
+    cache_requests_total.inc(1, cache, "hit" if hit else "miss")
+
+
+# Compteurs SQL de la requête HTTP en cours : [nombre, secondes]
+_request_db_stats: ContextVar = ContextVar("request_db_stats", default=None)
+
+
+def instrument_engine(engine):
+    """Branche les événements SQLAlchemy et les gauges du pool sur un engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        db_queries_total.inc()
+        db_query_duration_seconds.observe(elapsed)
+        stats = _request_db_stats.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+
+    # Hôte/base sans identifiants, pour distinguer les engines
+    label = engine.url.render_as_string(hide_password=True).split("@")[-1]
+    _instrumented_engines.append((label, engine))
+
+
+# (label, engine) des engines instrumentés ; le pool est relu au scrape
+# car engine.dispose() le remplace
+_instrumented_engines = []
+
+
+def _pool_stats(attribute):
+    def collect():
+        stats = {}
+        for label, engine in _instrumented_engines:
+            method = getattr(engine.pool, attribute, None)
+            if callable(method):  # NullPool/StaticPool n'ont pas ces compteurs
+                stats[(label,)] = method()
+        return stats
+    return collect
+
+
+db_pool_size = Gauge(
+    "db_pool_size", "Taille configurée du pool", ("engine",), collect=_pool_stats("size"))
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out", "Connexions empruntées", ("engine",), collect=_pool_stats("checkedout"))
+db_pool_checked_in = Gauge(
+    "db_pool_checked_in", "Connexions disponibles dans le pool", ("engine",), collect=_pool_stats("checkedin"))
+db_pool_overflow = Gauge(
+    "db_pool_overflow", "Connexions au-delà de la taille du pool", ("engine",), collect=_pool_stats("overflow"))
+
+
+class MetricsMiddleware:
+    """Middleware ASGI qui alimente les métriques HTTP et SQL par requête."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        body_bytes = 0
+
+        async def receive_wrapper():
+            nonlocal body_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                body_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = [0, 0.0]
+        token = _request_db_stats.set(stats)
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            _request_db_stats.reset(token)
+
+            # Gabarit de la route (cardinalité bornée) plutôt que le chemin réel
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+
+            http_requests_total.inc(1, method, route_path, status_code)
+            http_request_duration_seconds.observe(elapsed, method, route_path)
+            db_queries_per_request.observe(stats[0], route_path)
+            db_time_per_request_seconds.observe(stats[1], route_path)
+            if body_bytes:
+                http_request_body_bytes_total.inc(body_bytes, route_path)
+                http_upload_throughput_bytes_per_second.observe(body_bytes / elapsed, route_path)
@@ -0,0 +1,19 @@
+# Importer tous les modèles ici pour qu'ils soient enregistrés dans Base.metadata
+# (utilisé par Alembic) et que les relations entre modèles se résolvent
+# quel que soit le module importé en premier.
+from app.models import (
+    article,
+    change_log,
+    column_mapping,
+    detector,
+    donnee,
+    donnee_features,
+    donnee_vector,
+    experience,
+    experience_detector,
+    experience_machine,
+    experience_phantom,
+    idempotency_key,
+    machine,
+    phantom,
+)
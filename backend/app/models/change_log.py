@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from app.database import Base
+
+
+class ChangeLog(Base):
+    """
+    Journal des créations (app/services/changes.py), écrit dans la
+    transaction de l'écriture qu'il décrit. change_id est le curseur de
+    GET /changes et du flux /changes/stream. Pas de clé étrangère : le
+    journal survit à l'archivage des lignes qu'il référence.
+    """
+    __tablename__ = "change_log"
+    # SQLite : identifiants jamais réutilisés, le curseur reste croissant
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    change_id = Column(Integer, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime, nullable=False)  # UTC
+    entity = Column(String, nullable=False)  # article, experience, donnee, experience_machine...
+    action = Column(String, nullable=False)  # created, linked
+    entity_id = Column(Integer, nullable=False)
+    experience_id = Column(Integer)
+    article_id = Column(Integer)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, DateTime, Index, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -8,14 +8,26 @@ class ColumnMapping(Base):
     Each dataset can have multiple columns with different types and units.
     """
     __tablename__ = "column_mappings"
+    __table_args__ = (
+        # Declared on the partitioned parent (PostgreSQL): one index per partition.
+        # The primary key there is (mapping_id, ingested_at), see migration 0009
+        Index("ix_column_mappings_data_id", "data_id", "ingested_at"),
+    )
 
-    mapping_id = Column(Integer, primary_key=True, index=True)
+    mapping_id = Column(Integer, primary_key=True)
     data_id = Column(Integer, ForeignKey("donnees.data_id"), nullable=False)
     
     column_name = Column(String, nullable=False)  # e.g., "depth", "dose", "x_position"
     column_description = Column(String)  # e.g., "Depth in mm"
     data_type = Column(String, nullable=False)  # e.g., "numeric", "categorical", "text", "datetime"
     unit = Column(String)  # e.g., "mm", "Gy", "cm", etc.
-    
+    # Same value as the donnee's ingested_at: monthly partition key (PostgreSQL)
+    ingested_at = Column(DateTime, nullable=False)
+
     # Relation towards Donnee
-    donnee = relationship("Donnee", back_populates="column_mappings")
+    donnee = relationship(
+        "Donnee",
+        back_populates="column_mappings",
+        primaryjoin="and_(Donnee.data_id == foreign(ColumnMapping.data_id), "
+                    "Donnee.ingested_at == foreign(ColumnMapping.ingested_at))",
+    )
@@ -1,14 +1,22 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Detector(Base):
     __tablename__ = "detecteurs"
+    __table_args__ = (
+        # Sert les listes en cascade (type -> constructeur -> modèle)
+        Index("ix_detecteurs_type_constructeur_modele", "type_detecteur", "constructeur", "modele"),
+        # Recherche de get_or_create_detector ; interdit les doublons normalisés
+        Index("ux_detecteurs_match_key", "match_key", unique=True),
+    )
 
     detecteur_id = Column(Integer, primary_key=True)
     type_detecteur = Column(String)
     modele = Column(String)
     constructeur = Column(String)
+    # "type|constructeur|modèle" normalisé (app/services/catalog.py)
+    match_key = Column(String, nullable=False)
     
     # Relation vers ExperienceDetector
     experiences = relationship("ExperienceDetector", back_populates="detector")
@@ -1,20 +1,45 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, ForeignKey
 from sqlalchemy.orm import relationship
 from app.database import Base
 
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class Donnee(Base):
     __tablename__ = "donnees"
+    __table_args__ = (
+        # BRIN sur PostgreSQL (migration 0009) : les dates croissent avec data_id
+        Index("ix_donnees_ingested_at", "ingested_at", postgresql_using="brin"),
+    )
 
     data_id = Column(Integer, primary_key=True, index=True)
-    experience_id = Column(Integer, ForeignKey("experiences.experience_id"), nullable=False)
+    experience_id = Column(Integer, ForeignKey("experiences.experience_id"), nullable=False, index=True)
 
     data_type = Column(String, nullable=False)      
     file_format = Column(String)                   
     file_path = Column(String, nullable=False)
 
     description = Column(String)
+    # Date d'ingestion (UTC), recopiée sur les ColumnMapping : clé de
+    # partitionnement de column_mappings (voir app/services/partitions.py)
+    ingested_at = Column(DateTime, nullable=False, default=_utcnow)
     
     # Relation vers Experience
     experience = relationship("Experience", back_populates="donnees")
-    # Relation vers ColumnMapping (one-to-many)
-    column_mappings = relationship("ColumnMapping", back_populates="donnee", cascade="all, delete-orphan")
+    # Relation vers ColumnMapping (one-to-many) ; ingested_at dans la jointure
+    # pour ne lire que la partition du mois de la donnée
+    column_mappings = relationship(
+        "ColumnMapping",
+        back_populates="donnee",
+        cascade="all, delete-orphan",
+        primaryjoin="and_(Donnee.data_id == foreign(ColumnMapping.data_id), "
+                    "Donnee.ingested_at == foreign(ColumnMapping.ingested_at))",
+    )
+    # Grandeurs extraites du fichier (calculées après l'upload)
+    features = relationship("DonneeFeatures", back_populates="donnee", uselist=False, cascade="all, delete-orphan")
+    # Vecteur de forme de la courbe (recherche de courbes similaires)
+    vector = relationship("DonneeVector", back_populates="donnee", uselist=False, cascade="all, delete-orphan")
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Float, ForeignKey, Integer, String
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class DonneeFeatures(Base):
+    """
+    Grandeurs dosimétriques extraites du fichier d'une donnée
+    (app/services/features.py), une ligne par donnée, une colonne indexée
+    par grandeur : "profils de pénombre < 4 mm" est une requête sur index.
+    """
+    __tablename__ = "donnee_features"
+
+    data_id = Column(Integer, ForeignKey("donnees.data_id"), primary_key=True)
+
+    status = Column(String, nullable=False)  # "ok", "skipped", "error"
+    detail = Column(String)  # motif si skipped / error
+    version = Column(Integer, nullable=False)  # FEATURES_VERSION du calcul
+
+    # Rendement en profondeur
+    dmax_mm = Column(Float, index=True)
+    d10_pct = Column(Float, index=True)
+    d20_pct = Column(Float, index=True)
+    r50_mm = Column(Float, index=True)
+
+    # Profil
+    field_width_mm = Column(Float, index=True)
+    penumbra_mm = Column(Float, index=True)
+    flatness_pct = Column(Float, index=True)
+
+    donnee = relationship("Donnee", back_populates="features")
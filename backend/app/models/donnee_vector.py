@@ -0,0 +1,17 @@
+from sqlalchemy import Column, ForeignKey, Integer, LargeBinary
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class DonneeVector(Base):
+    """
+    Vecteur de forme de la courbe d'une donnée (app/services/similarity.py) :
+    VECTOR_DIM float32 little-endian. Source des index IVF sur disque.
+    """
+    __tablename__ = "donnee_vectors"
+
+    data_id = Column(Integer, ForeignKey("donnees.data_id"), primary_key=True)
+    vector = Column(LargeBinary, nullable=False)
+    version = Column(Integer, nullable=False)  # FEATURES_VERSION du calcul
+
+    donnee = relationship("Donnee", back_populates="vector")
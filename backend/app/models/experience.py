@@ -7,7 +7,7 @@ class Experience(Base):
 
     experience_id = Column(Integer, primary_key=True, index=True)
     description = Column(String)
-    article_id = Column(Integer, ForeignKey("articles.article_id"))
+    article_id = Column(Integer, ForeignKey("articles.article_id"), index=True)
     
     # Relations vers les tables de liaison
     machines = relationship("ExperienceMachine", back_populates="experience", cascade="all, delete-orphan")
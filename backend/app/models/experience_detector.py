@@ -1,16 +1,26 @@
-from sqlalchemy import Column, Integer, ForeignKey, String
+from sqlalchemy import Column, Float, Integer, ForeignKey, String, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class ExperienceDetector(Base):
     __tablename__ = "experience_detecteur"
+    __table_args__ = (
+        # Filtres par plage de profondeur et de position
+        Index("ix_experience_detecteur_depth", "depth_min_mm", "depth_max_mm"),
+        Index("ix_experience_detecteur_position", "position_mm"),
+    )
 
     experience_id = Column(Integer, ForeignKey("experiences.experience_id"), primary_key=True)
-    detector_id = Column(Integer, ForeignKey("detecteurs.detecteur_id"), primary_key=True)
+    detector_id = Column(Integer, ForeignKey("detecteurs.detecteur_id"), primary_key=True, index=True)
 
     position = Column(String)
     depth = Column(String)
     orientation = Column(String)
+
+    # Valeurs lues dans depth / position, en mm (app/services/units.py)
+    depth_min_mm = Column(Float)
+    depth_max_mm = Column(Float)
+    position_mm = Column(Float)
     
     # Relations
     experience = relationship("Experience", back_populates="detectors")
@@ -1,20 +1,31 @@
-from sqlalchemy import Column, Integer, ForeignKey, String
+from sqlalchemy import Column, Float, Integer, ForeignKey, String, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class ExperienceMachine(Base):
     __tablename__ = "experience_machine"
+    __table_args__ = (
+        # Filtres par plage : énergie (même unité) et taille de champ
+        Index("ix_experience_machine_energy", "energy_unit", "energy_min", "energy_max"),
+        Index("ix_experience_machine_field_size", "field_size_cm2"),
+    )
 
     experience_id = Column(
         Integer, ForeignKey("experiences.experience_id"), primary_key=True
     )
     machine_id = Column(
-        Integer, ForeignKey("machines.machine_id"), primary_key=True
+        Integer, ForeignKey("machines.machine_id"), primary_key=True, index=True
     )
     
     energy = Column(String)
     collimation = Column(String)
     settings = Column(String)
+
+    # Valeurs lues dans energy / collimation (app/services/units.py)
+    energy_min = Column(Float)
+    energy_max = Column(Float)
+    energy_unit = Column(String)  # "MV" ou "MeV"
+    field_size_cm2 = Column(Float)
     
     # Relations
     experience = relationship("Experience", back_populates="machines")
@@ -6,7 +6,7 @@ class ExperiencePhantom(Base):
     __tablename__ = "experience_phantom"
 
     experience_id = Column(Integer, ForeignKey("experiences.experience_id"), primary_key=True)
-    phantom_id = Column(Integer, ForeignKey("phantoms.phantom_id"), primary_key=True)
+    phantom_id = Column(Integer, ForeignKey("phantoms.phantom_id"), primary_key=True, index=True)
     
     # Paramètres spécifiques à l'expérience
     position = Column(String, nullable=True)
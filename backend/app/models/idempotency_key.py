@@ -0,0 +1,16 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Réponse d'une soumission, rejouée aux renvois de la même clé
+    Idempotency-Key (app/services/idempotency.py).
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # sha256 de la route, des champs et du fichier
+    response_status = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, nullable=False, index=True)  # UTC, expiration
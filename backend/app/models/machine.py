@@ -1,14 +1,22 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Machine(Base):
     __tablename__ = "machines"
+    __table_args__ = (
+        # Sert les listes en cascade (type -> constructeur -> modèle)
+        Index("ix_machines_type_constructeur_modele", "type_machine", "constructeur", "modele"),
+        # Recherche de get_or_create_machine ; interdit les doublons normalisés
+        Index("ux_machines_match_key", "match_key", unique=True),
+    )
 
     machine_id = Column(Integer, primary_key=True, index=True)
     constructeur = Column(String)
     modele = Column(String, nullable=False)
     type_machine = Column(String)
+    # "type|constructeur|modèle" normalisé (app/services/catalog.py)
+    match_key = Column(String, nullable=False)
     
     # Relation vers ExperienceMachine
     experiences = relationship("ExperienceMachine", back_populates="machine")
@@ -1,9 +1,16 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Phantom(Base):
     __tablename__ = "phantoms"
+    __table_args__ = (
+        # Sert les listes en cascade (type -> fabricant -> modèle -> dimensions)
+        Index("ix_phantoms_type_manufacturer_model", "phantom_type", "manufacturer", "model"),
+        Index("ix_phantoms_model", "model"),
+        # Recherche de get_or_create_phantom ; interdit les doublons normalisés
+        Index("ux_phantoms_match_key", "match_key", unique=True),
+    )
 
     phantom_id = Column(Integer, primary_key=True)
     phantom_type = Column(String)
@@ -11,6 +18,8 @@ class Phantom(Base):
     model = Column(String)
     dimensions = Column(String)
     material = Column(String)
+    # "type|fabricant|modèle" normalisé (app/services/catalog.py)
+    match_key = Column(String, nullable=False)
     
     # Relation vers ExperiencePhantom
     experiences = relationship("ExperiencePhantom", back_populates="phantom")
@@ -0,0 +1,239 @@
+"""
+Routage des lectures vers des répliques PostgreSQL.
+
+- READ_REPLICA_URLS : URL des répliques, séparées par des virgules ; vide,
+  toutes les sessions vont au primaire (app.database.engine).
+- get_read_db : dépendance des routes de lecture (GET et POST de lecture
+  seule). Une réplique est choisie à tour de rôle parmi celles qui répondent
+  et dont le retard est d'au plus REPLICA_MAX_LAG_SECONDS, sinon le
+  primaire. L'état des répliques (joignable, retard, position WAL rejouée)
+  est relu toutes les REPLICA_CHECK_INTERVAL secondes par un thread du
+  worker, démarré avec le worker (lifespan) : une réplique injoignable ne
+  retarde aucune requête, et n'est pas utilisée avant sa première
+  vérification réussie.
+- Lecture de ses propres écritures : ConsistencyMiddleware ajoute aux
+  réponses des écritures réussies un jeton de cohérence (en-tête
+  X-Consistency-Token et cookie rdh_consistency, REPLICA_STICKY_SECONDS) :
+  position WAL du primaire après le commit ("lsn:0/3000060") sur
+  PostgreSQL, horodatage ("ts:...") ailleurs. Une lecture qui présente un
+  jeton n'est servie par une réplique que si celle-ci a rejoué cette
+  position (jeton horodaté : si le retard maximal toléré est écoulé depuis).
+- Cache des réponses : une lecture servie par une réplique n'est pas mise
+  en cache (app/cache.py, READ_REPLICA_SCOPE), pour qu'aucune réponse d'une
+  réplique en retard ne soit conservée sous la génération courante.
+- Essai local sans réplication : READ_REPLICA_URLS pointant sur la même base
+  (SQLite ou PostgreSQL), ou deux conteneurs PostgreSQL en réplication.
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from app.cache import READ_REPLICA_SCOPE, is_write
+from app.database import SessionLocal, engine
+from app.metrics import db_read_routing_total, db_replica_lag_seconds, instrument_engine
+
+logger = logging.getLogger(__name__)
+
+READ_REPLICA_URLS = [url.strip() for url in os.getenv("READ_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "2"))
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "60"))
+REPLICA_CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT", "2"))
+
+CONSISTENCY_HEADER = "X-Consistency-Token"
+CONSISTENCY_COOKIE = "rdh_consistency"
+
+# Retard nul quand tout le WAL reçu est rejoué : sans écriture sur le
+# primaire, la date de la dernière transaction rejouée vieillit sans retard réel
+_STATUS_SQL = text("""
+    SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0
+                WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END,
+           (CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() END)::text
+""")
+
+
+def parse_lsn(value):
+    """Position WAL "16/B374D848" -> entier, ou None."""
+    try:
+        high, low = value.split("/")
+        return (int(high, 16) << 32) | int(low, 16)
+    except (AttributeError, ValueError):
+        return None
+
+
+def parse_token(raw):
+    """Jeton de cohérence -> ("lsn", entier) | ("ts", epoch) | None si absent ou illisible."""
+    kind, _, value = (raw or "").partition(":")
+    if kind == "lsn":
+        lsn = parse_lsn(value)
+        return ("lsn", lsn) if lsn is not None else None
+    if kind == "ts":
+        try:
+            return "ts", float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def consistency_token(request: Request):
+    return parse_token(request.headers.get(CONSISTENCY_HEADER) or request.cookies.get(CONSISTENCY_COOKIE))
+
+
+class Replica:
+    """Une réplique et son dernier état connu."""
+
+    def __init__(self, url):
+        connect_args = {"connect_timeout": REPLICA_CONNECT_TIMEOUT} if url.startswith("postgresql") else {}
+        self.engine = create_engine(url, pool_pre_ping=True, connect_args=connect_args)
+        self.label = self.engine.url.render_as_string(hide_password=True).split("@")[-1]
+        self.healthy = False
+        self.lag = None
+        self.replay_lsn = None
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                if conn.dialect.name == "postgresql":
+                    lag, lsn = conn.execute(_STATUS_SQL).one()
+                    lag, replay_lsn = float(lag), parse_lsn(lsn)
+                else:
+                    conn.execute(text("SELECT 1"))
+                    lag, replay_lsn = 0.0, None
+        except Exception as e:  # noqa: BLE001 - toute erreur rend la réplique indisponible
+            if self.healthy:
+                logger.warning("Read replica %s unavailable: %s", self.label, str(e).splitlines()[0])
+            self.healthy = False
+            db_replica_lag_seconds.set(-1, self.label)
+            return
+        if not self.healthy:
+            logger.info("Read replica available", extra={"replica": self.label, "lag_seconds": lag})
+        self.lag, self.replay_lsn, self.healthy = lag, replay_lsn, True
+        db_replica_lag_seconds.set(lag, self.label)
+
+    def satisfies(self, token) -> bool:
+        """La réplique a-t-elle rejoué l'écriture désignée par le jeton ?"""
+        if token is None:
+            return True
+        kind, value = token
+        if kind == "lsn":
+            return self.replay_lsn is not None and self.replay_lsn >= value
+        return time.time() - value >= REPLICA_MAX_LAG_SECONDS
+
+
+class ReplicaSet:
+    """Répliques du worker, surveillées par un thread (start, au démarrage du worker)."""
+
+    def __init__(self, urls):
+        self.replicas = [Replica(url) for url in urls]
+        self._next = itertools.count()
+        self._monitor_pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Démarre le thread de surveillance, un par processus (les workers
+        gunicorn sont créés par fork). Les répliques restent indisponibles
+        jusqu'à leur première vérification réussie, faite par ce thread.
+        """
+        if not self.replicas:
+            return
+        with self._lock:
+            if self._monitor_pid == os.getpid():
+                return
+            threading.Thread(target=self._monitor, name="replica-monitor", daemon=True).start()
+            self._monitor_pid = os.getpid()
+
+    def _monitor(self):
+        while True:
+            for replica in self.replicas:
+                replica.check()
+            time.sleep(REPLICA_CHECK_INTERVAL)
+
+    def choose(self, token):
+        """
+        Réplique pour une lecture.
+
+        Returns:
+            tuple: (Replica | None, motif) ; None : lire sur le primaire
+        """
+        reason = "unavailable"
+        start = next(self._next)
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(start + i) % len(self.replicas)]
+            if not replica.healthy:
+                continue
+            if replica.lag > REPLICA_MAX_LAG_SECONDS:
+                reason = "lag"
+            elif not replica.satisfies(token):
+                reason = "consistency"
+            else:
+                return replica, "ok"
+        return None, reason
+
+
+replica_set = ReplicaSet(READ_REPLICA_URLS)
+for _replica in replica_set.replicas:
+    instrument_engine(_replica.engine)
+
+
+def get_read_db(request: Request):
+    """Session de lecture : réplique si possible, sinon primaire."""
+    if not replica_set.replicas:
+        db = SessionLocal()
+    else:
+        replica, reason = replica_set.choose(consistency_token(request))
+        if replica is None:
+            db_read_routing_total.inc(1, "primary", reason)
+            db = SessionLocal()
+        else:
+            db_read_routing_total.inc(1, "replica", reason)
+            request.scope[READ_REPLICA_SCOPE] = replica.label
+            db = SessionLocal(bind=replica.engine)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def current_token():
+    """Jeton de cohérence de l'état committé du primaire."""
+    if engine.dialect.name == "postgresql":
+        try:
+            with engine.connect() as conn:
+                return "lsn:" + conn.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+        except Exception as e:  # noqa: BLE001 - jeton horodaté à défaut
+            logger.warning("Could not read primary WAL position: %s", e)
+    return f"ts:{time.time():.3f}"
+
+
+class ConsistencyMiddleware:
+    """Middleware ASGI : jeton de cohérence sur les réponses des écritures réussies."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not replica_set.replicas
+                or not is_write(scope["method"], scope["path"])):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and 200 <= message["status"] < 300:
+                token = await run_in_threadpool(current_token)
+                message = {**message, "headers": [
+                    *message.get("headers", []),
+                    (CONSISTENCY_HEADER.lower().encode(), token.encode()),
+                    (b"set-cookie", f"{CONSISTENCY_COOKIE}={token}; Max-Age={REPLICA_STICKY_SECONDS}; "
+                                    f"Path=/; HttpOnly; SameSite=Lax".encode()),
+                ]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,28 @@
+import importlib
+
+# Modules de routes, dans l'ordre d'enregistrement.
+# Chaque module expose un `router` ; il n'est importé qu'au moment où
+# l'application enregistre ses routes (voir include_routers).
+ROUTER_MODULES = (
+    "articles",
+    "experiences",
+    "files",
+    "donnees",
+    "machines",
+    "phantoms",
+    "detectors",
+    "experience_machines",
+    "experience_phantoms",
+    "experience_detectors",
+    "complete_submission",
+    "exports",
+    "imports",
+    "changes",
+)
+
+
+def include_routers(app):
+    """Importe chaque module de routes et enregistre son router sur l'application."""
+    for name in ROUTER_MODULES:
+        module = importlib.import_module(f"{__name__}.{name}")
+        app.include_router(module.router)
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import DatabaseError
 
 from app.database import SessionLocal
 from app.models.article import Article
 from app.models.experience import Experience
+from app.replicas import get_read_db
 from app.schemas.article import ArticleCreate, ArticleOut
+from app.services.changes import record_change
+from app.services.export import archive_response, build_manifest, find_experience_ids
+from app.serialization import list_response
 
 router = APIRouter(prefix="/articles", tags=["Articles"])
 
@@ -34,6 +38,8 @@ def create_article(article: ArticleCreate, db: Session = Depends(get_db)):
     db.add(db_article)
 
     try:
+        db.flush()
+        record_change(db, "article", "created", db_article.article_id, article_id=db_article.article_id)
         db.commit()
     except DatabaseError:
         db.rollback()
@@ -46,14 +52,14 @@ def create_article(article: ArticleCreate, db: Session = Depends(get_db)):
     return db_article
 
 @router.get("/")
-def list_articles(db: Session = Depends(get_db)):
+def list_articles(db: Session = Depends(get_read_db)):
     """
     Liste tous les articles.
     """
-    return db.query(Article).all()
+    return list_response(db, Article)
 
 @router.get("/{article_id}", response_model=ArticleOut)
-def get_article(article_id: int, db: Session = Depends(get_db)):
+def get_article(article_id: int, db: Session = Depends(get_read_db)):
     """
     Récupère un article avec ses expériences.
     """
@@ -63,7 +69,7 @@ def get_article(article_id: int, db: Session = Depends(get_db)):
     return article
 
 @router.get("/{article_id}/experiences")
-def get_article_experiences(article_id: int, db: Session = Depends(get_db)):
+def get_article_experiences(article_id: int, db: Session = Depends(get_read_db)):
     """
     Récupère toutes les expériences d'un article.
     """
@@ -92,3 +98,30 @@ def get_article_experiences(article_id: int, db: Session = Depends(get_db)):
             for exp in experiences
         ]
     }
+
+@router.get("/{article_id}/export")
+def export_article(
+    article_id: int,
+    archive_format: str = Query("zip", alias="format", pattern="^(zip|tar)$"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Exporte un article (manifeste JSON + fichiers de données) en archive zip ou tar.
+
+    L'archive est générée à la volée pendant l'envoi de la réponse.
+    """
+    article = db.query(Article).filter(Article.article_id == article_id).first()
+    if not article:
+        raise HTTPException(status_code=404, detail="Article not found")
+
+    manifest = build_manifest(db, find_experience_ids(db, article_ids=[article_id]))
+    if not manifest["articles"]:
+        # Article sans expérience : le manifeste le décrit quand même
+        manifest["articles"].append({
+            "article_id": article.article_id,
+            "titre": article.titre,
+            "auteurs": article.auteurs,
+            "doi": article.doi,
+            "experiences": [],
+        })
+    return archive_response(manifest, archive_format, f"article_{article_id}")
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.cache import generation
+from app.database import SessionLocal
+from app.lifecycle import draining
+from app.serialization import FastJSONResponse, dumps
+from app.services.changes import CHANGES_PAGE_MAX, latest_change_id, read_changes
+
+router = APIRouter(prefix="/changes", tags=["Changes"])
+
+logger = logging.getLogger(__name__)
+
+# Flux SSE : attente entre deux vérifications du compteur de génération
+# (écritures de ce serveur), relecture de la table au plus tard après
+# CHANGES_STREAM_POLL secondes (écritures d'un autre serveur), commentaire
+# de maintien de connexion et nombre de flux par worker
+CHANGES_STREAM_TICK = 0.25
+CHANGES_STREAM_POLL = float(os.getenv("CHANGES_STREAM_POLL", "2"))
+CHANGES_STREAM_HEARTBEAT = float(os.getenv("CHANGES_STREAM_HEARTBEAT", "15"))
+CHANGES_STREAM_MAX = int(os.getenv("CHANGES_STREAM_MAX", "100"))
+
+
+
+class _StreamSlots:
+    """Flux ouverts par le worker : place réservée avant la réponse."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.open >= self.limit:
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open -= 1
+
+
+_stream_slots = _StreamSlots(CHANGES_STREAM_MAX)
+
+
+class _SlotStreamingResponse(StreamingResponse):
+    """Rend la place du flux une seule fois : fin du générateur, ou réponse jamais démarrée."""
+
+    def __init__(self, content, **kwargs):
+        super().__init__(content, **kwargs)
+        self._released = False
+
+    def release_slot(self):
+        if not self._released:
+            self._released = True
+            _stream_slots.release()
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release_slot()
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@router.get("/")
+def list_changes(
+    since: int = Query(0, ge=0, description="Dernier change_id traité"),
+    limit: int = Query(500, ge=1, le=CHANGES_PAGE_MAX),
+    db: Session = Depends(get_db),
+):
+    """
+    Créations (articles, expériences, données, liaisons) postérieures au
+    curseur `since`, par change_id croissant.
+
+    `next` est le curseur de l'appel suivant ; `has_more` indique qu'il
+    reste des changements à lire tout de suite.
+    """
+    changes, cursor, more = read_changes(db, since, limit)
+    return FastJSONResponse({"changes": changes, "next": cursor, "has_more": more})
+
+
+def _read_page(since):
+    with SessionLocal() as db:
+        if since is None:
+            return [], latest_change_id(db), False
+        return read_changes(db, since)
+
+
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="Curseur de départ (défaut : changements à venir)"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Flux Server-Sent Events des changements : un événement `change` par
+    ligne du journal, d'identifiant change_id. À la reconnexion, le
+    navigateur renvoie Last-Event-ID et le flux reprend après ce
+    changement. Le flux se termine quand le worker s'arrête (drain) ;
+    le client se reconnecte alors à un autre worker.
+    """
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    # Place réservée ici, pas au premier octet du flux : des connexions
+    # simultanées ne peuvent pas toutes passer la limite
+    if not _stream_slots.acquire():
+        raise HTTPException(status_code=503, detail="Too many change streams", headers={"Retry-After": "5"})
+
+    async def events():
+        cursor = since
+        seen_generation = None
+        last_read, last_sent = 0.0, time.monotonic()
+        pending = True
+        try:
+            yield b"retry: 3000\n\n"
+            while not draining.is_set() and not await request.is_disconnected():
+                now = time.monotonic()
+                current = generation.current()
+                if pending or current != seen_generation or now - last_read >= CHANGES_STREAM_POLL:
+                    seen_generation, last_read = current, now
+                    changes, cursor, pending = await run_in_threadpool(_read_page, cursor)
+                    for change in changes:
+                        yield b"id: %d\nevent: change\ndata: %s\n\n" % (change["change_id"], dumps(change))
+                    if changes:
+                        last_sent = now
+                if now - last_sent >= CHANGES_STREAM_HEARTBEAT:
+                    yield b": keepalive\n\n"
+                    last_sent = now
+                await asyncio.sleep(CHANGES_STREAM_TICK)
+        finally:
+            response.release_slot()
+
+    try:
+        response = _SlotStreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except BaseException:
+        _stream_slots.release()
+        raise
+    return response
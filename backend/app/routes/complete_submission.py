@@ -3,9 +3,10 @@ Endpoint pour créer une soumission complète (article, expérience, données) e
 Cela garantit que soit tout est créé, soit rien n'est créé (atomicité).
 """
 import json
-import shutil
-import os
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status, Depends
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Form, Header, HTTPException, status, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import DatabaseError, IntegrityError
 
@@ -17,16 +18,35 @@ from app.models.experience_machine import ExperienceMachine
 from app.models.experience_detector import ExperienceDetector
 from app.models.experience_phantom import ExperiencePhantom
 from app.models.column_mapping import ColumnMapping
+from app.services.changes import record_submission
 from app.services.entity_management import (
     get_or_create_machine,
     get_or_create_detector,
     get_or_create_phantom,
 )
+from app.services.features import compute_features_task
+from app.services.idempotency import (
+    check_key,
+    lock_key,
+    replay_response,
+    request_fingerprint,
+    save_response,
+    stored_response,
+)
+from app.services.units import (
+    DEFAULT_LENGTH_UNIT,
+    detector_link_values,
+    length_unit_from_mappings,
+    machine_link_values,
+)
+from app.services.validation import EnergyValidationError, validate_machine_links
+from app.storage import delete_file, storage
+from app.tracing import span
 
 router = APIRouter(prefix="/complete", tags=["Complete Submission"])
 
-UPLOAD_DIR = "data/uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+logger = logging.getLogger(__name__)
+
 
 def get_db():
     db = SessionLocal()
@@ -36,8 +56,254 @@ def get_db():
         db.close()
 
 
+def _link_machines(db: Session, experience_id: int, machines: str) -> int:
+    """
+    Récupère/crée les machines du JSON et les lie à l'expérience.
+
+    Les énergies sont d'abord vérifiées contre le catalogue de référence
+    (app/services/validation.py) : une incompatibilité donne un 422.
+    """
+    machines_data = json.loads(machines)
+    try:
+        validate_machine_links(
+            (m.get("manufacturer"), m.get("model"), m.get("machineType"), m.get("energy"))
+            for m in machines_data
+        )
+    except EnergyValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "Energy incompatible with machine", "issues": e.issues},
+        )
+    for machine_info in machines_data:
+        # Get or create machine (will reuse if exists)
+        machine = get_or_create_machine(
+            db,
+            constructeur=machine_info.get("manufacturer"),
+            modele=machine_info.get("model"),
+            type_machine=machine_info.get("machineType"),
+        )
+
+        # Link to experience with parameters
+        link = ExperienceMachine(
+            experience_id=experience_id,
+            machine_id=machine.machine_id,
+            energy=machine_info.get("energy"),
+            collimation=machine_info.get("collimation"),
+            settings=machine_info.get("settings"),
+            **machine_link_values(
+                machine_info.get("energy"),
+                machine_info.get("collimation"),
+                machine_info.get("machineType"),
+            ),
+        )
+        db.add(link)
+    db.flush()
+    return len(machines_data)
+
+
+def _link_detectors(db: Session, experience_id: int, detectors: str, length_unit: str) -> int:
+    """
+    Récupère/crée les détecteurs du JSON et les lie à l'expérience.
+
+    `length_unit` : unité des profondeurs/positions saisies sans unité.
+    """
+    detectors_data = json.loads(detectors)
+    for detector_info in detectors_data:
+        # Get or create detector (will reuse if exists)
+        detector = get_or_create_detector(
+            db,
+            type_detecteur=detector_info.get("detectorType"),
+            modele=detector_info.get("model"),
+            constructeur=detector_info.get("manufacturer"),
+        )
+
+        # Link to experience with parameters
+        link = ExperienceDetector(
+            experience_id=experience_id,
+            detector_id=detector.detecteur_id,
+            position=detector_info.get("position"),
+            depth=detector_info.get("depth"),
+            orientation=detector_info.get("orientation"),
+            **detector_link_values(
+                detector_info.get("position"),
+                detector_info.get("depth"),
+                length_unit,
+            ),
+        )
+        db.add(link)
+    db.flush()
+    return len(detectors_data)
+
+
+def _link_phantoms(db: Session, experience_id: int, phantoms: str) -> int:
+    """Récupère/crée les fantômes du JSON et les lie à l'expérience."""
+    phantoms_data = json.loads(phantoms)
+    for phantom_info in phantoms_data:
+        # Get or create phantom (will reuse if exists)
+        phantom = get_or_create_phantom(
+            db,
+            manufacturer=phantom_info.get("manufacturer"),
+            model=phantom_info.get("model"),
+            phantom_type=phantom_info.get("phantom_type"),
+            dimensions=phantom_info.get("dimensions"),
+            material=phantom_info.get("material"),
+        )
+
+        # Link to experience with parameters
+        link = ExperiencePhantom(
+            experience_id=experience_id,
+            phantom_id=phantom.phantom_id,
+            position=phantom_info.get("position"),
+            orientation=phantom_info.get("orientation"),
+        )
+        db.add(link)
+    db.flush()
+    return len(phantoms_data)
+
+
+def _length_unit(columnMapping: str) -> str:
+    """Unité de longueur des colonnes du fichier déclarées dans l'assistant."""
+    try:
+        mappings = json.loads(columnMapping) if columnMapping else []
+    except json.JSONDecodeError:
+        return DEFAULT_LENGTH_UNIT  # format invalide : signalé par _create_column_mappings
+    return length_unit_from_mappings(mappings if isinstance(mappings, list) else [])
+
+
+def _create_column_mappings(db: Session, donnee: Donnee, columnMapping: str) -> int:
+    """Crée les ColumnMapping décrits par le JSON du formulaire."""
+    try:
+        mappings = json.loads(columnMapping)
+    except json.JSONDecodeError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid columnMapping format: {str(e)}"
+        )
+
+    created = 0
+    if isinstance(mappings, list):
+        for mapping in mappings:
+            # Support both camelCase (from frontend) and snake_case
+            column_name = mapping.get("column_name") or mapping.get("name")
+            data_type_col = mapping.get("data_type") or mapping.get("dataType")
+            column_description = mapping.get("column_description") or mapping.get("description")
+            col_unit = mapping.get("unit")
+
+            # Only create if we have at least column_name and data_type
+            if column_name and data_type_col:
+                db.add(ColumnMapping(
+                    data_id=donnee.data_id,
+                    ingested_at=donnee.ingested_at,
+                    column_name=column_name,
+                    column_description=column_description,
+                    data_type=data_type_col,
+                    unit=col_unit,
+                ))
+                created += 1
+    return created
+
+
+def _attach_experience_content(
+    db: Session,
+    experience: Experience,
+    machines: str,
+    detectors: str,
+    phantoms: str,
+    file: UploadFile,
+    data_type: str,
+    data_description: str,
+    columnMapping: str,
+    written_files: list,
+) -> dict:
+    """
+    Étapes communes aux deux soumissions : équipements, fichier de données
+    et colonnes. Chaque étape est mesurée (voir app.tracing).
+
+    Les chemins des fichiers écrits sont ajoutés à `written_files` pour que
+    l'appelant puisse les supprimer en cas d'échec de la transaction.
+    """
+    experience_id = experience.experience_id
+
+    with span("machines"):
+        machines_count = _link_machines(db, experience_id, machines)
+
+    with span("detectors"):
+        detectors_count = _link_detectors(db, experience_id, detectors, _length_unit(columnMapping))
+
+    with span("phantoms"):
+        phantoms_count = _link_phantoms(db, experience_id, phantoms)
+
+    with span("file_write"):
+        key = f"{experience_id}_{file.filename}"
+        file_path = storage.location(key)
+        written_files.append(file_path)
+        storage.save(key, file.file)
+
+        donnee = Donnee(
+            experience_id=experience_id,
+            data_type=data_type,
+            file_format=file.filename.split(".")[-1],
+            file_path=file_path,
+            description=data_description,
+        )
+        db.add(donnee)
+        db.flush()
+
+    mappings_count = 0
+    if columnMapping:
+        with span("mappings"):
+            mappings_count = _create_column_mappings(db, donnee, columnMapping)
+
+    logger.debug(
+        "Experience content staged",
+        extra={
+            "experience_id": experience_id,
+            "data_id": donnee.data_id,
+            "machines": machines_count,
+            "detectors": detectors_count,
+            "phantoms": phantoms_count,
+            "mappings": mappings_count,
+        },
+    )
+
+    return {
+        "experience_id": experience_id,
+        "data_id": donnee.data_id,
+        "machines_count": machines_count,
+        "detectors_count": detectors_count,
+        "phantoms_count": phantoms_count,
+    }
+
+
+def _remove_written_files(written_files: list):
+    """Supprime les fichiers écrits par une soumission annulée."""
+    for file_path in written_files:
+        try:
+            delete_file(file_path)
+            logger.info("Cleaned up uploaded file", extra={"file_path": file_path})
+        except Exception as cleanup_error:  # noqa: BLE001 - nettoyage au mieux (disque ou S3)
+            logger.warning("Failed to clean up file %s: %s", file_path, cleanup_error)
+
+
+def _replay(db: Session, idempotency_key, fingerprint):
+    """
+    Réponse d'origine d'une soumission déjà committée avec cette clé, ou
+    None. Sur PostgreSQL, le verrou pris ici sérialise les doublons
+    concurrents jusqu'à la fin de la transaction.
+    """
+    with span("idempotency"):
+        lock_key(db, idempotency_key)
+        stored = stored_response(db, idempotency_key, fingerprint)
+    if stored is None:
+        return None
+    db.rollback()
+    logger.info("Idempotent submission replayed", extra={"idempotency_key": idempotency_key})
+    return replay_response(*stored)
+
+
 @router.post("/submit", status_code=status.HTTP_201_CREATED)
 def submit_complete_experiment(
+    background_tasks: BackgroundTasks,
     # Article fields
     title: str = Form(...),
     authors: str = Form(...),
@@ -60,7 +326,8 @@ def submit_complete_experiment(
     data_type: str = Form(...),
     data_description: str = Form(None),
     columnMapping: str = Form(None),
-    
+
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db),
 ):
     """
@@ -68,206 +335,83 @@ def submit_complete_experiment(
     et upload le fichier de données, tout dans une seule transaction.
     
     Si une erreur se produit à tout moment, TOUT est annulé (rollback).
+
+    Avec un en-tête Idempotency-Key, un renvoi de la même requête rejoue la
+    réponse d'origine (voir app/services/idempotency.py).
     """
+    check_key(idempotency_key)
+    fingerprint = idempotency_key and request_fingerprint("submit", {
+        "title": title, "authors": authors, "doi": doi, "experience_description": experience_description,
+        "machines": machines, "detectors": detectors, "phantoms": phantoms, "data_type": data_type,
+        "data_description": data_description, "columnMapping": columnMapping,
+    }, file)
+    written_files = []
     try:
-        print("📝 Starting complete submission...")
-        
+        if idempotency_key and (replayed := _replay(db, idempotency_key, fingerprint)) is not None:
+            return replayed
+
         # Step 1: Create Article
-        print("📝 Step 1: Creating article...")
-        article = Article(
-            titre=title,
-            auteurs=authors,
-            doi=doi if doi else None,
-        )
-        db.add(article)
-        db.flush()  # Get article_id without committing
-        print(f"✅ Article created with ID: {article.article_id}")
-        
-        # Step 2: Create Experience
-        print("📝 Step 2: Creating experience...")
-        experience = Experience(
-            article_id=article.article_id,
-            description=experience_description,
-        )
-        db.add(experience)
-        db.flush()  # Get experience_id
-        print(f"✅ Experience created with ID: {experience.experience_id}")
-        
-        # Step 3: Get or create and link Machines
-        print("📝 Step 3: Getting/creating and linking machines...")
-        machines_data = json.loads(machines)
-        print(f"Raw machines JSON: {machines}")
-        print(f"Parsed machines data: {machines_data}")
-        linked_machines = []
-        for machine_info in machines_data:
-            print(f"  Processing machine: {machine_info}")
-            # Get or create machine (will reuse if exists)
-            machine = get_or_create_machine(
-                db,
-                constructeur=machine_info.get("manufacturer"),
-                modele=machine_info.get("model"),
-                type_machine=machine_info.get("machineType"),
-            )
-            linked_machines.append(machine)
-            
-            # Link to experience with parameters
-            energy_val = machine_info.get("energy")
-            collimation_val = machine_info.get("collimation")
-            settings_val = machine_info.get("settings")
-            print(f"  Parameters - energy: {energy_val}, collimation: {collimation_val}, settings: {settings_val}")
-            
-            link = ExperienceMachine(
-                experience_id=experience.experience_id,
-                machine_id=machine.machine_id,
-                energy=energy_val,
-                collimation=collimation_val,
-                settings=settings_val,
+        with span("article"):
+            article = Article(
+                titre=title,
+                auteurs=authors,
+                doi=doi if doi else None,
             )
-            db.add(link)
-        db.flush()
-        print(f"✅ {len(linked_machines)} machines linked to experience")
-        
-        # Step 4: Get or create and link Detectors
-        print("📝 Step 4: Getting/creating and linking detectors...")
-        detectors_data = json.loads(detectors)
-        linked_detectors = []
-        for detector_info in detectors_data:
-            # Get or create detector (will reuse if exists)
-            detector = get_or_create_detector(
-                db,
-                type_detecteur=detector_info.get("detectorType"),
-                modele=detector_info.get("model"),
-                constructeur=detector_info.get("manufacturer"),
-            )
-            linked_detectors.append(detector)
-            
-            # Link to experience with parameters
-            link = ExperienceDetector(
-                experience_id=experience.experience_id,
-                detector_id=detector.detecteur_id,
-                position=detector_info.get("position"),
-                depth=detector_info.get("depth"),
-                orientation=detector_info.get("orientation"),
-            )
-            db.add(link)
-        db.flush()
-        print(f"✅ {len(linked_detectors)} detectors linked to experience")
-        
-        # Step 5: Get or create and link Phantoms
-        print("📝 Step 5: Getting/creating and linking phantoms...")
-        phantoms_data = json.loads(phantoms)
-        linked_phantoms = []
-        for phantom_info in phantoms_data:
-            # Get or create phantom (will reuse if exists)
-            phantom = get_or_create_phantom(
-                db,
-                manufacturer=phantom_info.get("manufacturer"),
-                model=phantom_info.get("model"),
-                phantom_type=phantom_info.get("phantom_type"),
-                dimensions=phantom_info.get("dimensions"),
-                material=phantom_info.get("material"),
-            )
-            linked_phantoms.append(phantom)
-            
-            # Link to experience with parameters
-            link = ExperiencePhantom(
-                experience_id=experience.experience_id,
-                phantom_id=phantom.phantom_id,
-                position=phantom_info.get("position"),
-                orientation=phantom_info.get("orientation"),
+            db.add(article)
+            db.flush()  # Get article_id without committing
+
+        # Step 2: Create Experience
+        with span("experience"):
+            experience = Experience(
+                article_id=article.article_id,
+                description=experience_description,
             )
-            db.add(link)
-        db.flush()
-        print(f"✅ {len(linked_phantoms)} phantoms linked to experience")
-        
-        # Step 6: Upload data file and create column mappings
-        print("📝 Step 6: Uploading data file...")
-        file_path = f"{UPLOAD_DIR}/{experience.experience_id}_{file.filename}"
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        donnee = Donnee(
-            experience_id=experience.experience_id,
-            data_type=data_type,
-            file_format=file.filename.split(".")[-1],
-            file_path=file_path,
-            description=data_description,
+            db.add(experience)
+            db.flush()  # Get experience_id
+
+        # Steps 3-7: equipment links, data file and column mappings
+        result = _attach_experience_content(
+            db, experience, machines, detectors, phantoms,
+            file, data_type, data_description, columnMapping, written_files,
         )
-        db.add(donnee)
-        db.flush()
-        print(f"✅ Data file uploaded with ID: {donnee.data_id}")
-
-        # Step 7: Create column mappings if provided
-        if columnMapping:
-            print("📝 Step 7: Creating column mappings...")
-            try:
-                mappings = json.loads(columnMapping)
-                if isinstance(mappings, list):
-                    for mapping in mappings:
-                        # Support both camelCase (from frontend) and snake_case
-                        column_name = mapping.get("column_name") or mapping.get("name")
-                        data_type_col = mapping.get("data_type") or mapping.get("dataType")
-                        column_description = mapping.get("column_description") or mapping.get("description")
-                        col_unit = mapping.get("unit")
-                        
-                        # Only create if we have at least column_name and data_type
-                        if column_name and data_type_col:
-                            column_map = ColumnMapping(
-                                data_id=donnee.data_id,
-                                column_name=column_name,
-                                column_description=column_description,
-                                data_type=data_type_col,
-                                unit=col_unit,
-                            )
-                            db.add(column_map)
-                print(f"✅ Column mappings created")
-            except json.JSONDecodeError as e:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid columnMapping format: {str(e)}"
-                )
-        
+
+        response = {"article_id": article.article_id, **result}
+        record_submission(db, response, article_created=True)
+        if idempotency_key:
+            save_response(db, idempotency_key, fingerprint, status.HTTP_201_CREATED, response)
+
         # Commit everything
-        print("📝 Committing all changes to database...")
-        db.commit()
-        print("🎉 Complete submission successful!")
-        
-        return {
-            "article_id": article.article_id,
-            "experience_id": experience.experience_id,
-            "data_id": donnee.data_id,
-            "machines_count": len(linked_machines),
-            "detectors_count": len(linked_detectors),
-            "phantoms_count": len(linked_phantoms),
-        }
-        
+        with span("commit"):
+            db.commit()
+        logger.info(
+            "Complete submission committed",
+            extra={"article_id": article.article_id, **result},
+        )
+
+        # Grandeurs dosimétriques et vecteur de forme calculés après la réponse
+        background_tasks.add_task(compute_features_task, [result["data_id"]])
+        return response
+
+    except HTTPException:
+        db.rollback()
+        _remove_written_files(written_files)
+        raise
     except (DatabaseError, IntegrityError) as e:
         db.rollback()
-        print(f"❌ Database Error: {str(e)}")
-        
-        # Clean up uploaded file if it exists
-        if 'file_path' in locals() and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                print(f"🗑️ Cleaned up uploaded file: {file_path}")
-            except Exception as cleanup_error:
-                print(f"⚠️ Failed to clean up file: {cleanup_error}")
-        
+        logger.warning("Complete submission rolled back: %s", e)
+        _remove_written_files(written_files)
+        # Doublon concurrent sans verrou (SQLite) : la clé a été committée par l'autre requête
+        if idempotency_key and (replayed := _replay(db, idempotency_key, fingerprint)) is not None:
+            return replayed
+
         raise HTTPException(
             status_code=409,
             detail=f"Database Error: {str(e)}"
         )
     except Exception as e:
         db.rollback()
-        print(f"❌ Error: {str(e)}")
-        
-        # Clean up uploaded file if it exists
-        if 'file_path' in locals() and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                print(f"🗑️ Cleaned up uploaded file: {file_path}")
-            except Exception as cleanup_error:
-                print(f"⚠️ Failed to clean up file: {cleanup_error}")
+        logger.exception("Complete submission failed")
+        _remove_written_files(written_files)
         
         raise HTTPException(
             status_code=500,
@@ -278,6 +422,7 @@ def submit_complete_experiment(
 @router.post("/submit-experience/{article_id}", status_code=status.HTTP_201_CREATED)
 def submit_experience_to_article(
     article_id: int,
+    background_tasks: BackgroundTasks,
     # Experience fields
     experience_description: str = Form(...),
     
@@ -295,7 +440,8 @@ def submit_experience_to_article(
     data_type: str = Form(...),
     data_description: str = Form(None),
     columnMapping: str = Form(None),
-    
+
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db),
 ):
     """
@@ -303,210 +449,81 @@ def submit_experience_to_article(
     fantômes et données, tout dans une seule transaction atomique.
     
     Si une erreur se produit, TOUT est annulé (rollback).
+
+    Idempotency-Key : voir submit_complete_experiment.
     """
+    check_key(idempotency_key)
+    fingerprint = idempotency_key and request_fingerprint(f"submit-experience/{article_id}", {
+        "experience_description": experience_description, "machines": machines, "detectors": detectors,
+        "phantoms": phantoms, "data_type": data_type, "data_description": data_description,
+        "columnMapping": columnMapping,
+    }, file)
+    written_files = []
     try:
-        print(f"📝 Starting experience submission for article {article_id}...")
-        
+        if idempotency_key and (replayed := _replay(db, idempotency_key, fingerprint)) is not None:
+            return replayed
+
         # Step 1: Verify article exists
-        print("📝 Step 1: Verifying article exists...")
-        article = db.query(Article).filter(
-            Article.article_id == article_id
-        ).first()
+        with span("article"):
+            article = db.query(Article).filter(
+                Article.article_id == article_id
+            ).first()
         
         if not article:
             raise HTTPException(status_code=404, detail=f"Article with ID {article_id} not found")
         
-        print(f"✅ Article found: {article.titre}")
-        
         # Step 2: Create Experience
-        print("📝 Step 2: Creating experience...")
-        experience = Experience(
-            article_id=article.article_id,
-            description=experience_description,
-        )
-        db.add(experience)
-        db.flush()  # Get experience_id
-        print(f"✅ Experience created with ID: {experience.experience_id}")
-        
-        # Step 3: Get or create and link Machines
-        print("📝 Step 3: Getting/creating and linking machines...")
-        machines_data = json.loads(machines)
-        print(f"Raw machines JSON: {machines}")
-        print(f"Parsed machines data: {machines_data}")
-        linked_machines = []
-        for machine_info in machines_data:
-            print(f"  Processing machine: {machine_info}")
-            # Get or create machine (will reuse if exists)
-            machine = get_or_create_machine(
-                db,
-                constructeur=machine_info.get("manufacturer"),
-                modele=machine_info.get("model"),
-                type_machine=machine_info.get("machineType"),
-            )
-            linked_machines.append(machine)
-            
-            # Link to experience with parameters
-            energy_val = machine_info.get("energy")
-            collimation_val = machine_info.get("collimation")
-            settings_val = machine_info.get("settings")
-            print(f"  Parameters - energy: {energy_val}, collimation: {collimation_val}, settings: {settings_val}")
-            
-            link = ExperienceMachine(
-                experience_id=experience.experience_id,
-                machine_id=machine.machine_id,
-                energy=energy_val,
-                collimation=collimation_val,
-                settings=settings_val,
-            )
-            db.add(link)
-        db.flush()
-        print(f"✅ {len(linked_machines)} machines linked to experience")
-        
-        # Step 4: Get or create and link Detectors
-        print("📝 Step 4: Getting/creating and linking detectors...")
-        detectors_data = json.loads(detectors)
-        linked_detectors = []
-        for detector_info in detectors_data:
-            print(f"  Detector data received: {detector_info}")
-            # Get or create detector (will reuse if exists)
-            detector = get_or_create_detector(
-                db,
-                type_detecteur=detector_info.get("detectorType"),
-                modele=detector_info.get("model"),
-                constructeur=detector_info.get("manufacturer"),
-            )
-            linked_detectors.append(detector)
-            
-            # Link to experience with parameters
-            link = ExperienceDetector(
-                experience_id=experience.experience_id,
-                detector_id=detector.detecteur_id,
-                position=detector_info.get("position"),
-                depth=detector_info.get("depth"),
-                orientation=detector_info.get("orientation"),
+        with span("experience"):
+            experience = Experience(
+                article_id=article.article_id,
+                description=experience_description,
             )
-            print(f"  Detector link created - position: {link.position}, depth: {link.depth}, orientation: {link.orientation}")
-            db.add(link)
-        db.flush()
-        print(f"✅ {len(linked_detectors)} detectors linked to experience")
-        
-        # Step 5: Get or create and link Phantoms
-        print("📝 Step 5: Getting/creating and linking phantoms...")
-        phantoms_data = json.loads(phantoms)
-        linked_phantoms = []
-        for phantom_info in phantoms_data:
-            print(f"  Phantom data received: {phantom_info}")
-            # Get or create phantom (will reuse if exists)
-            phantom = get_or_create_phantom(
-                db,
-                manufacturer=phantom_info.get("manufacturer"),
-                model=phantom_info.get("model"),
-                phantom_type=phantom_info.get("phantom_type"),
-                dimensions=phantom_info.get("dimensions"),
-                material=phantom_info.get("material"),
-            )
-            linked_phantoms.append(phantom)
-            
-            # Link to experience with parameters
-            link = ExperiencePhantom(
-                experience_id=experience.experience_id,
-                phantom_id=phantom.phantom_id,
-                position=phantom_info.get("position"),
-                orientation=phantom_info.get("orientation"),
-            )
-            print(f"  Phantom link created - position: {link.position}, orientation: {link.orientation}")
-            db.add(link)
-        db.flush()
-        print(f"✅ {len(linked_phantoms)} phantoms linked to experience")
-        
-        # Step 6: Upload data file and create column mappings
-        print("📝 Step 6: Uploading data file...")
-        file_path = f"{UPLOAD_DIR}/{experience.experience_id}_{file.filename}"
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        donnee = Donnee(
-            experience_id=experience.experience_id,
-            data_type=data_type,
-            file_format=file.filename.split(".")[-1],
-            file_path=file_path,
-            description=data_description,
+            db.add(experience)
+            db.flush()  # Get experience_id
+
+        # Steps 3-7: equipment links, data file and column mappings
+        result = _attach_experience_content(
+            db, experience, machines, detectors, phantoms,
+            file, data_type, data_description, columnMapping, written_files,
         )
-        db.add(donnee)
-        db.flush()
-        print(f"✅ Data file uploaded with ID: {donnee.data_id}")
-        
-        # Step 7: Create column mappings if provided
-        if columnMapping:
-            print("📝 Step 7: Creating column mappings...")
-            try:
-                mappings = json.loads(columnMapping)
-                if isinstance(mappings, list):
-                    for mapping in mappings:
-                        # Support both camelCase (from frontend) and snake_case
-                        column_name = mapping.get("column_name") or mapping.get("name")
-                        data_type_col = mapping.get("data_type") or mapping.get("dataType")
-                        column_description = mapping.get("column_description") or mapping.get("description")
-                        col_unit = mapping.get("unit")
-                        
-                        # Only create if we have at least column_name and data_type
-                        if column_name and data_type_col:
-                            column_map = ColumnMapping(
-                                data_id=donnee.data_id,
-                                column_name=column_name,
-                                column_description=column_description,
-                                data_type=data_type_col,
-                                unit=col_unit,
-                            )
-                            db.add(column_map)
-                print(f"✅ Column mappings created")
-            except json.JSONDecodeError as e:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid columnMapping format: {str(e)}"
-                )
-        
+
+        response = {"article_id": article.article_id, **result}
+        record_submission(db, response)
+        if idempotency_key:
+            save_response(db, idempotency_key, fingerprint, status.HTTP_201_CREATED, response)
+
         # Commit everything
-        print("📝 Committing all changes to database...")
-        db.commit()
-        print("🎉 Experience submission successful!")
-        
-        return {
-            "article_id": article.article_id,
-            "experience_id": experience.experience_id,
-            "data_id": donnee.data_id,
-            "machines_count": len(linked_machines),
-            "detectors_count": len(linked_detectors),
-            "phantoms_count": len(linked_phantoms),
-        }
-        
+        with span("commit"):
+            db.commit()
+        logger.info(
+            "Experience submission committed",
+            extra={"article_id": article.article_id, **result},
+        )
+
+        # Grandeurs dosimétriques et vecteur de forme calculés après la réponse
+        background_tasks.add_task(compute_features_task, [result["data_id"]])
+        return response
+
+    except HTTPException:
+        db.rollback()
+        _remove_written_files(written_files)
+        raise
     except (DatabaseError, IntegrityError) as e:
         db.rollback()
-        print(f"❌ Database Error: {str(e)}")
-        
-        # Clean up uploaded file if it exists
-        if 'file_path' in locals() and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                print(f"🗑️ Cleaned up uploaded file: {file_path}")
-            except Exception as cleanup_error:
-                print(f"⚠️ Failed to clean up file: {cleanup_error}")
-        
+        logger.warning("Experience submission rolled back: %s", e)
+        _remove_written_files(written_files)
+        # Doublon concurrent sans verrou (SQLite) : la clé a été committée par l'autre requête
+        if idempotency_key and (replayed := _replay(db, idempotency_key, fingerprint)) is not None:
+            return replayed
+
         raise HTTPException(
             status_code=409,
             detail=f"Database Error: {str(e)}"
         )
     except Exception as e:
         db.rollback()
-        print(f"❌ Error: {str(e)}")
-        
-        # Clean up uploaded file if it exists
-        if 'file_path' in locals() and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                print(f"🗑️ Cleaned up uploaded file: {file_path}")
-            except Exception as cleanup_error:
-                print(f"⚠️ Failed to clean up file: {cleanup_error}")
+        logger.exception("Experience submission failed")
+        _remove_written_files(written_files)
         
         raise HTTPException(
             status_code=500,
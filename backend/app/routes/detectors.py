@@ -4,8 +4,10 @@ from sqlalchemy.exc import DatabaseError
 
 from app.database import SessionLocal
 from app.models.detector import Detector
+from app.replicas import get_read_db
 from app.schemas.detector import DetectorCreate
 from app.services.entity_management import get_or_create_detector
+from app.serialization import list_response
 
 router = APIRouter(prefix="/detectors", tags=["Detectors"])
 
@@ -46,11 +48,12 @@ def create_detector(detector: DetectorCreate, db: Session = Depends(get_db)):
         )
 
 @router.get("/")
-def list_detectors(db: Session = Depends(get_db)):
-    return db.query(Detector).all()
+def list_detectors(db: Session = Depends(get_read_db)):
+    # match_key : clé de dédoublonnage interne (app/services/catalog.py)
+    return list_response(db, Detector, exclude=("match_key",))
 
 @router.get("/types")
-def get_detector_types(db: Session = Depends(get_db)):
+def get_detector_types(db: Session = Depends(get_read_db)):
     """
     Retourne la liste des types de détecteurs existants (sans doublons).
     """
@@ -58,7 +61,7 @@ def get_detector_types(db: Session = Depends(get_db)):
     return [t[0] for t in types if t[0] is not None]
 
 @router.get("/manufacturers/{detector_type}")
-def get_manufacturers(detector_type: str, db: Session = Depends(get_db)):
+def get_manufacturers(detector_type: str, db: Session = Depends(get_read_db)):
     """
     Retourne la liste des fabricants pour un type de détecteur donné.
     
@@ -70,7 +73,7 @@ def get_manufacturers(detector_type: str, db: Session = Depends(get_db)):
     return [m[0] for m in manufacturers if m[0] is not None]
 
 @router.get("/models/{detector_type}/{manufacturer}")
-def get_models(detector_type: str, manufacturer: str, db: Session = Depends(get_db)):
+def get_models(detector_type: str, manufacturer: str, db: Session = Depends(get_read_db)):
     """
     Retourne la liste des modèles pour un type de détecteur et un fabricant donnés.
     
@@ -1,20 +1,46 @@
-import os
-import shutil
 import json
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, status
+import logging
+import mimetypes
+import os
+import secrets
+from datetime import timedelta
+from typing import Optional
+
+import numpy as np
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Form, Depends, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import DatabaseError
 
 from app.database import SessionLocal
 from app.models.donnee import Donnee
+from app.models.donnee_features import DonneeFeatures
 from app.models.column_mapping import ColumnMapping
+from app.models.article import Article
 from app.models.experience import Experience
-from app.schemas.donnee import DonneeCreate, ColumnMappingBase
+from app.models.experience_machine import ExperienceMachine
+from app.models.machine import Machine
+from app.cache import IMMUTABLE, etag_matches
+from app.replicas import get_read_db
+from app.schemas.donnee import (
+    ColumnMappingBase, CurveQuery, DonneeCreate, DonneeOut, DownloadUrlOut, UploadComplete, UploadUrlOut,
+    UploadUrlRequest,
+)
+from app.tracing import span
+from app.serialization import FastJSONResponse, list_response, rows_to_dicts
+from app.storage import (
+    STORAGE_PUBLIC_URL, STORAGE_URL_TTL_SECONDS, StorageError, content_disposition, download_url, file_stat,
+    is_local, iter_chunks, storage,
+)
+from app.services.changes import record_change, utcnow
+from app.services.features import FEATURE_COLUMNS, compute_features_task
+from app.services.preview import PREVIEW_BYTES, UnsupportedPreviewError, preview_sample
+from app.services import similarity
 
 router = APIRouter(prefix="/donnees", tags=["Donnees"])
 
-UPLOAD_DIR = "data/uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+logger = logging.getLogger(__name__)
 
 def get_db():
     db = SessionLocal()
@@ -23,38 +49,40 @@ def get_db():
     finally:
         db.close()
 
-@router.post("/upload/{experience_id}", status_code=status.HTTP_201_CREATED)
-def upload_donnee(
-    experience_id: int,
-    file: UploadFile = File(...),
-    data_type: str = Form(...),
-    unit: str = Form(None),
-    description: str = Form(None),
-    columnMapping: str = Form(None),  # JSON string of column mappings
-    db: Session = Depends(get_db),
-):
-    # Vérifier que l'expérience existe
+def _get_experience(db, experience_id):
     experience = db.query(Experience).filter(Experience.experience_id == experience_id).first()
     if not experience:
         raise HTTPException(status_code=404, detail="Experience not found")
-    
+    return experience
+
+def _parse_column_mapping(columnMapping):
+    """Champ de formulaire columnMapping (chaîne JSON) -> liste de mappings."""
+    if not columnMapping:
+        return None
+    try:
+        return json.loads(columnMapping)
+    except json.JSONDecodeError as e:
+        logger.info("Invalid columnMapping format: %s", e)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid columnMapping format: {str(e)}"
+        )
+
+def _create_donnee(db, experience, file_path, file_format, data_type, description, mappings):
+    """
+    Insère la donnée d'un fichier déjà stocké, ses colonnes et l'entrée du
+    journal des changements, puis valide la transaction.
+    """
     donnee_data = DonneeCreate(
         data_type=data_type,
-        unit=unit,
-        file_format=file.filename.split(".")[-1],
+        file_format=file_format,
         description=description,
     )
 
-    # Saving the file
-    file_path = f"{UPLOAD_DIR}/{experience_id}_{file.filename}"
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
     # Database insertion
     donnee = Donnee(
-        experience_id=experience_id,
+        experience_id=experience.experience_id,
         data_type=donnee_data.data_type,
-        unit=donnee_data.unit,
         file_format=donnee_data.file_format,
         file_path=file_path,
         description=donnee_data.description,
@@ -65,68 +93,65 @@ def upload_donnee(
         db.flush()  # Flush to get the donnee.data_id before creating column mappings
     except DatabaseError as e:
         db.rollback()
-        print(f"❌ Database Error during donnee creation: {str(e)}")
+        logger.warning("Database error during donnee creation: %s", e)
         raise HTTPException(
             status_code=409,
             detail=f"Database Error: {str(e)}"
         )
     except Exception as e:
         db.rollback()
-        print(f"❌ Error during donnee creation: {str(e)}")
+        logger.exception("Error during donnee creation")
         raise HTTPException(
             status_code=500,
             detail=f"Error: {str(e)}"
         )
 
     # Create column mappings if provided
-    if columnMapping:
-        try:
-            print(f"📝 Processing columnMapping: {columnMapping}")
-            mappings = json.loads(columnMapping)
-            print(f"📝 Parsed mappings: {mappings}")
-            if isinstance(mappings, list):
-                for mapping in mappings:
-                    # Support both camelCase (from frontend) and snake_case
-                    column_name = mapping.get("column_name") or mapping.get("name")
-                    data_type = mapping.get("data_type") or mapping.get("dataType")
-                    column_description = mapping.get("column_description") or mapping.get("description")
-                    unit = mapping.get("unit")
-                    
-                    print(f"📝 Creating mapping - name: {column_name}, type: {data_type}, unit: {unit}")
-                    
-                    # Only create if we have at least column_name and data_type
-                    if column_name and data_type:
-                        column_map = ColumnMapping(
-                            data_id=donnee.data_id,
-                            column_name=column_name,
-                            column_description=column_description,
-                            data_type=data_type,
-                            unit=unit,
-                        )
-                        db.add(column_map)
-                    else:
-                        print(f"⚠️ Skipping incomplete mapping - name: {column_name}, type: {data_type}")
-        except (json.JSONDecodeError, KeyError) as e:
-            db.rollback()
-            print(f"❌ Invalid columnMapping format: {str(e)}")
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid columnMapping format: {str(e)}"
-            )
+    if isinstance(mappings, list):
+        with span("mappings"):
+            for mapping in mappings:
+                # Support both camelCase (from frontend) and snake_case
+                column_name = mapping.get("column_name") or mapping.get("name")
+                data_type = mapping.get("data_type") or mapping.get("dataType")
+                column_description = mapping.get("column_description") or mapping.get("description")
+                unit = mapping.get("unit")
+
+                # Only create if we have at least column_name and data_type
+                if column_name and data_type:
+                    column_map = ColumnMapping(
+                        data_id=donnee.data_id,
+                        ingested_at=donnee.ingested_at,
+                        column_name=column_name,
+                        column_description=column_description,
+                        data_type=data_type,
+                        unit=unit,
+                    )
+                    db.add(column_map)
+                else:
+                    logger.debug(
+                        "Skipping incomplete column mapping",
+                        extra={"column_name": column_name, "data_type": data_type},
+                    )
+
+    record_change(db, "donnee", "created", donnee.data_id, experience.experience_id, experience.article_id)
 
     try:
-        db.commit()
-        print(f"✅ Donnee and column mappings committed successfully")
+        with span("commit"):
+            db.commit()
+        logger.info(
+            "Donnee committed",
+            extra={"experience_id": experience.experience_id, "data_id": donnee.data_id},
+        )
     except DatabaseError as e:
         db.rollback()
-        print(f"❌ Database Error during commit: {str(e)}")
+        logger.warning("Database error during commit: %s", e)
         raise HTTPException(
             status_code=409,
             detail=f"Database Error: {str(e)}"
         )
     except Exception as e:
         db.rollback()
-        print(f"❌ Error during commit: {str(e)}")
+        logger.exception("Error during commit")
         raise HTTPException(
             status_code=500,
             detail=f"Error: {str(e)}"
@@ -135,6 +160,325 @@ def upload_donnee(
     db.refresh(donnee)
     return donnee
 
+@router.post("/upload/{experience_id}", status_code=status.HTTP_201_CREATED)
+def upload_donnee(
+    experience_id: int,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    data_type: str = Form(...),
+    unit: str = Form(None),  # accepté pour compatibilité ; les unités sont portées par les colonnes
+    description: str = Form(None),
+    columnMapping: str = Form(None),  # JSON string of column mappings
+    db: Session = Depends(get_db),
+):
+    # Vérifier que l'expérience existe
+    experience = _get_experience(db, experience_id)
+    mappings = _parse_column_mapping(columnMapping)
+
+    # Saving the file (clé unique : un second envoi du même nom n'écrase pas le premier)
+    with span("file_write"):
+        file_path = storage.save(_direct_upload_key(experience_id, file.filename), file.file)
+
+    donnee = _create_donnee(
+        db, experience, file_path, file.filename.split(".")[-1], data_type, description, mappings,
+    )
+    # Grandeurs dosimétriques et vecteur de forme calculés après la réponse
+    background_tasks.add_task(compute_features_task, [donnee.data_id])
+    return donnee
+
+def _direct_upload_key(experience_id, filename):
+    # Suffixe aléatoire : deux envois du même nom ne s'écrasent pas, et la
+    # clé identifie l'envoi signé lors de sa complétion
+    return f"{experience_id}_{secrets.token_hex(8)}_{filename}"
+
+def _signed_url(request, url):
+    """URL du stockage local (relative) préfixée par STORAGE_PUBLIC_URL ou l'URL de l'API."""
+    if url.startswith("/"):
+        return (STORAGE_PUBLIC_URL or str(request.base_url).rstrip("/")) + url
+    return url
+
+@router.post("/upload-url/{experience_id}", response_model=UploadUrlOut)
+def create_upload_url(
+    experience_id: int,
+    payload: UploadUrlRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """
+    URL signée d'envoi direct d'un fichier au stockage (PUT du contenu brut
+    avec les en-têtes `headers`, valable STORAGE_URL_TTL_SECONDS), sans
+    passer par un worker de l'API. Création seule : un second PUT sur la
+    même clé est refusé (409 en local, 412 sur S3). Le fichier envoyé, POST /donnees/upload-complete/{experience_id} avec la
+    clé renvoyée crée la donnée.
+    """
+    _get_experience(db, experience_id)
+    filename = os.path.basename(payload.filename.replace("\\", "/"))
+    if filename in ("", ".", ".."):
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    key = _direct_upload_key(experience_id, filename)
+    try:
+        url, headers = storage.upload_url(key, STORAGE_URL_TTL_SECONDS)
+    except StorageError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {
+        "key": key,
+        "url": _signed_url(request, url),
+        "method": "PUT",
+        "headers": headers,
+        "expires_at": utcnow() + timedelta(seconds=STORAGE_URL_TTL_SECONDS),
+    }
+
+@router.post("/upload-complete/{experience_id}", response_model=DonneeOut, status_code=status.HTTP_201_CREATED)
+def complete_upload(
+    experience_id: int,
+    payload: UploadComplete,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """
+    Crée la donnée d'un fichier envoyé par URL signée : colonnes, journal
+    des changements, calcul des grandeurs en tâche de fond. Le fichier n'est
+    pas relu, seule sa présence est vérifiée. Rejouer la complétion d'une
+    même clé renvoie la donnée existante (200).
+    """
+    experience = _get_experience(db, experience_id)
+    key = payload.key
+    if not key.startswith(f"{experience_id}_") or "/" in key or "\\" in key:
+        raise HTTPException(status_code=400, detail="Invalid upload key")
+    file_path = storage.location(key)
+
+    existing = db.query(Donnee).filter(
+        Donnee.experience_id == experience_id, Donnee.file_path == file_path,
+    ).first()
+    if existing:
+        response.status_code = status.HTTP_200_OK
+        return existing
+    try:
+        file_stat(file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=409, detail="File not uploaded")
+
+    donnee = _create_donnee(
+        db, experience, file_path, key.split(".")[-1], payload.data_type, payload.description,
+        payload.columnMapping,
+    )
+    background_tasks.add_task(compute_features_task, [donnee.data_id])
+    return donnee
+
 @router.get("/")
-def list_donnees(db: Session = Depends(get_db)):
-    return db.query(Donnee).all()
+def list_donnees(db: Session = Depends(get_read_db)):
+    return list_response(db, Donnee)
+
+@router.get("/search")
+def search_donnees(
+    data_type: Optional[str] = Query(None, description="pdd, profile..."),
+    dmax_from_mm: Optional[float] = Query(None),
+    dmax_to_mm: Optional[float] = Query(None),
+    d10_from_pct: Optional[float] = Query(None),
+    d10_to_pct: Optional[float] = Query(None),
+    d20_from_pct: Optional[float] = Query(None),
+    d20_to_pct: Optional[float] = Query(None),
+    r50_from_mm: Optional[float] = Query(None),
+    r50_to_mm: Optional[float] = Query(None),
+    field_width_from_mm: Optional[float] = Query(None),
+    field_width_to_mm: Optional[float] = Query(None),
+    penumbra_from_mm: Optional[float] = Query(None),
+    penumbra_to_mm: Optional[float] = Query(None),
+    flatness_to_pct: Optional[float] = Query(None),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Recherche des données par grandeurs dosimétriques extraites des fichiers
+    (table donnee_features, une colonne indexée par grandeur), ex. profils
+    de pénombre 80/20 < 4 mm : `?data_type=profile&penumbra_to_mm=4`.
+
+    Les bornes sont inclusives ; une donnée dont la grandeur n'a pas pu être
+    calculée n'est pas retenue par un filtre sur cette grandeur.
+    """
+    ranges = (
+        (DonneeFeatures.dmax_mm, dmax_from_mm, dmax_to_mm),
+        (DonneeFeatures.d10_pct, d10_from_pct, d10_to_pct),
+        (DonneeFeatures.d20_pct, d20_from_pct, d20_to_pct),
+        (DonneeFeatures.r50_mm, r50_from_mm, r50_to_mm),
+        (DonneeFeatures.field_width_mm, field_width_from_mm, field_width_to_mm),
+        (DonneeFeatures.penumbra_mm, penumbra_from_mm, penumbra_to_mm),
+        (DonneeFeatures.flatness_pct, None, flatness_to_pct),
+    )
+    query = (
+        select(
+            Donnee.data_id, Donnee.experience_id, Donnee.data_type, Donnee.description,
+            *(getattr(DonneeFeatures, name) for name in FEATURE_COLUMNS),
+        )
+        .join(DonneeFeatures, DonneeFeatures.data_id == Donnee.data_id)
+        .where(DonneeFeatures.status == "ok")
+    )
+    if data_type:
+        query = query.where(Donnee.data_type == data_type)
+    for column, low, high in ranges:
+        if low is not None:
+            query = query.where(column >= low)
+        if high is not None:
+            query = query.where(column <= high)
+    result = db.execute(query.order_by(Donnee.data_id).limit(limit))
+    return FastJSONResponse(rows_to_dicts(result))
+
+@router.post("/similar")
+def similar_donnees(query: CurveQuery, db: Session = Depends(get_read_db)):
+    """
+    Données dont la courbe ressemble le plus à la courbe fournie (même type
+    de donnée), par corrélation des vecteurs de forme : index IVF sur disque
+    et données ajoutées depuis sa construction (app/services/similarity.py).
+
+    Retourne les k meilleures avec leur expérience, article et machines.
+    """
+    if len(query.x) != len(query.y):
+        raise HTTPException(status_code=422, detail="x and y must have the same length")
+    x = np.asarray(query.x, dtype=float)
+    y = np.asarray(query.y, dtype=float)
+    order = np.argsort(x, kind="stable")
+    vector = similarity.curve_vector(x[order], y[order])
+    if vector is None:
+        raise HTTPException(status_code=422, detail="Curve is flat or has no extent")
+
+    with span("similarity_search"):
+        matches, stats = similarity.search(db, query.data_type, vector, k=query.k)
+    if not matches:
+        return {"results": [], **stats}
+
+    data_ids = [data_id for data_id, _ in matches]
+    rows = {
+        row["data_id"]: row
+        for row in rows_to_dicts(db.execute(
+            select(
+                Donnee.data_id, Donnee.data_type, Donnee.description,
+                Experience.experience_id, Experience.description.label("experience_description"),
+                Article.article_id, Article.titre, Article.doi,
+            )
+            .join(Experience, Experience.experience_id == Donnee.experience_id)
+            .join(Article, Article.article_id == Experience.article_id)
+            .where(Donnee.data_id.in_(data_ids))
+        ))
+    }
+    machines = {}
+    for experience_id, constructeur, modele, energy in db.execute(
+        select(ExperienceMachine.experience_id, Machine.constructeur, Machine.modele, ExperienceMachine.energy)
+        .join(Machine, Machine.machine_id == ExperienceMachine.machine_id)
+        .where(ExperienceMachine.experience_id.in_({row["experience_id"] for row in rows.values()}))
+    ):
+        machines.setdefault(experience_id, []).append(
+            {"constructeur": constructeur, "modele": modele, "energy": energy}
+        )
+    results = [
+        {**rows[data_id], "score": round(score, 4), "machines": machines.get(rows[data_id]["experience_id"], [])}
+        for data_id, score in matches if data_id in rows
+    ]
+    return FastJSONResponse({"results": results, **stats})
+
+@router.post("/preview")
+async def preview_donnee(request: Request):
+    """
+    Aperçu d'un fichier avant soumission : encodage, séparateur, en-tête,
+    type de chaque colonne et colonnes proposées à l'assistant (unités lues
+    dans l'en-tête).
+
+    Le corps de la requête est le contenu brut du fichier, ou son début
+    (l'assistant n'envoie que les PREVIEW_BYTES premiers octets) ; seuls
+    PREVIEW_BYTES octets sont lus, quelle que soit la taille envoyée.
+    """
+    sample = b""
+    complete = True
+    async for chunk in request.stream():
+        sample += chunk
+        if len(sample) > PREVIEW_BYTES:
+            sample = sample[:PREVIEW_BYTES]
+            complete = False
+            break
+    if not sample.strip():
+        raise HTTPException(status_code=422, detail="Empty file")
+    try:
+        with span("preview_sniff"):
+            preview = preview_sample(sample, complete)
+    except UnsupportedPreviewError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    return FastJSONResponse(preview)
+
+@router.get("/{data_id}/features")
+def get_donnee_features(data_id: int, db: Session = Depends(get_read_db)):
+    """
+    Grandeurs extraites du fichier d'une donnée. 404 tant que le calcul
+    (tâche de fond après l'upload) n'a pas abouti.
+    """
+    features = db.get(DonneeFeatures, data_id)
+    if features is None:
+        raise HTTPException(status_code=404, detail="Features not computed")
+    return {
+        "data_id": data_id,
+        "status": features.status,
+        "detail": features.detail,
+        "version": features.version,
+        **{name: getattr(features, name) for name in FEATURE_COLUMNS},
+    }
+
+@router.get("/{data_id}", response_model=DonneeOut)
+def get_donnee(data_id: int, db: Session = Depends(get_read_db)):
+    """
+    Récupère une donnée et ses ColumnMapping.
+
+    Une donnée n'est jamais modifiée après l'upload : la réponse est immuable
+    (voir app/cache.py).
+    """
+    donnee = db.query(Donnee).filter(Donnee.data_id == data_id).first()
+    if not donnee:
+        raise HTTPException(status_code=404, detail="Donnee not found")
+    return donnee
+
+@router.get("/{data_id}/file")
+def download_donnee_file(data_id: int, request: Request, db: Session = Depends(get_read_db)):
+    """
+    Télécharge le fichier d'une donnée.
+
+    ETag fort dérivé de l'identifiant, de la taille et de la date du fichier ;
+    If-None-Match correspondant -> 304 sans relire le fichier.
+    """
+    donnee = db.query(Donnee).filter(Donnee.data_id == data_id).first()
+    if not donnee:
+        raise HTTPException(status_code=404, detail="Donnee not found")
+    try:
+        stat = file_stat(donnee.file_path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    etag = f'"{data_id}-{stat.size:x}-{stat.mtime_ns:x}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    filename = os.path.basename(donnee.file_path)
+    if is_local(donnee.file_path):
+        return FileResponse(donnee.file_path, filename=filename, headers=headers)
+    # Objet distant : relayé en flux, sans copie sur le disque du worker
+    headers.update({
+        "Content-Length": str(stat.size),
+        "Content-Disposition": content_disposition(filename),
+    })
+    return StreamingResponse(
+        iter_chunks(donnee.file_path),
+        media_type=mimetypes.guess_type(filename)[0] or "text/plain",
+        headers=headers,
+    )
+
+@router.get("/{data_id}/download-url", response_model=DownloadUrlOut)
+def get_download_url(data_id: int, request: Request, db: Session = Depends(get_read_db)):
+    """
+    URL signée de téléchargement direct depuis le stockage (valable
+    STORAGE_URL_TTL_SECONDS) : les octets ne passent pas par l'API.
+    """
+    donnee = db.query(Donnee).filter(Donnee.data_id == data_id).first()
+    if not donnee:
+        raise HTTPException(status_code=404, detail="Donnee not found")
+    try:
+        url = download_url(donnee.file_path, os.path.basename(donnee.file_path), STORAGE_URL_TTL_SECONDS)
+    except StorageError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"url": _signed_url(request, url), "expires_at": utcnow() + timedelta(seconds=STORAGE_URL_TTL_SECONDS)}
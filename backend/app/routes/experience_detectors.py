@@ -5,10 +5,14 @@ from app.database import SessionLocal
 from app.models.experience_detector import ExperienceDetector
 from app.models.detector import Detector
 from app.models.experience import Experience
+from app.models.column_mapping import ColumnMapping
+from app.models.donnee import Donnee
 from app.schemas.experience_detector import (
     ExperienceDetectorCreate,
     ExperienceDetectorOut,
 )
+from app.services.changes import record_change
+from app.services.units import detector_link_values, length_unit_from_mappings
 
 router = APIRouter(prefix="/experiences", tags=["Experience-Detector"])
 
@@ -43,14 +47,24 @@ def add_detector_to_experience(
     if existing:
         raise HTTPException(status_code=409, detail="Detector already linked to this experience")
     
+    # Unité des valeurs saisies sans unité : celle des colonnes déjà déclarées
+    mappings = db.query(ColumnMapping.column_name, ColumnMapping.unit).join(ColumnMapping.donnee).filter(
+        Donnee.experience_id == experience_id
+    ).all()
+    length_unit = length_unit_from_mappings(
+        [{"name": name, "unit": unit} for name, unit in mappings]
+    )
+
     link = ExperienceDetector(
         experience_id=experience_id,
         detector_id=payload.detector_id,
         position=payload.position,
         depth=payload.depth,
-        orientation=payload.orientation
+        orientation=payload.orientation,
+        **detector_link_values(payload.position, payload.depth, length_unit),
     )
     db.add(link)
+    record_change(db, "experience_detector", "linked", detector.detecteur_id, experience_id, experience.article_id)
     db.commit()
     db.refresh(link)
     return link
@@ -6,6 +6,9 @@ from app.models.experience_machine import ExperienceMachine
 from app.models.machine import Machine
 from app.models.experience import Experience
 from app.schemas.experience_machine import ExperienceMachineCreate, ExperienceMachineOut
+from app.services.changes import record_change
+from app.services.units import machine_link_values
+from app.services.validation import EnergyValidationError, validate_experiment_machine
 
 router = APIRouter(prefix="/experiences", tags=["Experience-Machine"])
 
@@ -39,15 +42,26 @@ def add_machine_to_experience(
     ).first()
     if existing:
         raise HTTPException(status_code=409, detail="Machine already linked to this experience")
+
+    # Vérifier l'énergie avec le catalogue de référence
+    try:
+        validate_experiment_machine(machine, payload.energy)
+    except EnergyValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "Energy incompatible with machine", "issues": e.issues},
+        )
     
     link = ExperienceMachine(
         experience_id=experience_id,
         machine_id=payload.machine_id,
         energy=payload.energy,
         collimation=payload.collimation,
-        settings=payload.settings
+        settings=payload.settings,
+        **machine_link_values(payload.energy, payload.collimation, machine.type_machine),
     )
     db.add(link)
+    record_change(db, "experience_machine", "linked", machine.machine_id, experience_id, experience.article_id)
     db.commit()
     db.refresh(link)
     return link
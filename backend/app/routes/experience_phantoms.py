@@ -6,6 +6,7 @@ from app.models.experience_phantom import ExperiencePhantom
 from app.models.phantom import Phantom
 from app.models.experience import Experience
 from app.schemas.experience_phantom import ExperiencePhantomCreate, ExperiencePhantomOut
+from app.services.changes import record_change
 
 router = APIRouter(prefix="/experiences", tags=["Experience-Phantom"])
 
@@ -45,6 +46,7 @@ def add_phantom_to_experience(
         phantom_id=payload.phantom_id
     )
     db.add(link)
+    record_change(db, "experience_phantom", "linked", phantom.phantom_id, experience_id, experience.article_id)
     db.commit()
     db.refresh(link)
     return link
@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
@@ -8,7 +11,11 @@ from app.models.experience_machine import ExperienceMachine
 from app.models.experience_phantom import ExperiencePhantom
 from app.models.experience_detector import ExperienceDetector
 from app.models.article import Article
-from app.schemas.experience import ExperienceCreate
+from app.replicas import get_read_db
+from app.schemas.experience import ExperienceCreate, ExperienceSummaryQuery
+from app.serialization import FastJSONResponse, rows_to_dicts
+from app.services.changes import record_change
+from app.services.summaries import build_summaries
 
 router = APIRouter(prefix="/experiences", tags=["Experiences"])
 
@@ -40,6 +47,9 @@ def create_experience(experience: ExperienceCreate, db: Session = Depends(get_db
     db.add(db_experience)
 
     try:
+        db.flush()
+        record_change(db, "experience", "created", db_experience.experience_id,
+                      db_experience.experience_id, db_experience.article_id)
         db.commit()
     except IntegrityError:
         db.rollback()
@@ -59,83 +69,79 @@ def create_experience(experience: ExperienceCreate, db: Session = Depends(get_db
 
 # --- List all Experiences ---
 @router.get("/")
-def list_experiences(db: Session = Depends(get_db)):
-    experiences = db.query(Experience).all()
-    return [
-        {
-            "experience_id": e.experience_id,
-            "description": e.description,
-            "article_id": e.article_id
-        }
-        for e in experiences
-    ]
+def list_experiences(
+    energy_from: Optional[float] = Query(None, description="Énergie minimale"),
+    energy_to: Optional[float] = Query(None, description="Énergie maximale"),
+    energy_unit: str = Query("MV", pattern="^(MV|MeV)$"),
+    field_size_from: Optional[float] = Query(None, description="Taille de champ minimale (cm²)"),
+    field_size_to: Optional[float] = Query(None, description="Taille de champ maximale (cm²)"),
+    depth_from_mm: Optional[float] = Query(None),
+    depth_to_mm: Optional[float] = Query(None),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Liste des expériences, filtrables par plage sur les valeurs normalisées
+    des liaisons : une expérience est retenue si l'une de ses machines
+    (resp. l'un de ses détecteurs) a une plage qui recoupe celle demandée
+    ("6, 10, 15 MV" recoupe 8-12 MV).
+    """
+    query = select(Experience.experience_id, Experience.description, Experience.article_id)
+
+    machine_filters = []
+    if energy_from is not None or energy_to is not None:
+        machine_filters.append(ExperienceMachine.energy_unit == energy_unit)
+    if energy_to is not None:
+        machine_filters.append(ExperienceMachine.energy_min <= energy_to)
+    if energy_from is not None:
+        machine_filters.append(ExperienceMachine.energy_max >= energy_from)
+    if field_size_from is not None:
+        machine_filters.append(ExperienceMachine.field_size_cm2 >= field_size_from)
+    if field_size_to is not None:
+        machine_filters.append(ExperienceMachine.field_size_cm2 <= field_size_to)
+    if machine_filters:
+        query = query.where(
+            select(ExperienceMachine.experience_id).where(
+                ExperienceMachine.experience_id == Experience.experience_id, *machine_filters
+            ).exists()
+        )
+
+    detector_filters = []
+    if depth_to_mm is not None:
+        detector_filters.append(ExperienceDetector.depth_min_mm <= depth_to_mm)
+    if depth_from_mm is not None:
+        detector_filters.append(ExperienceDetector.depth_max_mm >= depth_from_mm)
+    if detector_filters:
+        query = query.where(
+            select(ExperienceDetector.experience_id).where(
+                ExperienceDetector.experience_id == Experience.experience_id, *detector_filters
+            ).exists()
+        )
+
+    result = db.execute(query)
+    return FastJSONResponse(rows_to_dicts(result))
+
+
+# --- Get Summaries (batch) ---
+@router.post("/summaries")
+def get_experiment_summaries(query: ExperienceSummaryQuery, db: Session = Depends(get_read_db)):
+    """
+    Résumés de plusieurs expériences en une requête (pages article et
+    tableau de bord), construits avec un nombre fixe de requêtes SQL.
+
+    Retourne les résumés dans l'ordre demandé et les identifiants inconnus.
+    """
+    summaries = build_summaries(db, query.ids)
+    ordered = list(dict.fromkeys(query.ids))
+    return FastJSONResponse({
+        "summaries": [summaries[i] for i in ordered if i in summaries],
+        "missing": [i for i in ordered if i not in summaries],
+    })
 
 
 # --- Get Summary for Wizard ---
 @router.get("/{experience_id}/summary")
-def get_experiment_summary(experience_id: int, db: Session = Depends(get_db)):
-    experience = db.query(Experience).filter(
-        Experience.experience_id == experience_id
-    ).first()
-
-    if not experience:
+def get_experiment_summary(experience_id: int, db: Session = Depends(get_read_db)):
+    summary = build_summaries(db, [experience_id]).get(experience_id)
+    if summary is None:
         raise HTTPException(status_code=404, detail="Expérience non trouvée")
-
-    # Machines associées
-    machines = [
-        {
-            "constructeur": m.machine.constructeur,
-            "modele": m.machine.modele,
-            "type_machine": m.machine.type_machine,
-            "energy": m.energy,
-            "collimation": m.collimation,
-            "settings": m.settings,
-        }
-        for m in experience.machines
-    ]
-
-    # Phantoms associés
-    phantoms = [
-        {
-            "phantom_type": p.phantom.phantom_type,
-            "manufacturer": p.phantom.manufacturer,
-            "model": p.phantom.model,
-            "dimensions": p.phantom.dimensions,
-            "material": p.phantom.material,
-            "position": p.position,
-            "orientation": p.orientation,
-        }
-        for p in experience.phantoms
-    ]
-
-    # Détecteurs associés
-    detectors = [
-        {
-            "type_detecteur": d.detector.type_detecteur,
-            "modele": d.detector.modele,
-            "constructeur": d.detector.constructeur,
-            "position": d.position,
-            "depth": d.depth,
-            "orientation": d.orientation,
-        }
-        for d in experience.detectors
-    ]
-
-    # Données uploadées
-    data_files = [
-        {
-            "file_path": f.file_path,
-            "data_type": f.data_type,
-            "unit": f.unit,
-            "description": f.description,
-        }
-        for f in experience.donnees
-    ]
-
-    return {
-        "description": experience.description,
-        "machines": machines,
-        "phantoms": phantoms,
-        "detectors": detectors,
-        "data": data_files,
-    }
+    return FastJSONResponse(summary)
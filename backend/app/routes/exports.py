@@ -0,0 +1,50 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.replicas import get_read_db
+from app.services.export import (
+    EXPORT_MAX_EXPERIENCES,
+    archive_response,
+    build_manifest,
+    find_experience_ids,
+)
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+@router.get("/")
+def export_query(
+    article_id: Optional[List[int]] = Query(None),
+    data_type: Optional[str] = None,
+    machine_model: Optional[str] = None,
+    detector_model: Optional[str] = None,
+    phantom_model: Optional[str] = None,
+    archive_format: str = Query("zip", alias="format", pattern="^(zip|tar)$"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Exporte les expériences correspondant aux filtres en une seule archive zip ou tar.
+
+    Filtres combinés (ET) : article_id (répétable), data_type, modèles de
+    machine / détecteur / fantôme. Au plus EXPORT_MAX_EXPERIENCES expériences.
+    """
+    experience_ids = find_experience_ids(
+        db,
+        article_ids=article_id,
+        data_type=data_type,
+        machine_model=machine_model,
+        detector_model=detector_model,
+        phantom_model=phantom_model,
+        limit=EXPORT_MAX_EXPERIENCES + 1,
+    )
+    if not experience_ids:
+        raise HTTPException(status_code=404, detail="No experience matches the filters")
+    if len(experience_ids) > EXPORT_MAX_EXPERIENCES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many experiences (max {EXPORT_MAX_EXPERIENCES}), narrow the filters"
+        )
+
+    manifest = build_manifest(db, experience_ids)
+    return archive_response(manifest, archive_format, "export")
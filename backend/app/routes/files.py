@@ -1,11 +1,11 @@
 from fastapi import APIRouter, UploadFile, File, status
 
+from app.storage import storage
+
 router = APIRouter(prefix="/files", tags=["Files"])
 
 @router.post("/upload/{experiment_id}", status_code=status.HTTP_201_CREATED)
 def upload_file(experiment_id: int, file: UploadFile = File(...)):
-    path = f"data/uploads/{experiment_id}_{file.filename}"
-    with open(path, "wb") as f:
-        f.write(file.file.read())
+    path = storage.save(f"{experiment_id}_{file.filename}", file.file)
 
     return {"filename": file.filename, "path": path}
@@ -0,0 +1,53 @@
+import logging
+import os
+import shutil
+import uuid
+
+from fastapi import APIRouter, BackgroundTasks, File, HTTPException, UploadFile
+from sqlalchemy.exc import DatabaseError
+
+from app.database import engine
+from app.services.bulk_import import ImportManifestError, extract_archive, import_directory
+from app.services.features import extract_pending
+from app.storage import UPLOAD_DIR
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/import", tags=["Import"])
+
+
+@router.post("/")
+def import_archive(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    """
+    Importe une archive zip ou tar au format de l'export (manifest.json + fichiers).
+
+    Les équipements sont résolus par lots, les fichiers copiés vers le
+    stockage (app/storage.py) et les lignes chargées en masse. Retourne les
+    compteurs de l'import. Les grandeurs dosimétriques des données importées
+    sont calculées en tâche de fond, après la réponse.
+    """
+    # Répertoire de travail sur le même volume que les uploads
+    work_dir = os.path.join(UPLOAD_DIR, ".import", uuid.uuid4().hex)
+    os.makedirs(work_dir)
+    try:
+        archive_path = os.path.join(work_dir, "archive")
+        with open(archive_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer, 1024 * 1024)
+        source_dir = os.path.join(work_dir, "content")
+        os.makedirs(source_dir)
+        extract_archive(archive_path, source_dir)
+        os.remove(archive_path)
+
+        stats = import_directory(engine, source_dir)
+    except ImportManifestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DatabaseError as e:
+        logger.warning("Bulk import rolled back: %s", e)
+        raise HTTPException(status_code=409, detail="Database Error")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    logger.info("Bulk import complete", extra=stats)
+    if stats.get("donnees"):
+        background_tasks.add_task(extract_pending, engine)
+    return stats
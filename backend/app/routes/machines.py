@@ -4,8 +4,10 @@ from sqlalchemy.exc import DatabaseError
 
 from app.database import SessionLocal
 from app.models.machine import Machine
+from app.replicas import get_read_db
 from app.schemas.machine import MachineCreate
 from app.services.entity_management import get_or_create_machine
+from app.serialization import list_response
 
 router = APIRouter(prefix="/machines", tags=["Machines"])
 
@@ -46,11 +48,12 @@ def create_machine(machine: MachineCreate, db: Session = Depends(get_db)):
         )
 
 @router.get("/")
-def list_machines(db: Session = Depends(get_db)):
-    return db.query(Machine).all()
+def list_machines(db: Session = Depends(get_read_db)):
+    # match_key : clé de dédoublonnage interne (app/services/catalog.py)
+    return list_response(db, Machine, exclude=("match_key",))
 
 @router.get("/types")
-def get_machine_types(db: Session = Depends(get_db)):
+def get_machine_types(db: Session = Depends(get_read_db)):
     """
     Retourne la liste des types de machines existants (sans doublons).
     """
@@ -58,7 +61,7 @@ def get_machine_types(db: Session = Depends(get_db)):
     return [t[0] for t in types if t[0] is not None]
 
 @router.get("/manufacturers/{machine_type}")
-def get_manufacturers(machine_type: str, db: Session = Depends(get_db)):
+def get_manufacturers(machine_type: str, db: Session = Depends(get_read_db)):
     """
     Retourne la liste des fabricants pour un type de machine donné.
     
@@ -70,7 +73,7 @@ def get_manufacturers(machine_type: str, db: Session = Depends(get_db)):
     return [m[0] for m in manufacturers if m[0] is not None]
 
 @router.get("/models/{machine_type}/{manufacturer}")
-def get_models(machine_type: str, manufacturer: str, db: Session = Depends(get_db)):
+def get_models(machine_type: str, manufacturer: str, db: Session = Depends(get_read_db)):
     """
     Retourne la liste des modèles pour un type de machine et un fabricant donnés.
     
@@ -4,8 +4,10 @@ from sqlalchemy.exc import DatabaseError
 
 from app.database import SessionLocal
 from app.models.phantom import Phantom
+from app.replicas import get_read_db
 from app.schemas.phantom import PhantomCreate
 from app.services.entity_management import get_or_create_phantom
+from app.serialization import list_response
 
 router = APIRouter(prefix="/phantoms", tags=["Phantoms"])
 
@@ -49,11 +51,12 @@ def create_phantom(phantom: PhantomCreate, db: Session = Depends(get_db)):
         )
 
 @router.get("/")
-def list_phantoms(db: Session = Depends(get_db)):
-    return db.query(Phantom).all()
+def list_phantoms(db: Session = Depends(get_read_db)):
+    # match_key : clé de dédoublonnage interne (app/services/catalog.py)
+    return list_response(db, Phantom, exclude=("match_key",))
 
 @router.get("/manufacturers/{phantom_type}")
-def get_manufacturers(phantom_type: str, db: Session = Depends(get_db)):
+def get_manufacturers(phantom_type: str, db: Session = Depends(get_read_db)):
     """
     Retourne la liste des fabricants de fantômes pour un type donné.
     
@@ -65,7 +68,7 @@ def get_manufacturers(phantom_type: str, db: Session = Depends(get_db)):
     return [m[0] for m in manufacturers if m[0] is not None]
 
 @router.get("/models/{phantom_type}")
-def get_models(phantom_type: str, db: Session = Depends(get_db)):
+def get_models(phantom_type: str, db: Session = Depends(get_read_db)):
     """
     Retourne la liste des modèles de fantômes pour un type donné.
     
@@ -77,7 +80,7 @@ def get_models(phantom_type: str, db: Session = Depends(get_db)):
     return [m[0] for m in models if m[0] is not None]
 
 @router.get("/dimensions/{phantom_type}/{manufacturer}/{model}")
-def get_dimensions(phantom_type: str, manufacturer: str, model: str, db: Session = Depends(get_db)):
+def get_dimensions(phantom_type: str, manufacturer: str, model: str, db: Session = Depends(get_read_db)):
     """
     Retourne la liste des dimensions pour un type, fabricant et modèle donnés.
     
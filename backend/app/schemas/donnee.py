@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Any, Dict, Optional, List
 
 class ColumnMappingBase(BaseModel):
     column_name: str
@@ -20,3 +21,32 @@ class DonneeOut(DonneeCreate):
 
     class Config:
         from_attributes = True
+
+class CurveQuery(BaseModel):
+    """Courbe de référence de POST /donnees/similar (abscisses dans un ordre quelconque)."""
+    data_type: str
+    x: List[float]
+    y: List[float]
+    k: int = Field(10, ge=1, le=100)
+
+class UploadUrlRequest(BaseModel):
+    """POST /donnees/upload-url/{experience_id} : fichier à envoyer directement au stockage."""
+    filename: str = Field(..., min_length=1, max_length=255)
+
+class UploadUrlOut(BaseModel):
+    key: str
+    url: str
+    method: str = "PUT"
+    headers: Dict[str, str] = {}  # à envoyer avec le PUT (S3 : If-None-Match)
+    expires_at: datetime
+
+class UploadComplete(BaseModel):
+    """POST /donnees/upload-complete/{experience_id} : métadonnées d'un fichier envoyé."""
+    key: str
+    data_type: str
+    description: Optional[str] = None
+    columnMapping: Optional[List[Dict[str, Any]]] = None
+
+class DownloadUrlOut(BaseModel):
+    url: str
+    expires_at: datetime
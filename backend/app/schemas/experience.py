@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from app.services.summaries import SUMMARY_BATCH_MAX
 
 class ExperienceCreate(BaseModel):
     description: str
@@ -11,3 +13,8 @@ class ExperienceOut(ExperienceCreate):
 
     class Config:
         orm_mode = True
+
+
+class ExperienceSummaryQuery(BaseModel):
+    """Corps de POST /experiences/summaries."""
+    ids: List[int] = Field(..., min_length=1, max_length=SUMMARY_BATCH_MAX)
@@ -24,5 +24,10 @@ class ExperienceDetectorCreate(BaseModel):
 class ExperienceDetectorOut(ExperienceDetectorCreate):
     experience_id: int
 
+    # Valeurs normalisées (mm) lues dans depth / position
+    depth_min_mm: Optional[float] = None
+    depth_max_mm: Optional[float] = None
+    position_mm: Optional[float] = None
+
     class Config:
         orm_mode = True
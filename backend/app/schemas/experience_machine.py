@@ -24,5 +24,11 @@ class ExperienceMachineCreate(BaseModel):
 class ExperienceMachineOut(ExperienceMachineCreate):
     experience_id: int
 
+    # Valeurs normalisées lues dans energy / collimation
+    energy_min: Optional[float] = None
+    energy_max: Optional[float] = None
+    energy_unit: Optional[str] = None
+    field_size_cm2: Optional[float] = None
+
     class Config:
         orm_mode = True
@@ -0,0 +1,59 @@
+"""
+Sérialisation JSON rapide des réponses volumineuses (listes, résumés).
+
+Les listes sont lues en lignes Core (tuples) plutôt qu'en objets ORM, puis
+encodées directement, sans passer par jsonable_encoder champ par champ.
+orjson est utilisé s'il est installé, sinon json de la bibliothèque
+standard (même sortie, plus lent).
+"""
+import json
+from datetime import date, datetime, time
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    """Types non JSON des lignes lues (ex. ingested_at), au format d'orjson (ISO 8601)."""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """Encode en JSON compact (UTF-8)."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default,
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encodée par orjson (repli sur json)."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def rows_to_dicts(result):
+    """Lignes d'un résultat Core -> liste de dicts (colonnes dans l'ordre du SELECT)."""
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def list_response(db, model, exclude=()):
+    """
+    Toutes les lignes de la table de `model`, colonnes dans l'ordre de la
+    table, hors colonnes internes `exclude`.
+    """
+    result = db.execute(select(*(c for c in model.__table__.columns if c.name not in exclude)))
+    return FastJSONResponse(rows_to_dicts(result))
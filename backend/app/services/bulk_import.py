@@ -0,0 +1,467 @@
+"""
+Import en masse d'un export (archive extraite) ou d'un répertoire de données externe.
+
+Le répertoire contient un manifest.json au format de l'export
+(voir app/services/export.py) et les fichiers qu'il référence (chemins
+relatifs au répertoire). Déroulement :
+
+1. les énergies des machines sont vérifiées contre le catalogue de
+   référence (app/services/validation.py) : une incompatibilité refuse le
+   manifeste avant toute écriture ; puis les équipements de tout le
+   manifeste sont résolus en une fois, avec les règles de
+   entity_management (resolve_machines / _detectors / _phantoms) ;
+2. les articles sont traités par lots ; pour chaque lot, les identifiants
+   sont réservés, les fichiers copiés en parallèle vers le stockage
+   (app/storage.py : répertoire d'upload ou bucket S3, pool de threads), puis les lignes chargées par COPY
+   (executemany sur SQLite) et committées en une transaction, avec leurs
+   lignes du journal des changements (change_log) ;
+3. après chaque lot, un fichier de checkpoint est mis à jour : un import
+   interrompu reprend au premier lot non committé.
+
+Les articles dont le DOI existe déjà sont réutilisés (leurs expériences y
+sont ajoutées).
+"""
+import hashlib
+import json
+import logging
+import os
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import Session
+
+from app.services.bulk_load import loader_for
+from app.services.changes import utcnow
+from app.services.entity_management import (
+    resolve_detectors,
+    resolve_machines,
+    resolve_phantoms,
+)
+from app.services.export import MANIFEST_FORMAT, MANIFEST_NAME
+from app.services.units import detector_link_values, length_unit_from_mappings, machine_link_values
+from app.services.validation import EnergyValidationError, validate_machine_links
+from app.storage import LocalStorage, delete_file, storage
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = ".import-checkpoint.json"
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "200"))  # articles par transaction
+IMPORT_COPY_WORKERS = int(os.getenv("IMPORT_COPY_WORKERS", "8"))
+
+
+class ImportManifestError(ValueError):
+    """Manifeste absent ou invalide."""
+
+
+def extract_archive(archive_path, destination):
+    """
+    Extrait une archive zip ou tar (éventuellement compressée) dans `destination`.
+
+    Les chemins absolus ou sortant du répertoire sont refusés.
+    """
+    root = os.path.realpath(destination)
+
+    def _check(name):
+        target = os.path.realpath(os.path.join(root, name))
+        if os.path.commonpath([root, target]) != root:
+            raise ImportManifestError(f"Chemin invalide dans l'archive : {name}")
+
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for name in archive.namelist():
+                _check(name)
+            archive.extractall(root)
+    elif tarfile.is_tarfile(archive_path):
+        with tarfile.open(archive_path) as archive:
+            for member in archive.getmembers():
+                _check(member.name)
+                if not (member.isfile() or member.isdir()):
+                    raise ImportManifestError(f"Entrée non supportée dans l'archive : {member.name}")
+            archive.extractall(root)
+    else:
+        raise ImportManifestError("Archive zip ou tar attendue")
+
+
+def load_manifest(source_dir):
+    """Lit et vérifie le manifeste ; retourne (manifeste, empreinte sha256)."""
+    path = os.path.join(source_dir, MANIFEST_NAME)
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        raise ImportManifestError(f"{MANIFEST_NAME} introuvable dans {source_dir}")
+    try:
+        manifest = json.loads(raw)
+    except ValueError as e:
+        raise ImportManifestError(f"{MANIFEST_NAME} invalide : {e}")
+    if manifest.get("format") != MANIFEST_FORMAT:
+        raise ImportManifestError(f"Format de manifeste non supporté : {manifest.get('format')!r}")
+    if not isinstance(manifest.get("articles"), list):
+        raise ImportManifestError("Le manifeste doit contenir une liste 'articles'")
+    return manifest, hashlib.sha256(raw).hexdigest()
+
+
+# --- Checkpoint ---
+
+def _read_checkpoint(path, digest):
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return None
+    if checkpoint.get("manifest_sha256") != digest:
+        raise ImportManifestError(
+            f"Le checkpoint {path} correspond à un autre manifeste ; supprimez-le pour recommencer"
+        )
+    return checkpoint
+
+
+def _write_checkpoint(path, checkpoint):
+    # Écriture atomique : un checkpoint n'est jamais lu à moitié écrit
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# --- Équipements ---
+
+def _machine_key(entry):
+    return entry.get("constructeur"), entry.get("modele"), entry.get("type_machine")
+
+
+def _detector_key(entry):
+    return entry.get("type_detecteur"), entry.get("modele"), entry.get("constructeur")
+
+
+def _phantom_key(entry):
+    return entry.get("manufacturer"), entry.get("model"), entry.get("phantom_type")
+
+
+def _validate_energies(manifest):
+    """Vérifie toutes les liaisons machine du manifeste ; ImportManifestError sinon."""
+    try:
+        validate_machine_links(
+            _machine_key(m) + (m.get("energy"),)
+            for a in manifest["articles"] for e in a.get("experiences", []) for m in e.get("machines", [])
+        )
+    except EnergyValidationError as e:
+        shown = [issue["reason"] for issue in e.issues[:20]]
+        more = f" (+{len(e.issues) - len(shown)} autres)" if len(e.issues) > len(shown) else ""
+        raise ImportManifestError("Énergies incompatibles : " + "; ".join(shown) + more)
+
+
+def _resolve_equipment(db: Session, manifest):
+    """Résout (et crée si besoin) tous les équipements du manifeste ; committé."""
+    experiences = [e for a in manifest["articles"] for e in a.get("experiences", [])]
+    machines = resolve_machines(db, (_machine_key(m) for e in experiences for m in e.get("machines", [])))
+    detectors = resolve_detectors(db, (_detector_key(d) for e in experiences for d in e.get("detectors", [])))
+    phantoms = resolve_phantoms(db, (
+        _phantom_key(p) + (p.get("dimensions"), p.get("material"))
+        for e in experiences for p in e.get("phantoms", [])
+    ))
+    db.commit()
+    return machines, detectors, phantoms
+
+
+# --- Lots ---
+
+def _reserve_ids(cursor, dialect_name, table, column, count):
+    """Réserve `count` identifiants de la séquence de `table`."""
+    if count == 0:
+        return []
+    if dialect_name == "postgresql":
+        cursor.execute(
+            f"SELECT nextval(pg_get_serial_sequence('{table}', '{column}')) "
+            "FROM generate_series(1, %s)",
+            (count,),
+        )
+        return [row[0] for row in cursor.fetchall()]
+    # SQLite : la transaction d'écriture est déjà ouverte (BEGIN IMMEDIATE)
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+    start = cursor.fetchone()[0] + 1
+    return list(range(start, start + count))
+
+
+def _existing_dois(cursor, dialect_name, dois):
+    if not dois:
+        return {}
+    placeholder = "%s" if dialect_name == "postgresql" else "?"
+    cursor.execute(
+        f"SELECT doi, article_id FROM articles WHERE doi IN ({', '.join(placeholder for _ in dois)})",
+        list(dois),
+    )
+    return dict(cursor.fetchall())
+
+
+def _probe_exists(cursor, dialect_name, probe):
+    table, column, value = probe
+    placeholder = "%s" if dialect_name == "postgresql" else "?"
+    cursor.execute(f"SELECT 1 FROM {table} WHERE {column} = {placeholder}", (value,))
+    return cursor.fetchone() is not None
+
+
+def _source_path(source_dir, name):
+    """Chemin du fichier référencé par le manifeste, s'il existe et reste dans source_dir."""
+    if not name:
+        return None
+    root = os.path.realpath(source_dir)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return None
+    return path
+
+
+def _plan_batch(cursor, dialect_name, articles, equipment, source_dir, target):
+    """
+    Attribue les identifiants d'un lot et prépare les lignes de chaque table.
+
+    Returns:
+        (tables, copies, stats, probe) : tables = [(table, colonnes, lignes)],
+        copies = [(source, clé, emplacement)], probe = ligne témoin du lot (ou None)
+    """
+    machines, detectors, phantoms = equipment
+    stats = {"articles_created": 0, "articles_reused": 0, "experiences": 0,
+             "donnees": 0, "column_mappings": 0, "missing_files": 0}
+
+    existing = _existing_dois(cursor, dialect_name, {a["doi"] for a in articles if a.get("doi")})
+    new_articles, batch_dois = [], set()
+    for article in articles:
+        doi = article.get("doi")
+        # Un même DOI peut apparaître deux fois dans le manifeste : un seul article créé
+        if doi and (doi in existing or doi in batch_dois):
+            continue
+        if doi:
+            batch_dois.add(doi)
+        new_articles.append(article)
+    article_ids = iter(_reserve_ids(cursor, dialect_name, "articles", "article_id", len(new_articles)))
+
+    article_rows, article_id_of = [], {}
+    for article in new_articles:
+        article_id = next(article_ids)
+        article_id_of[id(article)] = article_id
+        if article.get("doi"):
+            existing[article["doi"]] = article_id
+        article_rows.append((article_id, article.get("titre"), article.get("auteurs"), article.get("doi")))
+    stats["articles_created"] = len(article_rows)
+    stats["articles_reused"] = len(articles) - len(article_rows)
+
+    experiences = [
+        (article_id_of.get(id(a)) or existing[a["doi"]], e)
+        for a in articles for e in a.get("experiences", [])
+    ]
+    experience_ids = _reserve_ids(cursor, dialect_name, "experiences", "experience_id", len(experiences))
+    donnees, missing = [], 0
+    for experience_id, (_, experience) in zip(experience_ids, experiences):
+        for donnee in experience.get("donnees", []):
+            source = _source_path(source_dir, donnee.get("file"))
+            if source is None:
+                missing += 1
+            else:
+                donnees.append((experience_id, source, donnee))
+    stats["missing_files"] = missing
+    data_ids = _reserve_ids(cursor, dialect_name, "donnees", "data_id", len(donnees))
+
+    experience_rows, machine_links, detector_links, phantom_links = [], {}, {}, {}
+    for experience_id, (article_id, experience) in zip(experience_ids, experiences):
+        experience_rows.append((experience_id, experience.get("description"), article_id))
+        # Clé primaire (experience_id, équipement) : un lien par équipement
+        for m in experience.get("machines", []):
+            machine_links.setdefault((experience_id, machines[_machine_key(m)]), (
+                m.get("energy"), m.get("collimation"), m.get("settings"),
+                *machine_link_values(m.get("energy"), m.get("collimation"), m.get("type_machine")).values()))
+        length_unit = length_unit_from_mappings(
+            [c for donnee in experience.get("donnees", []) for c in donnee.get("column_mappings", [])]
+        )
+        for d in experience.get("detectors", []):
+            detector_links.setdefault((experience_id, detectors[_detector_key(d)]), (
+                d.get("position"), d.get("depth"), d.get("orientation"),
+                *detector_link_values(d.get("position"), d.get("depth"), length_unit).values()))
+        for p in experience.get("phantoms", []):
+            phantom_links.setdefault((experience_id, phantoms[_phantom_key(p)]), (
+                p.get("position"), p.get("orientation")))
+
+    # Même date d'ingestion pour les données et leurs colonnes (partition,
+    # app/services/partitions.py), au format des DateTime de SQLAlchemy
+    created_at = utcnow().isoformat(sep=" ", timespec="microseconds")
+    donnee_rows, mapping_rows, copies = [], [], []
+    for data_id, (experience_id, source, donnee) in zip(data_ids, donnees):
+        key = f"{experience_id}_{data_id}_{os.path.basename(donnee['file'])}"
+        destination = target.location(key)
+        copies.append((source, key, destination))
+        file_format = donnee.get("file_format") or donnee["file"].rsplit(".", 1)[-1]
+        donnee_rows.append((data_id, experience_id, donnee.get("data_type"), file_format,
+                            destination, donnee.get("description"), created_at))
+        for mapping in donnee.get("column_mappings", []):
+            mapping_rows.append((data_id, mapping.get("column_name"), mapping.get("column_description"),
+                                 mapping.get("data_type"), mapping.get("unit"), created_at))
+    stats.update(experiences=len(experience_rows), donnees=len(donnee_rows), column_mappings=len(mapping_rows))
+
+    # Journal des changements (app/services/changes.py), committé avec le lot
+    article_of = {row[0]: row[2] for row in experience_rows}
+    change_rows = (
+        [(created_at, "article", "created", row[0], None, row[0]) for row in article_rows]
+        + [(created_at, "experience", "created", row[0], row[0], row[2]) for row in experience_rows]
+        + [(created_at, "donnee", "created", row[0], row[1], article_of[row[1]]) for row in donnee_rows]
+    )
+
+    tables = [
+        ("articles", ("article_id", "titre", "auteurs", "doi"), article_rows),
+        ("experiences", ("experience_id", "description", "article_id"), experience_rows),
+        ("experience_machine", ("experience_id", "machine_id", "energy", "collimation", "settings",
+                                "energy_min", "energy_max", "energy_unit", "field_size_cm2"),
+         [key + values for key, values in machine_links.items()]),
+        ("experience_detecteur", ("experience_id", "detector_id", "position", "depth", "orientation",
+                                  "depth_min_mm", "depth_max_mm", "position_mm"),
+         [key + values for key, values in detector_links.items()]),
+        ("experience_phantom", ("experience_id", "phantom_id", "position", "orientation"),
+         [key + values for key, values in phantom_links.items()]),
+        ("donnees", ("data_id", "experience_id", "data_type", "file_format", "file_path", "description",
+                     "ingested_at"),
+         donnee_rows),
+        ("column_mappings", ("data_id", "column_name", "column_description", "data_type", "unit", "ingested_at"),
+         mapping_rows),
+        ("change_log", ("created_at", "entity", "action", "entity_id", "experience_id", "article_id"),
+         change_rows),
+    ]
+    # Ligne témoin : sa présence en base prouve que le lot a été committé
+    if experience_rows:
+        probe = ("experiences", "experience_id", experience_rows[0][0])
+    elif article_rows:
+        probe = ("articles", "article_id", article_rows[0][0])
+    else:
+        probe = None
+    return tables, copies, stats, probe
+
+
+def _copy_files(pool, target, copies):
+    """Copie les fichiers en parallèle ; en cas d'erreur, supprime ceux déjà copiés."""
+    futures = [pool.submit(target.save_file, source, key) for source, key, _ in copies]
+    errors = [future.exception() for future in futures]
+    failed = [e for e in errors if e is not None]
+    if failed:
+        _remove_files(destination for _, _, destination in copies)
+        raise failed[0]
+
+
+def _remove_files(locations):
+    for location in locations:
+        try:
+            delete_file(location)
+        except Exception:  # noqa: BLE001 - nettoyage au mieux (disque ou S3)
+            pass
+
+
+def _add_stats(total, stats):
+    for key, value in stats.items():
+        total[key] = total.get(key, 0) + value
+
+
+def import_directory(
+    engine,
+    source_dir,
+    upload_dir=None,
+    checkpoint_path=None,
+    batch_size=IMPORT_BATCH_SIZE,
+    workers=IMPORT_COPY_WORKERS,
+    log=logger.info,
+):
+    """
+    Importe le manifeste et les fichiers de `source_dir`.
+
+    Args:
+        engine: Engine SQLAlchemy (schéma migré)
+        source_dir: Répertoire contenant manifest.json et les fichiers
+        upload_dir: Répertoire local de destination (défaut : stockage
+            configuré, voir app/storage.py)
+        checkpoint_path: Fichier de reprise (défaut : dans source_dir)
+        batch_size: Articles par transaction
+        workers: Threads de copie des fichiers
+        log: Fonction de journalisation de la progression
+
+    Returns:
+        dict: compteurs de l'import (cumulés sur les reprises)
+    """
+    manifest, digest = load_manifest(source_dir)
+    _validate_energies(manifest)
+    checkpoint_path = checkpoint_path or os.path.join(source_dir, CHECKPOINT_NAME)
+    checkpoint = _read_checkpoint(checkpoint_path, digest) or {
+        "manifest_sha256": digest, "articles_done": 0, "pending": None, "stats": {},
+    }
+    dialect_name = engine.dialect.name
+    load = loader_for(dialect_name)
+    if upload_dir:
+        os.makedirs(upload_dir, exist_ok=True)
+    target = LocalStorage(upload_dir) if upload_dir else storage
+
+    with Session(engine) as db:
+        equipment = _resolve_equipment(db, manifest)
+
+    articles = manifest["articles"]
+    raw = engine.raw_connection()
+    try:
+        connection = raw.driver_connection
+
+        # Lot en cours lors de l'interruption : committé ou non ?
+        pending = checkpoint.get("pending")
+        if pending:
+            cursor = connection.cursor()
+            if pending["probe"] and _probe_exists(cursor, dialect_name, pending["probe"]):
+                checkpoint["articles_done"] = pending["end"]
+                _add_stats(checkpoint["stats"], pending["stats"])
+            else:
+                _remove_files(pending["files"])
+            cursor.close()
+            raw.rollback()
+            checkpoint["pending"] = None
+            _write_checkpoint(checkpoint_path, checkpoint)
+
+        if checkpoint["articles_done"]:
+            log(f"Reprise après {checkpoint['articles_done']} articles déjà importés")
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for start in range(checkpoint["articles_done"], len(articles), batch_size):
+                end = min(start + batch_size, len(articles))
+                cursor = connection.cursor()
+                copies = []
+                if dialect_name == "sqlite":
+                    cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    tables, copies, stats, probe = _plan_batch(
+                        cursor, dialect_name, articles[start:end], equipment, source_dir, target,
+                    )
+                    checkpoint["pending"] = {
+                        "start": start, "end": end, "probe": probe, "stats": stats,
+                        "files": [destination for _, _, destination in copies],
+                    }
+                    _write_checkpoint(checkpoint_path, checkpoint)
+
+                    _copy_files(pool, target, copies)
+                    for table, columns, rows in tables:
+                        load(connection, table, columns, rows)
+                    raw.commit()
+                except Exception:
+                    raw.rollback()
+                    _remove_files(destination for _, _, destination in copies)
+                    checkpoint["pending"] = None
+                    _write_checkpoint(checkpoint_path, checkpoint)
+                    raise
+                finally:
+                    cursor.close()
+
+                checkpoint.update(articles_done=end, pending=None)
+                _add_stats(checkpoint["stats"], stats)
+                _write_checkpoint(checkpoint_path, checkpoint)
+                log(f"  articles {end}/{len(articles)}  {stats}")
+
+        if dialect_name == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+            raw.commit()
+    finally:
+        raw.close()
+
+    return dict(checkpoint["stats"], articles_done=checkpoint["articles_done"])
@@ -0,0 +1,80 @@
+"""
+Chargement de lignes en masse, hors ORM.
+
+PostgreSQL : COPY ... FROM STDIN (format CSV) alimenté à la demande par un
+générateur de lignes, sans tout garder en mémoire. Autres bases (SQLite) :
+lots d'executemany. Utilisé par l'import en masse et le générateur de
+données synthétiques ; ce module n'importe rien de l'application pour
+rester utilisable avant la configuration de DATABASE_URL.
+"""
+import csv
+import io
+import itertools
+
+BATCH_SIZE = 10000
+
+
+class CsvStream(io.RawIOBase):
+    """Flux CSV lu par COPY, produit à la demande depuis un générateur de lignes."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = b""
+        self._text = io.StringIO()
+        self._writer = csv.writer(self._text, lineterminator="\n")
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while len(self._buffer) < len(target):
+            chunk = list(itertools.islice(self._rows, 1000))
+            if not chunk:
+                break
+            self.count += len(chunk)
+            self._text.seek(0)
+            self._text.truncate()
+            self._writer.writerows(chunk)
+            self._buffer += self._text.getvalue().encode()
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def copy_postgres(connection, table, columns, rows):
+    """COPY des lignes dans `table` (connexion psycopg2) ; retourne le nombre de lignes."""
+    stream = CsvStream(rows)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            io.BufferedReader(stream, buffer_size=1 << 20),
+        )
+    return stream.count
+
+
+def insert_batches(connection, table, columns, rows):
+    """INSERT par lots d'executemany (connexion sqlite3) ; retourne le nombre de lignes."""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+    rows = iter(rows)
+    count = 0
+    cursor = connection.cursor()
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        cursor.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+LOADERS = {"postgresql": copy_postgres, "sqlite": insert_batches}
+
+
+def loader_for(dialect_name):
+    """Fonction de chargement adaptée au dialecte SQLAlchemy."""
+    load = LOADERS.get(dialect_name)
+    if load is None:
+        raise ValueError(f"Dialecte non supporté : {dialect_name}")
+    return load
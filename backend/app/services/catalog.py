@@ -0,0 +1,288 @@
+"""
+Catalogue des équipements : clés de correspondance normalisées et fusion des doublons.
+
+- match_key : "type|fabricant|modèle" normalisé (accents, casse, ponctuation,
+  espaces ; suffixes de raison sociale retirés du fabricant). "Varian",
+  "varian " et "VARIAN Medical Systems" donnent la même clé ; un index unique
+  sur match_key empêche les doublons exacts.
+- Doublons approchés (fautes de frappe, variantes d'écriture) : paires de
+  même type dont la similarité par trigrammes du "fabricant modèle" dépasse
+  un seuil ; pg_trgm (index GIN) sur PostgreSQL, calcul équivalent en Python
+  sinon. Les paires sont regroupées, le membre le plus référencé de chaque
+  groupe est conservé.
+- Fusion : les lignes de liaison sont réécrites en quelques requêtes
+  ensemblistes via une table temporaire (ancien id -> id conservé) ; une
+  liaison qui ferait doublon avec une liaison existante est supprimée.
+
+Les fonctions travaillent sur une Connection (migrations, script de dédoublonnage).
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+
+from sqlalchemy import text
+
+# Mots retirés des noms de fabricants ("Varian Medical Systems" -> "varian")
+COMPANY_NOISE_WORDS = {
+    "ag", "co", "company", "corp", "corporation", "gmbh", "group", "inc",
+    "international", "llc", "ltd", "medical", "sa", "sas", "system", "systems",
+    "technologies", "technology",
+}
+DEFAULT_SIMILARITY_THRESHOLD = 0.65
+
+
+@dataclass(frozen=True)
+class Catalog:
+    name: str
+    table: str
+    id_column: str
+    link_table: str
+    link_column: str
+    # Colonnes (type, fabricant, modèle), dans l'ordre de la clé
+    key_columns: tuple
+
+
+CATALOGS = {
+    "machines": Catalog("machines", "machines", "machine_id", "experience_machine", "machine_id",
+                        ("type_machine", "constructeur", "modele")),
+    "detectors": Catalog("detectors", "detecteurs", "detecteur_id", "experience_detecteur", "detector_id",
+                         ("type_detecteur", "constructeur", "modele")),
+    "phantoms": Catalog("phantoms", "phantoms", "phantom_id", "experience_phantom", "phantom_id",
+                        ("phantom_type", "manufacturer", "model")),
+}
+
+# "fabricant modèle" d'une clé : expression de l'index GIN trigramme
+# (migration 0003), reprise telle quelle pour que PostgreSQL l'utilise
+NAME_EXPRESSION = "(split_part({alias}match_key, '|', 2) || ' ' || split_part({alias}match_key, '|', 3))"
+
+
+# --- Normalisation ---
+
+def _words(value):
+    if not value:
+        return []
+    value = unicodedata.normalize("NFKD", str(value))
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return re.findall(r"[0-9a-z]+", value.casefold())
+
+
+def normalize_label(value) -> str:
+    """Type ou modèle : "True-Beam " -> "truebeam"."""
+    return "".join(_words(value))
+
+
+def normalize_manufacturer(value) -> str:
+    """Fabricant, sans raison sociale : "VARIAN Medical Systems, Inc." -> "varian"."""
+    words = _words(value)
+    significant = [w for w in words if w not in COMPANY_NOISE_WORDS]
+    return "".join(significant or words)
+
+
+def match_key(equipment_type, manufacturer, model) -> str:
+    """Clé de correspondance "type|fabricant|modèle" (champ absent : partie vide)."""
+    return "|".join((
+        normalize_label(equipment_type),
+        normalize_manufacturer(manufacturer),
+        normalize_label(model),
+    ))
+
+
+# --- Similarité par trigrammes (mêmes règles que pg_trgm) ---
+
+def trigrams(value) -> set:
+    grams = set()
+    for word in re.findall(r"[0-9a-z]+", value):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigram_similarity(a, b) -> float:
+    ta, tb = trigrams(a), trigrams(b)
+    union = len(ta | tb)
+    return len(ta & tb) / union if union else 0.0
+
+
+def _name_part(key):
+    _, manufacturer, model = key.split("|")
+    return f"{manufacturer} {model}"
+
+
+def _has_pg_trgm(conn):
+    return conn.dialect.name == "postgresql" and conn.execute(
+        text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    ).first() is not None
+
+
+def _similar_pairs_pg_trgm(conn, catalog, threshold):
+    a_name = NAME_EXPRESSION.format(alias="a.")
+    b_name = NAME_EXPRESSION.format(alias="b.")
+    conn.execute(text("SELECT set_limit(:threshold)"), {"threshold": threshold})
+    rows = conn.execute(text(
+        f"SELECT a.{catalog.id_column}, b.{catalog.id_column}, similarity({a_name}, {b_name}), "
+        f"a.match_key, b.match_key "
+        f"FROM {catalog.table} a JOIN {catalog.table} b "
+        f"ON {a_name} % {b_name} AND a.{catalog.id_column} < b.{catalog.id_column} "
+        f"AND split_part(a.match_key, '|', 1) = split_part(b.match_key, '|', 1)"
+    ))
+    return [(a_id, b_id, float(score), a_key, b_key) for a_id, b_id, score, a_key, b_key in rows]
+
+
+def _similar_pairs_python(conn, catalog, threshold):
+    rows = conn.execute(text(f"SELECT {catalog.id_column}, match_key FROM {catalog.table}")).all()
+    keys = dict(rows)
+    grams = {entity_id: trigrams(_name_part(key)) for entity_id, key in rows}
+    # Index inversé (type, trigramme) -> ids : seules les paires partageant
+    # un trigramme sont comparées
+    index = defaultdict(list)
+    for entity_id, key in rows:
+        block = key.split("|", 1)[0]
+        for gram in grams[entity_id]:
+            index[(block, gram)].append(entity_id)
+    shared = defaultdict(int)
+    for ids in index.values():
+        for i, a_id in enumerate(ids):
+            for b_id in ids[i + 1:]:
+                shared[(min(a_id, b_id), max(a_id, b_id))] += 1
+    pairs = []
+    for (a_id, b_id), common in shared.items():
+        score = common / (len(grams[a_id]) + len(grams[b_id]) - common)
+        if score >= threshold:
+            pairs.append((a_id, b_id, score, keys[a_id], keys[b_id]))
+    return pairs
+
+
+# --- Propositions et fusion ---
+
+def _same_numbers(a_key, b_key):
+    # "CyberKnife M6" / "CyberKnife S7", "Blue Phantom" / "Blue Phantom 2" :
+    # noms proches mais modèles différents
+    return re.findall(r"\d+", a_key) == re.findall(r"\d+", b_key)
+
+
+def _link_counts(conn, catalog):
+    return dict(conn.execute(text(
+        f"SELECT {catalog.link_column}, COUNT(*) FROM {catalog.link_table} GROUP BY {catalog.link_column}"
+    )).all())
+
+
+def _clusters(pairs):
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a_id, b_id, _ in pairs:
+        parent[find(a_id)] = find(b_id)
+    groups = defaultdict(set)
+    for x in list(parent):
+        groups[find(x)].add(x)
+    return list(groups.values())
+
+
+def propose_merges(conn, catalog, threshold=DEFAULT_SIMILARITY_THRESHOLD):
+    """
+    Propose des fusions de doublons approchés. Les paires dont les nombres
+    diffèrent (numéros de modèle, versions) ne sont jamais proposées.
+
+    Returns:
+        list[dict]: un groupe par entrée : {"keep": id, "merge": [ids], "pairs": [(a, b, score)]},
+                    l'entité conservée étant la plus référencée (puis la plus ancienne)
+    """
+    if _has_pg_trgm(conn):
+        pairs = _similar_pairs_pg_trgm(conn, catalog, threshold)
+    else:
+        pairs = _similar_pairs_python(conn, catalog, threshold)
+    pairs = [(a_id, b_id, score) for a_id, b_id, score, a_key, b_key in pairs if _same_numbers(a_key, b_key)]
+    if not pairs:
+        return []
+    counts = _link_counts(conn, catalog)
+    proposals = []
+    for members in _clusters(pairs):
+        keep = min(members, key=lambda entity_id: (-counts.get(entity_id, 0), entity_id))
+        proposals.append({
+            "keep": keep,
+            "merge": sorted(members - {keep}),
+            "pairs": sorted(
+                (p for p in pairs if p[0] in members),
+                key=lambda p: -p[2],
+            ),
+        })
+    return sorted(proposals, key=lambda proposal: proposal["keep"])
+
+
+def merge_entities(conn, catalog, mapping) -> dict:
+    """
+    Fusionne des entités : {id supprimé: id conservé}.
+
+    Les liaisons des entités supprimées sont reportées sur l'entité conservée ;
+    une liaison déjà présente pour la même expérience (sur l'entité conservée
+    ou sur un doublon d'id plus petit) est supprimée, ses paramètres perdus.
+
+    Returns:
+        dict: {"links_removed": n, "links_moved": n, "entities_removed": n}
+    """
+    if not mapping:
+        return {"links_removed": 0, "links_moved": 0, "entities_removed": 0}
+    link, column = catalog.link_table, catalog.link_column
+    conn.execute(text("CREATE TEMPORARY TABLE rdh_merge_map (old_id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL)"))
+    try:
+        conn.execute(
+            text("INSERT INTO rdh_merge_map (old_id, new_id) VALUES (:old_id, :new_id)"),
+            [{"old_id": old_id, "new_id": new_id} for old_id, new_id in mapping.items()],
+        )
+        removed = conn.execute(text(
+            f"DELETE FROM {link} WHERE {column} IN (SELECT old_id FROM rdh_merge_map) "
+            f"AND EXISTS ("
+            f"  SELECT 1 FROM {link} k LEFT JOIN rdh_merge_map mk ON mk.old_id = k.{column} "
+            f"  WHERE k.experience_id = {link}.experience_id "
+            f"  AND COALESCE(mk.new_id, k.{column}) = "
+            f"      (SELECT m.new_id FROM rdh_merge_map m WHERE m.old_id = {link}.{column}) "
+            f"  AND (mk.old_id IS NULL OR k.{column} < {link}.{column}))"
+        )).rowcount
+        moved = conn.execute(text(
+            f"UPDATE {link} SET {column} = "
+            f"(SELECT m.new_id FROM rdh_merge_map m WHERE m.old_id = {link}.{column}) "
+            f"WHERE {column} IN (SELECT old_id FROM rdh_merge_map)"
+        )).rowcount
+        deleted = conn.execute(text(
+            f"DELETE FROM {catalog.table} WHERE {catalog.id_column} IN (SELECT old_id FROM rdh_merge_map)"
+        )).rowcount
+    finally:
+        conn.execute(text("DROP TABLE rdh_merge_map"))
+    return {"links_removed": removed, "links_moved": moved, "entities_removed": deleted}
+
+
+def backfill_match_keys(conn, catalog) -> dict:
+    """
+    Calcule match_key pour toutes les lignes ; les doublons exacts (même clé)
+    sont d'abord fusionnés sur la plus ancienne entité.
+
+    Returns:
+        dict: statistiques de merge_entities
+    """
+    id_column = catalog.id_column
+    columns = ", ".join(catalog.key_columns)
+    rows = conn.execute(text(
+        f"SELECT {id_column}, {columns} FROM {catalog.table} ORDER BY {id_column}"
+    )).all()
+    keys = {}
+    mapping = {}
+    for entity_id, *values in rows:
+        key = match_key(*values)
+        if key in keys:
+            mapping[entity_id] = keys[key]
+        else:
+            keys[key] = entity_id
+    stats = merge_entities(conn, catalog, mapping)
+    if keys:
+        conn.execute(
+            text(f"UPDATE {catalog.table} SET match_key = :key WHERE {id_column} = :id"),
+            [{"key": key, "id": entity_id} for key, entity_id in keys.items()],
+        )
+    return stats
@@ -0,0 +1,85 @@
+"""
+Journal des changements (table change_log) pour les consommateurs en aval
+(pipelines d'analyse, tableaux de bord) : ils lisent les créations depuis
+leur dernier curseur au lieu de relire et comparer les listes complètes.
+
+- Écriture : record_change ajoute une ligne à la session de l'écriture
+  qu'elle décrit ; elle est committée (ou annulée) avec elle. Les
+  soumissions complètes enregistrent l'article, l'expérience et la donnée
+  (les équipements liés font partie de l'expérience) ; les routes de
+  liaison enregistrent chaque liaison ; l'import en masse charge ses lignes
+  avec celles du lot.
+- Lecture : read_changes, par change_id croissant. Les identifiants sont
+  attribués à l'insertion mais visibles au commit : une transaction plus
+  lente peut committer un identifiant inférieur à un autre déjà lu. Pour
+  ne pas le sauter, la lecture s'arrête avant le premier trou récent (moins
+  de CHANGES_GAP_SECONDS) ; un trou plus ancien est une transaction
+  annulée. La ligne est insérée juste avant le commit pour que cette
+  fenêtre reste courte.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.change_log import ChangeLog
+from app.serialization import rows_to_dicts
+
+CHANGES_GAP_SECONDS = float(os.getenv("CHANGES_GAP_SECONDS", "5"))
+CHANGES_PAGE_MAX = 1000
+
+CHANGE_COLUMNS = ("created_at", "entity", "action", "entity_id", "experience_id", "article_id")
+
+
+def utcnow():
+    """Horodatage UTC naïf (colonne DateTime sans fuseau)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def record_change(db: Session, entity, action, entity_id, experience_id=None, article_id=None):
+    """Ajoute une ligne au journal dans la transaction courante (sans commit)."""
+    db.add(ChangeLog(
+        created_at=utcnow(), entity=entity, action=action, entity_id=entity_id,
+        experience_id=experience_id, article_id=article_id,
+    ))
+
+
+def record_submission(db: Session, result, article_created=False):
+    """Lignes d'une soumission complète (résultat de _attach_experience_content)."""
+    article_id, experience_id = result["article_id"], result["experience_id"]
+    if article_created:
+        record_change(db, "article", "created", article_id, article_id=article_id)
+    record_change(db, "experience", "created", experience_id, experience_id, article_id)
+    record_change(db, "donnee", "created", result["data_id"], experience_id, article_id)
+
+
+def latest_change_id(db: Session) -> int:
+    return db.execute(select(func.max(ChangeLog.change_id))).scalar() or 0
+
+
+def read_changes(db: Session, since=0, limit=CHANGES_PAGE_MAX):
+    """
+    Changements de curseur > `since`.
+
+    Returns:
+        tuple: (liste de dicts, curseur suivant, True s'il reste des
+                changements à lire, ou retenus derrière un trou récent)
+    """
+    rows = rows_to_dicts(db.execute(
+        select(ChangeLog.change_id, *(getattr(ChangeLog, c) for c in CHANGE_COLUMNS))
+        .where(ChangeLog.change_id > since)
+        .order_by(ChangeLog.change_id)
+        .limit(limit)
+    ))
+    more = len(rows) == limit
+    settled = utcnow() - timedelta(seconds=CHANGES_GAP_SECONDS)
+    expected = since + 1
+    for i, row in enumerate(rows):
+        if row["change_id"] != expected and row["created_at"] > settled:
+            rows, more = rows[:i], True
+            break
+        expected = row["change_id"] + 1
+    for row in rows:
+        row["created_at"] = row["created_at"].isoformat(timespec="milliseconds") + "Z"
+    return rows, (rows[-1]["change_id"] if rows else since), more
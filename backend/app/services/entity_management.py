@@ -1,11 +1,36 @@
 """
 Fonctions utilitaires pour gérer l'obtention ou création des entités génériques
 (Machines, Détecteurs, Phantômes) avec vérification d'existence.
+
+L'existence est vérifiée sur la clé normalisée match_key (voir
+app/services/catalog.py) : "Varian", "varian " et "VARIAN Medical" désignent
+le même constructeur. L'index unique sur match_key garantit qu'une création
+concurrente ne produit pas de doublon.
 """
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models.machine import Machine
 from app.models.detector import Detector
 from app.models.phantom import Phantom
+from app.services.catalog import match_key
+
+
+def _get_or_create(db: Session, entity_class, key: str, **values):
+    existing = db.query(entity_class).filter(entity_class.match_key == key).first()
+    if existing:
+        return existing
+    entity = entity_class(match_key=key, **values)
+    try:
+        with db.begin_nested():
+            db.add(entity)
+            db.flush()  # Obtenir l'ID sans committer
+    except IntegrityError:
+        # Créée entre-temps par une requête concurrente ; sinon autre contrainte
+        existing = db.query(entity_class).filter(entity_class.match_key == key).first()
+        if existing is None:
+            raise
+        return existing
+    return entity
 
 
 def get_or_create_machine(
@@ -17,7 +42,7 @@ def get_or_create_machine(
     """
     Récupère une machine existante ou la crée si elle n'existe pas.
     
-    Recherche basée sur : constructeur + modele + type_machine
+    Recherche basée sur : match_key(type_machine, constructeur, modele)
     
     Args:
         db: Session de base de données
@@ -28,25 +53,12 @@ def get_or_create_machine(
     Returns:
         Machine: L'objet Machine (existant ou nouvellement créé)
     """
-    # Chercher si la machine existe déjà
-    existing_machine = db.query(Machine).filter(
-        Machine.constructeur == constructeur,
-        Machine.modele == modele,
-        Machine.type_machine == type_machine,
-    ).first()
-    
-    if existing_machine:
-        return existing_machine
-    
-    # Créer une nouvelle machine si elle n'existe pas
-    new_machine = Machine(
+    return _get_or_create(
+        db, Machine, match_key(type_machine, constructeur, modele),
         constructeur=constructeur,
         modele=modele,
         type_machine=type_machine,
     )
-    db.add(new_machine)
-    db.flush()  # Obtenir l'ID sans committer
-    return new_machine
 
 
 def get_or_create_detector(
@@ -58,7 +70,7 @@ def get_or_create_detector(
     """
     Récupère un détecteur existant ou le crée si il n'existe pas.
     
-    Recherche basée sur : type_detecteur + modele + constructeur
+    Recherche basée sur : match_key(type_detecteur, constructeur, modele)
     
     Args:
         db: Session de base de données
@@ -69,25 +81,12 @@ def get_or_create_detector(
     Returns:
         Detector: L'objet Detector (existant ou nouvellement créé)
     """
-    # Chercher si le détecteur existe déjà
-    existing_detector = db.query(Detector).filter(
-        Detector.type_detecteur == type_detecteur,
-        Detector.modele == modele,
-        Detector.constructeur == constructeur,
-    ).first()
-    
-    if existing_detector:
-        return existing_detector
-    
-    # Créer un nouveau détecteur si il n'existe pas
-    new_detector = Detector(
+    return _get_or_create(
+        db, Detector, match_key(type_detecteur, constructeur, modele),
         type_detecteur=type_detecteur,
         modele=modele,
         constructeur=constructeur,
     )
-    db.add(new_detector)
-    db.flush()  # Obtenir l'ID sans committer
-    return new_detector
 
 
 def get_or_create_phantom(
@@ -101,8 +100,10 @@ def get_or_create_phantom(
     """
     Récupère un fantôme existant ou le crée si il n'existe pas.
     
-    Recherche basée sur : manufacturer + model + phantom_type
-    (dimensions et material peuvent varier pour le même fantôme)
+    Recherche basée sur : match_key(phantom_type, manufacturer, model)
+    (dimensions et material peuvent varier pour le même fantôme). Un champ
+    absent fait partie de la clé : un fantôme sans fabricant ne correspond
+    pas à n'importe quel fantôme du même modèle.
     
     Args:
         db: Session de base de données
@@ -115,30 +116,103 @@ def get_or_create_phantom(
     Returns:
         Phantom: L'objet Phantom (existant ou nouvellement créé)
     """
-    # Chercher si le fantôme existe déjà
-    # On utilise model comme clé primaire (avec manufacturer et phantom_type)
-    query = db.query(Phantom)
-    
-    if model:
-        query = query.filter(Phantom.model == model)
-    if manufacturer:
-        query = query.filter(Phantom.manufacturer == manufacturer)
-    if phantom_type:
-        query = query.filter(Phantom.phantom_type == phantom_type)
-    
-    existing_phantom = query.first()
-    
-    if existing_phantom:
-        return existing_phantom
-    
-    # Créer un nouveau fantôme si il n'existe pas
-    new_phantom = Phantom(
+    return _get_or_create(
+        db, Phantom, match_key(phantom_type, manufacturer, model),
         manufacturer=manufacturer,
         model=model,
         phantom_type=phantom_type,
         dimensions=dimensions,
         material=material,
     )
-    db.add(new_phantom)
-    db.flush()  # Obtenir l'ID sans committer
-    return new_phantom
+
+
+# --- Résolution par lots (imports en masse) ---
+#
+# Mêmes règles que les fonctions get_or_create_* ci-dessus, mais pour un
+# ensemble de clés : une requête sur match_key pour charger les existants,
+# puis création des entités manquantes en un seul flush.
+
+
+def _resolve(db: Session, entity_class, id_column: str, entries: dict) -> dict:
+    """entries : clé brute -> (match_key, attributs de création) ; retourne clé brute -> id."""
+    if not entries:
+        return {}
+    wanted = {key for key, _ in entries.values()}
+    by_match_key = {
+        entity.match_key: entity
+        for entity in db.query(entity_class).filter(entity_class.match_key.in_(wanted))
+    }
+    missing = []
+    for key, values in entries.values():
+        if key not in by_match_key:
+            # Deux clés brutes du lot peuvent avoir la même forme normalisée
+            by_match_key[key] = entity_class(match_key=key, **values)
+            missing.append(by_match_key[key])
+    db.add_all(missing)
+    db.flush()  # Obtenir les IDs sans committer
+    return {raw: getattr(by_match_key[key], id_column) for raw, (key, _) in entries.items()}
+
+
+def resolve_machines(db: Session, keys) -> dict:
+    """
+    Résout un ensemble de machines (constructeur, modele, type_machine).
+
+    Args:
+        db: Session de base de données
+        keys: Itérable de tuples (constructeur, modele, type_machine)
+
+    Returns:
+        dict: clé -> machine_id (machines manquantes créées, non committées)
+    """
+    entries = {
+        (constructeur, modele, type_machine): (
+            match_key(type_machine, constructeur, modele),
+            {"constructeur": constructeur, "modele": modele, "type_machine": type_machine},
+        )
+        for constructeur, modele, type_machine in set(keys)
+    }
+    return _resolve(db, Machine, "machine_id", entries)
+
+
+def resolve_detectors(db: Session, keys) -> dict:
+    """
+    Résout un ensemble de détecteurs (type_detecteur, modele, constructeur).
+
+    Args:
+        db: Session de base de données
+        keys: Itérable de tuples (type_detecteur, modele, constructeur)
+
+    Returns:
+        dict: clé -> detecteur_id (détecteurs manquants créés, non committés)
+    """
+    entries = {
+        (type_detecteur, modele, constructeur): (
+            match_key(type_detecteur, constructeur, modele),
+            {"type_detecteur": type_detecteur, "modele": modele, "constructeur": constructeur},
+        )
+        for type_detecteur, modele, constructeur in set(keys)
+    }
+    return _resolve(db, Detector, "detecteur_id", entries)
+
+
+def resolve_phantoms(db: Session, phantoms) -> dict:
+    """
+    Résout un ensemble de fantômes.
+
+    Args:
+        db: Session de base de données
+        phantoms: Itérable de tuples (manufacturer, model, phantom_type, dimensions, material) ;
+                  dimensions et material ne servent qu'à la création
+
+    Returns:
+        dict: (manufacturer, model, phantom_type) -> phantom_id
+              (fantômes manquants créés, non committés)
+    """
+    entries = {}
+    for manufacturer, model, phantom_type, dimensions, material in phantoms:
+        entries.setdefault((manufacturer, model, phantom_type), (
+            match_key(phantom_type, manufacturer, model),
+            {"manufacturer": manufacturer, "model": model, "phantom_type": phantom_type,
+             "dimensions": dimensions, "material": material},
+        ))
+    return _resolve(db, Phantom, "phantom_id", entries)
@@ -0,0 +1,337 @@
+"""
+Export d'articles / d'expériences sous forme d'archive (zip ou tar).
+
+L'archive contient un manifeste JSON (articles, expériences, équipements,
+données et ColumnMapping) et les fichiers de données. Elle est produite à la
+volée par morceaux : la mémoire utilisée est bornée (quelques morceaux de
+CHUNK_SIZE) quelle que soit la taille des fichiers, et rien n'est écrit sur
+disque.
+
+Le manifeste est construit avec un nombre fixe de requêtes (une par table),
+avant le début du streaming : la génération de l'archive n'utilise plus la
+session de base de données.
+"""
+import json
+import os
+import tarfile
+import time
+import zipfile
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.models.article import Article
+from app.models.column_mapping import ColumnMapping
+from app.models.detector import Detector
+from app.models.donnee import Donnee
+from app.models.experience import Experience
+from app.models.experience_detector import ExperienceDetector
+from app.models.experience_machine import ExperienceMachine
+from app.models.experience_phantom import ExperiencePhantom
+from app.models.machine import Machine
+from app.models.phantom import Phantom
+from app.services.partitions import mapping_window
+from app.storage import file_stat, iter_chunks
+
+# Nombre maximal d'expériences par export (le manifeste est construit en mémoire)
+EXPORT_MAX_EXPERIENCES = int(os.getenv("EXPORT_MAX_EXPERIENCES", "10000"))
+
+MANIFEST_FORMAT = "radiotherapy-data-hub/1"
+MANIFEST_NAME = "manifest.json"
+CHUNK_SIZE = 1024 * 1024
+
+ARCHIVE_FORMATS = {
+    "zip": "application/zip",
+    "tar": "application/x-tar",
+}
+
+
+def archive_file_name(donnee) -> str:
+    """Chemin d'un fichier de données dans l'archive."""
+    return f"files/{donnee.data_id}_{os.path.basename(donnee.file_path)}"
+
+
+def find_experience_ids(
+    db: Session,
+    article_ids=None,
+    data_type=None,
+    machine_model=None,
+    detector_model=None,
+    phantom_model=None,
+    limit=None,
+):
+    """
+    Identifiants des expériences correspondant aux filtres (tous optionnels, combinés en ET).
+
+    Returns:
+        list[int]: identifiants triés, au plus `limit`
+    """
+    query = db.query(Experience.experience_id)
+    if article_ids:
+        query = query.filter(Experience.article_id.in_(article_ids))
+    if data_type:
+        query = query.filter(Experience.experience_id.in_(
+            db.query(Donnee.experience_id).filter(Donnee.data_type == data_type)
+        ))
+    if machine_model:
+        query = query.filter(Experience.experience_id.in_(
+            db.query(ExperienceMachine.experience_id)
+            .join(Machine, Machine.machine_id == ExperienceMachine.machine_id)
+            .filter(Machine.modele == machine_model)
+        ))
+    if detector_model:
+        query = query.filter(Experience.experience_id.in_(
+            db.query(ExperienceDetector.experience_id)
+            .join(Detector, Detector.detecteur_id == ExperienceDetector.detector_id)
+            .filter(Detector.modele == detector_model)
+        ))
+    if phantom_model:
+        query = query.filter(Experience.experience_id.in_(
+            db.query(ExperiencePhantom.experience_id)
+            .join(Phantom, Phantom.phantom_id == ExperiencePhantom.phantom_id)
+            .filter(Phantom.model == phantom_model)
+        ))
+    query = query.order_by(Experience.experience_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return [row[0] for row in query]
+
+
+def build_manifest(db: Session, experience_ids) -> dict:
+    """
+    Construit le manifeste des expériences demandées, regroupées par article.
+
+    Args:
+        db: Session de base de données
+        experience_ids: Identifiants des expériences à exporter
+
+    Returns:
+        dict: manifeste ; chaque donnée porte "file" (chemin dans l'archive)
+              et "source_path" (chemin sur le serveur, retiré avant écriture)
+    """
+    experience_ids = list(experience_ids)
+    experiences = (
+        db.query(Experience)
+        .filter(Experience.experience_id.in_(experience_ids))
+        .order_by(Experience.experience_id)
+        .all()
+    ) if experience_ids else []
+
+    article_ids = {e.article_id for e in experiences if e.article_id is not None}
+    articles = {
+        a.article_id: a
+        for a in db.query(Article).filter(Article.article_id.in_(article_ids)).all()
+    } if article_ids else {}
+
+    machines = defaultdict(list)
+    for link, machine in (
+        db.query(ExperienceMachine, Machine)
+        .join(Machine, Machine.machine_id == ExperienceMachine.machine_id)
+        .filter(ExperienceMachine.experience_id.in_(experience_ids))
+    ):
+        machines[link.experience_id].append({
+            "constructeur": machine.constructeur,
+            "modele": machine.modele,
+            "type_machine": machine.type_machine,
+            "energy": link.energy,
+            "collimation": link.collimation,
+            "settings": link.settings,
+        })
+
+    detectors = defaultdict(list)
+    for link, detector in (
+        db.query(ExperienceDetector, Detector)
+        .join(Detector, Detector.detecteur_id == ExperienceDetector.detector_id)
+        .filter(ExperienceDetector.experience_id.in_(experience_ids))
+    ):
+        detectors[link.experience_id].append({
+            "type_detecteur": detector.type_detecteur,
+            "modele": detector.modele,
+            "constructeur": detector.constructeur,
+            "position": link.position,
+            "depth": link.depth,
+            "orientation": link.orientation,
+        })
+
+    phantoms = defaultdict(list)
+    for link, phantom in (
+        db.query(ExperiencePhantom, Phantom)
+        .join(Phantom, Phantom.phantom_id == ExperiencePhantom.phantom_id)
+        .filter(ExperiencePhantom.experience_id.in_(experience_ids))
+    ):
+        phantoms[link.experience_id].append({
+            "phantom_type": phantom.phantom_type,
+            "manufacturer": phantom.manufacturer,
+            "model": phantom.model,
+            "dimensions": phantom.dimensions,
+            "material": phantom.material,
+            "position": link.position,
+            "orientation": link.orientation,
+        })
+
+    donnees = db.query(Donnee).filter(Donnee.experience_id.in_(experience_ids)).all()
+    mappings = defaultdict(list)
+    if donnees:
+        for mapping in db.query(ColumnMapping).filter(
+            ColumnMapping.data_id.in_([d.data_id for d in donnees]),
+            mapping_window(d.ingested_at for d in donnees),
+        ).order_by(ColumnMapping.mapping_id):
+            mappings[mapping.data_id].append({
+                "column_name": mapping.column_name,
+                "column_description": mapping.column_description,
+                "data_type": mapping.data_type,
+                "unit": mapping.unit,
+            })
+
+    data_by_experience = defaultdict(list)
+    for donnee in donnees:
+        data_by_experience[donnee.experience_id].append({
+            "data_id": donnee.data_id,
+            "data_type": donnee.data_type,
+            "file_format": donnee.file_format,
+            "description": donnee.description,
+            "file": archive_file_name(donnee),
+            "source_path": donnee.file_path,
+            "column_mappings": mappings[donnee.data_id],
+        })
+
+    grouped = defaultdict(list)
+    for experience in experiences:
+        grouped[experience.article_id].append({
+            "experience_id": experience.experience_id,
+            "description": experience.description,
+            "machines": machines[experience.experience_id],
+            "detectors": detectors[experience.experience_id],
+            "phantoms": phantoms[experience.experience_id],
+            "donnees": data_by_experience[experience.experience_id],
+        })
+
+    manifest_articles = []
+    for article_id, article_experiences in grouped.items():
+        article = articles.get(article_id)
+        manifest_articles.append({
+            "article_id": article_id,
+            "titre": article.titre if article else None,
+            "auteurs": article.auteurs if article else None,
+            "doi": article.doi if article else None,
+            "experiences": article_experiences,
+        })
+
+    return {
+        "format": MANIFEST_FORMAT,
+        "exported_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "articles": manifest_articles,
+    }
+
+
+def _files_to_pack(manifest):
+    """
+    Sépare les emplacements serveur du manifeste (app/storage.py) :
+    [(emplacement, nom dans l'archive, FileStat)].
+    """
+    files = []
+    for article in manifest["articles"]:
+        for experience in article["experiences"]:
+            for donnee in experience["donnees"]:
+                source_path = donnee.pop("source_path")
+                try:
+                    files.append((source_path, donnee["file"], file_stat(source_path)))
+                except FileNotFoundError:
+                    donnee["file"] = None
+                    donnee["missing"] = True
+    return files
+
+
+class _StreamSink:
+    """Destination d'écriture non positionnable ; les octets sont vidés après chaque morceau."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(manifest):
+    """Génère l'archive zip (manifeste + fichiers) par morceaux."""
+    files = _files_to_pack(manifest)
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2))
+        yield sink.drain()
+        for source_path, name, stat in files:
+            info = zipfile.ZipInfo(name, date_time=time.localtime(stat.mtime_ns // 10**9)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.file_size = stat.size
+            with archive.open(info, mode="w") as entry:
+                for chunk in iter_chunks(source_path, CHUNK_SIZE):
+                    entry.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _tar_header(name, size, mtime):
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = mtime
+    info.mode = 0o644
+    return info.tobuf(format=tarfile.PAX_FORMAT)
+
+
+def stream_tar(manifest):
+    """Génère l'archive tar (non compressée) par morceaux."""
+    files = _files_to_pack(manifest)
+    manifest_bytes = json.dumps(manifest, ensure_ascii=False, indent=2).encode()
+    now = int(time.time())
+
+    yield _tar_header(MANIFEST_NAME, len(manifest_bytes), now)
+    yield manifest_bytes + tarfile.NUL * (-len(manifest_bytes) % tarfile.BLOCKSIZE)
+
+    for source_path, name, stat in files:
+        size = stat.size
+        yield _tar_header(name, size, stat.mtime_ns // 10**9)
+        written = 0
+        for chunk in iter_chunks(source_path, CHUNK_SIZE):
+            # Le fichier a pu grossir depuis file_stat : ne pas dépasser la taille annoncée
+            chunk = chunk[:size - written]
+            written += len(chunk)
+            yield chunk
+        yield tarfile.NUL * (size - written + (-size % tarfile.BLOCKSIZE))
+
+    # Fin d'archive : deux blocs nuls
+    yield tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+
+
+def stream_archive(manifest, archive_format):
+    """Générateur d'octets de l'archive au format demandé ("zip" ou "tar")."""
+    if archive_format == "tar":
+        return stream_tar(manifest)
+    return stream_zip(manifest)
+
+
+def archive_response(manifest, archive_format, filename):
+    """Réponse HTTP streamée de l'archive ; `filename` sans extension."""
+    return StreamingResponse(
+        stream_archive(manifest, archive_format),
+        media_type=ARCHIVE_FORMATS[archive_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{archive_format}"'},
+    )
@@ -0,0 +1,385 @@
+"""
+Grandeurs dosimétriques extraites des courbes à l'ingestion (table donnee_features).
+
+- Choix de l'extracteur par Donnee.data_type : "pdd" (rendement en
+  profondeur) et "profile" (profil de dose) ; les autres types sont notés
+  "skipped".
+- Axes : d'après les ColumnMapping de la donnée ; l'abscisse est la colonne
+  de longueur (unité mm/cm/m, ou nom "depth", "position"...), convertie en
+  mm ; la dose est la colonne de dose (unité Gy, cGy, %, MU ou nom "dose").
+  Sans mapping : noms et unités de l'en-tête du fichier ("Depth (mm)") ;
+  à défaut, première colonne = abscisse (cm par défaut), deuxième = dose. La dose est normalisée, son unité est sans effet.
+- Calculs vectorisés NumPy (interpolation linéaire, passages de niveau) :
+  PDD : d_max (sommet affiné par parabole), D10 et D20 (% de la dose
+  maximale à 100 et 200 mm), R50 ; profil : largeur de champ à 50 %,
+  pénombre 80/20 (moyenne des deux bords) et planéité sur les 80 % centraux,
+  après normalisation à l'axe (milieu des points à 50 %).
+
+La même lecture du fichier produit le vecteur de forme de la courbe
+(donnee_vectors, voir app/services/similarity.py) pour tout type de courbe
+1D, y compris sans extracteur de grandeurs.
+
+Le calcul est lancé en tâche de fond après l'upload (compute_features_task)
+et, pour les données existantes ou importées en masse, par
+scripts/extract_features.py. FEATURES_VERSION est enregistré avec chaque
+ligne : l'incrémenter fait recalculer les lignes par le script.
+"""
+import logging
+import os
+import re
+
+import numpy as np
+from sqlalchemy import select
+
+from app.cache import bump_generation
+from app.database import SessionLocal
+from app.models.column_mapping import ColumnMapping
+from app.models.donnee import Donnee
+from app.models.donnee_features import DonneeFeatures
+from app.models.donnee_vector import DonneeVector
+from app.services.partitions import mapping_window
+from app.services.similarity import NON_CURVE_TYPES, curve_vector, to_bytes
+from app.services.tabular import SNIFF_BYTES, header_unit, read_numeric_columns, sniff
+from app.services.units import DEFAULT_LENGTH_UNIT, LENGTH_COLUMN_WORDS, LENGTH_FACTORS_MM
+from app.storage import read_bytes
+
+logger = logging.getLogger(__name__)
+
+FEATURES_VERSION = 2  # 2 : vecteurs de forme (donnee_vectors)
+# Fichiers plus gros (grilles 3D...) : seul le début est lu
+FEATURES_MAX_BYTES = int(os.getenv("FEATURES_MAX_BYTES", str(32 * 1024 * 1024)))
+MIN_POINTS = 5
+
+DOSE_UNITS = {"gy", "cgy", "mgy", "%", "percent", "mu"}
+DOSE_COLUMN_WORDS = {"dose", "pdd", "signal", "reading", "lecture", "charge", "relative", "rel"}
+
+FEATURE_COLUMNS = (
+    "dmax_mm", "d10_pct", "d20_pct", "r50_mm",
+    "field_width_mm", "penumbra_mm", "flatness_pct",
+)
+
+
+class FeatureExtractionError(ValueError):
+    """Courbe inexploitable (colonnes introuvables, trop peu de points...)."""
+
+
+# --- Axes ---
+
+def _words(name):
+    return set(re.findall(r"[a-z]+", (name or "").lower()))
+
+
+def choose_axes(mappings, header):
+    """
+    Colonnes (abscisse, dose) du fichier et unité de l'abscisse.
+
+    Args:
+        mappings: Liste de {"name", "unit"} dans l'ordre saisi dans l'assistant
+        header: En-tête du fichier ([] si absent)
+
+    Returns:
+        tuple: (index abscisse, index dose, unité de longueur)
+    """
+    names = [(m.get("name") or "").strip().lower() for m in mappings]
+    units = [(m.get("unit") or "").strip().lower() for m in mappings]
+    axis = next((i for i, unit in enumerate(units) if unit in LENGTH_FACTORS_MM), None)
+    if axis is None:
+        axis = next((i for i, name in enumerate(names) if _words(name) & LENGTH_COLUMN_WORDS), None)
+    dose = next((i for i, unit in enumerate(units) if unit in DOSE_UNITS and i != axis), None)
+    if dose is None:
+        dose = next((i for i, name in enumerate(names) if _words(name) & DOSE_COLUMN_WORDS and i != axis), None)
+    length_unit = units[axis] if axis is not None and units[axis] in LENGTH_FACTORS_MM else DEFAULT_LENGTH_UNIT
+
+    # Indices dans le fichier : par nom si l'en-tête le permet, sinon ordre du mapping
+    position = {name.strip().lower(): i for i, name in enumerate(header)}
+
+    def file_index(i, fallback):
+        if i is None:
+            return fallback
+        return position.get(names[i], i) if header else i
+
+    axis_index = file_index(axis, 0)
+    dose_index = file_index(dose, 1 if axis_index != 1 else 0)
+    if axis_index == dose_index:
+        raise FeatureExtractionError("Colonnes abscisse et dose confondues")
+    return axis_index, dose_index, length_unit
+
+
+def load_curve(path, mappings):
+    """Courbe (x en mm, dose) triée par abscisse, sans valeurs non finies."""
+    raw = read_bytes(path, FEATURES_MAX_BYTES)
+    dialect = sniff(raw[:SNIFF_BYTES], complete=len(raw) < SNIFF_BYTES)
+    if not mappings:
+        # Pas de mapping saisi : noms et unités de l'en-tête ("Depth (mm)")
+        mappings = [{"name": name, "unit": header_unit(name)} for name in dialect.header]
+    axis_index, dose_index, length_unit = choose_axes(mappings, dialect.header)
+    truncated = bool(FEATURES_MAX_BYTES) and len(raw) == FEATURES_MAX_BYTES
+    data = read_numeric_columns(raw, dialect, (axis_index, dose_index), truncated=truncated)
+    x = data[:, 0] * LENGTH_FACTORS_MM[length_unit]
+    y = data[:, 1]
+    finite = np.isfinite(x) & np.isfinite(y)
+    x, y = x[finite], y[finite]
+    if x.size < MIN_POINTS:
+        raise FeatureExtractionError(f"Moins de {MIN_POINTS} points numériques")
+    order = np.argsort(x, kind="stable")
+    return x[order], y[order]
+
+
+# --- Calculs ---
+
+def crossings(x, y, level):
+    """Abscisses interpolées où la courbe traverse `level` (ordre croissant)."""
+    shifted = y - level
+    above = shifted >= 0
+    idx = np.nonzero(above[:-1] != above[1:])[0]
+    y0, y1 = shifted[idx], shifted[idx + 1]
+    return x[idx] + (x[idx + 1] - x[idx]) * (-y0 / (y1 - y0))
+
+
+def _peak(x, y):
+    """Abscisse du maximum, affinée par la parabole passant par ses voisins."""
+    i = int(np.argmax(y))
+    if 0 < i < x.size - 1:
+        x3, y3 = x[i - 1:i + 2], y[i - 1:i + 2]
+        a, b, _ = np.polyfit(x3 - x[i], y3, 2)
+        if a < 0:
+            offset = -b / (2 * a)
+            if abs(offset) <= max(x[i + 1] - x[i], x[i] - x[i - 1]):
+                return float(x[i] + offset)
+    return float(x[i])
+
+
+def _interp_inside(x, y, at):
+    if x[0] <= at <= x[-1]:
+        return float(np.interp(at, x, y))
+    return None
+
+
+def pdd_features(x, y) -> dict:
+    """d_max, D10, D20 (% du maximum) et R50 d'un rendement en profondeur."""
+    peak = float(np.max(y))
+    if peak <= 0:
+        raise FeatureExtractionError("Dose maximale nulle")
+    y = 100.0 * y / peak
+    dmax = _peak(x, y)
+    after = x >= dmax
+    r50 = crossings(x[after], y[after], 50.0)
+    return {
+        "dmax_mm": dmax,
+        "d10_pct": _interp_inside(x, y, 100.0),
+        "d20_pct": _interp_inside(x, y, 200.0),
+        "r50_mm": float(r50[0]) if r50.size else None,
+    }
+
+
+def profile_features(x, y) -> dict:
+    """Largeur à 50 %, pénombre 80/20 et planéité d'un profil normalisé à l'axe."""
+    peak = float(np.max(y))
+    if peak <= 0:
+        raise FeatureExtractionError("Dose maximale nulle")
+    half = crossings(x, y / peak, 0.5)
+    if half.size < 2:
+        raise FeatureExtractionError("Bords du champ (50 %) introuvables")
+    center = (half[0] + half[-1]) / 2
+    axis_dose = float(np.interp(center, x, y))
+    if axis_dose <= 0:
+        raise FeatureExtractionError("Dose nulle sur l'axe")
+    y = 100.0 * y / axis_dose
+
+    levels = crossings(x, y, 50.0), crossings(x, y, 80.0), crossings(x, y, 20.0)
+    if any(level.size < 2 for level in levels):
+        raise FeatureExtractionError("Niveaux 80 % / 20 % introuvables")
+    at50, at80, at20 = levels
+    width = float(at50[-1] - at50[0])
+    left = at80[0] - at20[0]
+    right = at20[-1] - at80[-1]
+
+    central = np.abs(x - center) <= 0.4 * width
+    flatness = None
+    if np.count_nonzero(central) >= 3:
+        high, low = float(np.max(y[central])), float(np.min(y[central]))
+        flatness = 100.0 * (high - low) / (high + low)
+    return {
+        "field_width_mm": width,
+        "penumbra_mm": float((left + right) / 2),
+        "flatness_pct": flatness,
+    }
+
+
+EXTRACTORS = {
+    "pdd": pdd_features,
+    "profile": profile_features,
+}
+
+
+def extract(data_type, path, mappings):
+    """
+    Grandeurs et vecteur de forme d'une donnée (une seule lecture du fichier).
+
+    Returns:
+        tuple: (colonnes de DonneeFeatures, status "ok", "skipped" ou "error" ;
+                octets du vecteur de similarity.curve_vector, ou None)
+    """
+    data_type = (data_type or "").strip().lower()
+    extractor = EXTRACTORS.get(data_type)
+    if extractor is None and data_type in NON_CURVE_TYPES:
+        return {"status": "skipped", "detail": f"Type de donnée sans extracteur : {data_type}"}, None
+    try:
+        x, y = load_curve(path, mappings)
+    except (OSError, ValueError) as e:
+        # FeatureExtractionError et erreurs d'analyse de numpy sont des ValueError
+        return {"status": "error", "detail": str(e)[:500]}, None
+    vector = curve_vector(x, y)
+    vector = to_bytes(vector) if vector is not None else None
+    if extractor is None:
+        return {"status": "skipped", "detail": f"Type de donnée sans extracteur : {data_type}"}, vector
+    try:
+        values = extractor(x, y)
+    except ValueError as e:
+        return {"status": "error", "detail": str(e)[:500]}, vector
+    return {
+        "status": "ok",
+        "detail": None,
+        **{name: (round(value, 4) if value is not None else None) for name, value in values.items()},
+    }, vector
+
+
+# --- Enregistrement ---
+
+def _mappings_of(db, donnee):
+    rows = db.execute(
+        select(ColumnMapping.column_name, ColumnMapping.unit)
+        .where(ColumnMapping.data_id == donnee.data_id, ColumnMapping.ingested_at == donnee.ingested_at)
+        .order_by(ColumnMapping.mapping_id)
+    ).all()
+    return [{"name": name, "unit": unit} for name, unit in rows]
+
+
+def store_features(db, donnee) -> DonneeFeatures:
+    """Calcule et enregistre (ou remplace) les grandeurs et le vecteur d'une donnée ; non committé."""
+    values, vector = extract(donnee.data_type, donnee.file_path, _mappings_of(db, donnee))
+    features = db.get(DonneeFeatures, donnee.data_id) or DonneeFeatures(data_id=donnee.data_id)
+    for name in FEATURE_COLUMNS:
+        setattr(features, name, values.get(name))
+    features.status = values["status"]
+    features.detail = values.get("detail")
+    features.version = FEATURES_VERSION
+    db.add(features)
+
+    stored = db.get(DonneeVector, donnee.data_id)
+    if vector is None:
+        if stored is not None:
+            db.delete(stored)
+    else:
+        stored = stored or DonneeVector(data_id=donnee.data_id)
+        stored.vector = vector
+        stored.version = FEATURES_VERSION
+        db.add(stored)
+    return features
+
+
+def compute_features_task(data_ids):
+    """Tâche de fond lancée après un upload : grandeurs et vecteurs des données."""
+    with SessionLocal() as db:
+        for data_id in data_ids:
+            donnee = db.get(Donnee, data_id)
+            if donnee is None:
+                continue
+            try:
+                features = store_features(db, donnee)
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception("Feature extraction failed", extra={"data_id": data_id})
+                continue
+            logger.info("Features stored", extra={"data_id": data_id, "status": features.status})
+    # Les recherches par grandeurs en cache ne voient pas les nouvelles lignes
+    bump_generation()
+
+
+# --- Calcul par lots (données existantes, imports en masse) ---
+
+def _pending_ids(conn, after_id, limit, recompute, data_type):
+    query = select(Donnee.data_id).outerjoin(DonneeFeatures).where(Donnee.data_id > after_id)
+    if not recompute:
+        query = query.where(
+            (DonneeFeatures.data_id.is_(None)) | (DonneeFeatures.version < FEATURES_VERSION)
+        )
+    if data_type:
+        query = query.where(Donnee.data_type == data_type)
+    return [row[0] for row in conn.execute(query.order_by(Donnee.data_id).limit(limit))]
+
+
+def _chunk_inputs(conn, data_ids):
+    donnees = conn.execute(
+        select(Donnee.data_id, Donnee.data_type, Donnee.file_path, Donnee.ingested_at)
+        .where(Donnee.data_id.in_(data_ids))
+    ).all()
+    mappings = {}
+    for data_id, name, unit in conn.execute(
+        select(ColumnMapping.data_id, ColumnMapping.column_name, ColumnMapping.unit)
+        .where(ColumnMapping.data_id.in_(data_ids), mapping_window(row.ingested_at for row in donnees))
+        .order_by(ColumnMapping.data_id, ColumnMapping.mapping_id)
+    ):
+        mappings.setdefault(data_id, []).append({"name": name, "unit": unit})
+    return [(data_id, data_type, path, mappings.get(data_id, [])) for data_id, data_type, path, _ in donnees]
+
+
+def _extract_job(job):
+    _, data_type, path, mappings = job
+    return extract(data_type, path, mappings)
+
+
+def extract_pending(engine, chunk_size=500, pool=None, recompute=False, data_type=None, log=logger.info):
+    """
+    Calcule les grandeurs et vecteurs des données qui n'en ont pas (ou d'une version
+    antérieure), par lots committés séparément.
+
+    Args:
+        engine: Engine SQLAlchemy
+        chunk_size: Données par lot
+        pool: Exécuteur (ex. ProcessPoolExecutor) pour paralléliser les
+              calculs ; None : calcul dans le thread courant
+        recompute: Recalculer toutes les données
+        data_type: Limiter à un type de donnée
+        log: Fonction de journalisation de la progression
+
+    Returns:
+        dict: nombre de données par statut
+    """
+    table = DonneeFeatures.__table__
+    vectors = DonneeVector.__table__
+    totals = {}
+    after_id = 0
+    while True:
+        with engine.connect() as conn:
+            data_ids = _pending_ids(conn, after_id, chunk_size, recompute, data_type)
+            if not data_ids:
+                break
+            jobs = _chunk_inputs(conn, data_ids)
+        # Même fichier et mêmes colonnes (données dupliquées) : un seul calcul
+        unique = {}
+        for job in jobs:
+            unique.setdefault((job[1], job[2], tuple(tuple(m.items()) for m in job[3])), job)
+        keys = list(unique)
+        results = (pool.map if pool else map)(_extract_job, [unique[key] for key in keys])
+        by_key = dict(zip(keys, results))
+        rows, vector_rows = [], []
+        for job in jobs:
+            values, vector = by_key[(job[1], job[2], tuple(tuple(m.items()) for m in job[3]))]
+            rows.append({"data_id": job[0], "version": FEATURES_VERSION, "detail": None,
+                         **{name: None for name in FEATURE_COLUMNS}, **values})
+            if vector is not None:
+                vector_rows.append({"data_id": job[0], "vector": vector, "version": FEATURES_VERSION})
+            totals[values["status"]] = totals.get(values["status"], 0) + 1
+        with engine.begin() as conn:
+            conn.execute(table.delete().where(table.c.data_id.in_(data_ids)))
+            conn.execute(table.insert(), rows)
+            conn.execute(vectors.delete().where(vectors.c.data_id.in_(data_ids)))
+            if vector_rows:
+                conn.execute(vectors.insert(), vector_rows)
+        after_id = data_ids[-1]
+        log(f"  données jusqu'à #{after_id} : {totals}")
+    if totals:
+        bump_generation()
+    return totals
@@ -0,0 +1,116 @@
+"""
+Clés d'idempotence des soumissions (en-tête Idempotency-Key).
+
+Un client qui n'a pas reçu la réponse d'une soumission (délai dépassé,
+connexion coupée) la renvoie avec la même clé : la réponse d'origine est
+rejouée sans refaire la transaction ni l'écriture du fichier.
+
+- La clé, l'empreinte de la requête et la réponse sont enregistrées dans
+  idempotency_keys, dans la transaction de la soumission : une soumission
+  annulée ne laisse pas de clé, et le client peut réessayer.
+- PostgreSQL : la transaction commence par pg_advisory_xact_lock sur la
+  clé ; un doublon concurrent attend la fin de la première requête (au plus
+  IDEMPOTENCY_LOCK_TIMEOUT secondes, sinon 409) puis rejoue sa réponse.
+  Ailleurs (SQLite, écritures déjà sérialisées), la clé primaire départage
+  deux doublons : le second échoue au commit et rejoue la réponse du premier.
+- Une clé réutilisée pour une requête différente (autre route, autres
+  champs, autre fichier) est refusée (422).
+- Les clés expirent après IDEMPOTENCY_TTL_HOURS heures
+  (scripts/purge_idempotency_keys.py).
+"""
+import hashlib
+import json
+import os
+from datetime import timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.models.idempotency_key import IdempotencyKey
+from app.serialization import FastJSONResponse
+from app.services.changes import utcnow
+
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "30"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def check_key(key):
+    """Valide l'en-tête (None : pas d'idempotence demandée)."""
+    if key is not None and not 0 < len(key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+
+
+def request_fingerprint(route, fields, file=None) -> str:
+    """
+    Empreinte d'une requête : route, champs du formulaire, nom et taille du
+    fichier (le contenu n'est pas relu : le corps a déjà été reçu en entier).
+    """
+    payload = {"route": route, "fields": fields}
+    if file is not None:
+        payload["file"] = [file.filename, file.size]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _lock_id(key) -> int:
+    """Entier signé 64 bits dérivé de la clé (pg_advisory_xact_lock)."""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def lock_key(db: Session, key):
+    """Verrou transactionnel sur la clé (PostgreSQL), libéré au commit ou rollback."""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    db.execute(text(f"SET LOCAL lock_timeout = '{int(IDEMPOTENCY_LOCK_TIMEOUT * 1000)}ms'"))
+    try:
+        db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _lock_id(key)})
+    except OperationalError:  # lock_timeout dépassé
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is in progress",
+            headers={"Retry-After": str(int(IDEMPOTENCY_LOCK_TIMEOUT))},
+        )
+
+
+def stored_response(db: Session, key, fingerprint):
+    """
+    Réponse enregistrée pour la clé, ou None.
+
+    Raises:
+        HTTPException: 422 si la clé a servi à une autre requête
+    """
+    row = db.execute(select(IdempotencyKey).where(IdempotencyKey.key == key)).scalar_one_or_none()
+    if row is None:
+        return None
+    if row.created_at < utcnow() - timedelta(hours=IDEMPOTENCY_TTL_HOURS):
+        db.delete(row)
+        db.flush()
+        return None
+    if row.request_hash != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key reused with a different request")
+    return row.response_status, json.loads(row.response_body)
+
+
+def save_response(db: Session, key, fingerprint, status_code, body):
+    """Enregistre la réponse dans la transaction courante (sans commit)."""
+    db.add(IdempotencyKey(
+        key=key, request_hash=fingerprint, response_status=status_code,
+        response_body=json.dumps(body), created_at=utcnow(),
+    ))
+
+
+def replay_response(status_code, body):
+    return FastJSONResponse(body, status_code=status_code, headers={REPLAYED_HEADER: "true"})
+
+
+def purge_expired(db: Session) -> int:
+    """Supprime les clés expirées ; retourne leur nombre."""
+    cutoff = utcnow() - timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff))
+    db.commit()
+    return result.rowcount
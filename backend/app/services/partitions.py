@@ -0,0 +1,185 @@
+"""
+Partitionnement mensuel de column_mappings (PostgreSQL).
+
+column_mappings (plusieurs lignes par donnée, la plus grosse table) est
+partitionnée par plage sur ingested_at : une partition par mois
+(column_mappings_p2026_10) et une partition par défaut. Chaque partition a
+ses propres index : leur taille et le coût du vacuum sont bornés par le
+volume d'un mois, et une partition froide, figée (VACUUM FREEZE) puis
+déplacée vers un tablespace moins cher, n'est plus touchée par la
+maintenance.
+
+- Le ingested_at d'une colonne est celui de sa donnée : recopié à la
+  création (routes, chargements en masse). Les lectures le précisent
+  (relation Donnee.column_mappings, mapping_window) pour que le
+  planificateur ne parcoure que les partitions concernées.
+- donnees reste une table simple : trois tables la référencent par data_id,
+  clé qu'une table partitionnée par date ne peut pas garantir unique seule.
+  Son index BRIN sur ingested_at tient en quelques pages quelle que soit
+  sa taille.
+- ensure_partitions (migration 0009, scripts/manage_partitions.py, tâche
+  mensuelle) crée les partitions du mois courant et des
+  PARTITION_PREMAKE_MONTHS suivants ; les lignes déjà reçues par la
+  partition par défaut pour ces mois y sont déplacées.
+- archive_partition fige puis déplace vers ARCHIVE_TABLESPACE une partition
+  plus ancienne que PARTITION_ARCHIVE_AFTER_MONTHS mois ; elle reste
+  attachée et lisible.
+- Autres bases (SQLite) : colonnes ingested_at, sans partitionnement.
+"""
+import os
+import re
+from datetime import datetime
+
+from sqlalchemy import text, true
+
+from app.models.column_mapping import ColumnMapping
+from app.services.changes import utcnow
+
+PARTITIONED_TABLE = "column_mappings"
+DEFAULT_PARTITION = f"{PARTITIONED_TABLE}_default"
+PARTITION_PREMAKE_MONTHS = int(os.getenv("PARTITION_PREMAKE_MONTHS", "3"))
+PARTITION_ARCHIVE_AFTER_MONTHS = int(os.getenv("PARTITION_ARCHIVE_AFTER_MONTHS", "12"))
+ARCHIVE_TABLESPACE = os.getenv("ARCHIVE_TABLESPACE")
+
+_MONTH_SUFFIX = re.compile(rf"^{PARTITIONED_TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def mapping_window(ingested_ats):
+    """
+    Condition sur ColumnMapping.ingested_at couvrant les dates d'ingestion
+    de données déjà lues : les colonnes de ces données ne sont cherchées que
+    dans les partitions de ces mois.
+    """
+    values = [value for value in ingested_ats if value is not None]
+    if not values:
+        return true()
+    return ColumnMapping.ingested_at.between(min(values), max(values))
+
+
+# --- Mois ---
+
+def month_start(value) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month, count) -> datetime:
+    years, index = divmod(month.month - 1 + count, 12)
+    return datetime(month.year + years, index + 1, 1)
+
+
+def partition_name(month) -> str:
+    return f"{PARTITIONED_TABLE}_p{month:%Y_%m}"
+
+
+def partition_month(name):
+    """Mois d'une partition mensuelle d'après son nom (None : partition par défaut)."""
+    match = _MONTH_SUFFIX.match(name)
+    return datetime(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+# --- Partitions ---
+
+def is_partitioned(conn) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid
+            WHERE c.relname = :table AND pg_table_is_visible(c.oid)
+        )
+    """), {"table": PARTITIONED_TABLE}).scalar()
+
+
+def list_partitions(conn):
+    """Partitions de column_mappings : nom, mois, lignes (estimation), taille avec index, tablespace."""
+    rows = conn.execute(text("""
+        SELECT c.relname, c.reltuples::bigint, pg_total_relation_size(c.oid),
+               COALESCE(t.spcname, 'pg_default')
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        LEFT JOIN pg_tablespace t ON t.oid = c.reltablespace
+        WHERE p.relname = :table AND pg_table_is_visible(p.oid)
+        ORDER BY c.relname
+    """), {"table": PARTITIONED_TABLE})
+    return [
+        {"name": name, "month": partition_month(name), "rows": max(rows, 0), "bytes": size, "tablespace": space}
+        for name, rows, size, space in rows
+    ]
+
+
+def _create_partition(conn, month):
+    name, lower, upper = partition_name(month), month, add_months(month, 1)
+    bounds = {"lower": lower, "upper": upper}
+    # Une partition ne peut pas être créée sur des lignes de la partition par
+    # défaut : elles sont déplacées dans la nouvelle table avant l'attachement
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARTITIONED_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE ingested_at >= :lower AND ingested_at < :upper RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), bounds)
+    conn.execute(text(
+        f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{lower:%Y-%m-%d}') TO ('{upper:%Y-%m-%d}')"
+    ))
+
+
+def ensure_partitions(conn, now=None, ahead=PARTITION_PREMAKE_MONTHS):
+    """
+    Crée les partitions manquantes du mois courant et des `ahead` suivants
+    (transaction de l'appelant).
+
+    Returns:
+        list: noms des partitions créées
+    """
+    if not is_partitioned(conn):
+        return []
+    existing = {partition["name"] for partition in list_partitions(conn)}
+    first = month_start(now or utcnow())
+    created = []
+    for offset in range(ahead + 1):
+        month = add_months(first, offset)
+        if partition_name(month) not in existing:
+            _create_partition(conn, month)
+            created.append(partition_name(month))
+    return created
+
+
+def cold_partitions(conn, tablespace, now=None, after_months=PARTITION_ARCHIVE_AFTER_MONTHS):
+    """Partitions mensuelles terminées depuis plus de `after_months` mois, hors de `tablespace`."""
+    cutoff = add_months(month_start(now or utcnow()), -after_months)
+    return [
+        partition for partition in list_partitions(conn)
+        if partition["month"] is not None and add_months(partition["month"], 1) <= cutoff
+        and partition["tablespace"] != tablespace
+    ]
+
+
+def archive_partition(engine, name, tablespace):
+    """
+    Fige une partition froide puis la déplace, avec ses index, vers
+    `tablespace`. Le déplacement réécrit la partition sous verrou exclusif :
+    à lancer hors des heures d'import.
+
+    Raises:
+        ValueError: tablespace inconnu
+    """
+    with engine.connect() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM pg_tablespace WHERE spcname = :name"), {"name": tablespace}
+        ).scalar()
+    if not exists:
+        raise ValueError(f"Unknown tablespace: {tablespace}")
+    # VACUUM hors transaction ; tuples figés : plus de vacuum anti-wraparound
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"VACUUM (FREEZE, ANALYZE) {name}"))
+    with engine.begin() as conn:
+        quoted = conn.dialect.identifier_preparer.quote(tablespace)
+        conn.execute(text(f"ALTER TABLE {name} SET TABLESPACE {quoted}"))
+        indexes = conn.execute(text(
+            "SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = CAST(:name AS regclass)"
+        ), {"name": name}).scalars().all()
+        for index in indexes:
+            conn.execute(text(f"ALTER INDEX {index} SET TABLESPACE {quoted}"))
@@ -0,0 +1,131 @@
+"""
+Aperçu d'un fichier de données avant sa soumission (POST /donnees/preview).
+
+Seul un échantillon du début du fichier est analysé (au plus SNIFF_BYTES,
+voir app/services/tabular.py) : le temps de réponse ne dépend pas de la
+taille du fichier. L'échantillon donne le format (encodage, séparateur,
+en-tête), le type de chaque colonne et des colonnes proposées à
+l'assistant (ColumnMapping du frontend), avec l'unité lue dans l'en-tête
+("Dose (Gy)", "depth [mm]") ou déduite du nom de la colonne.
+"""
+import re
+
+from app.services.tabular import COMMENT_PREFIXES, SNIFF_BYTES, header_unit, is_number, sniff, split_line
+
+PREVIEW_BYTES = SNIFF_BYTES
+PREVIEW_ROWS = 10
+
+# Unités de l'en-tête -> valeurs de la liste de l'assistant (ColumnMappingStep)
+WIZARD_UNITS = {
+    "gy": "gy", "cgy": "cgy", "mm": "mm", "cm": "cm", "mev": "mev", "mu": "mu",
+    "%": "percent", "percent": "percent", "pct": "percent",
+}
+# Colonnes sans unité dans l'en-tête : unité déduite du nom
+PERCENT_COLUMN_WORDS = {"pdd", "percent", "pct", "relative", "rel", "normalized", "normalised"}
+MU_COLUMN_WORDS = {"mu", "monitor"}
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?$|^\d{2}/\d{2}/\d{4}( \d{2}:\d{2}(:\d{2})?)?$")
+# Signatures de formats binaires (xlsx/zip, npy, hdf5) ; DICOM : octet nul
+_BINARY_SIGNATURES = (b"PK\x03\x04", b"\x93NUMPY", b"\x89HDF")
+
+DELIMITER_LABELS = {",": ",", ";": ";", "\t": "tab", None: "whitespace"}
+
+
+class UnsupportedPreviewError(ValueError):
+    """Échantillon qui n'est pas un fichier texte à colonnes."""
+
+
+def is_binary(sample: bytes) -> bool:
+    return sample.startswith(_BINARY_SIGNATURES) or b"\x00" in sample[:8192]
+
+
+def column_dtype(values) -> str:
+    """Type d'une colonne de l'échantillon : numeric, datetime, categorical ou text."""
+    values = [value for value in values if value]
+    if not values:
+        return "text"
+    if all(is_number(value) for value in values):
+        return "numeric"
+    if all(_DATE_RE.match(value) for value in values):
+        return "datetime"
+    distinct = len(set(values))
+    if len(values) >= 10 and distinct <= max(2, len(values) // 5):
+        return "categorical"
+    return "text"
+
+
+def _words(name):
+    return set(re.findall(r"[a-z]+", (name or "").lower()))
+
+
+def guess_unit(name, dtype):
+    """
+    Unité proposée pour une colonne.
+
+    Returns:
+        tuple: (valeur de l'assistant ou "custom" ou "", unité lue dans l'en-tête ou None)
+    """
+    unit = header_unit(name)
+    if unit is not None:
+        return WIZARD_UNITS.get(unit, "custom"), unit
+    if dtype != "numeric":
+        return "none", None
+    words = _words(name)
+    if words & PERCENT_COLUMN_WORDS:
+        return "percent", None
+    if words & MU_COLUMN_WORDS:
+        return "mu", None
+    return "", None
+
+
+def preview_sample(sample: bytes, complete: bool) -> dict:
+    """
+    Analyse l'échantillon d'un fichier.
+
+    Args:
+        sample: Premiers octets du fichier (au plus PREVIEW_BYTES)
+        complete: True si l'échantillon est le fichier entier
+
+    Raises:
+        UnsupportedPreviewError: échantillon binaire
+    """
+    if is_binary(sample):
+        raise UnsupportedPreviewError("Binary file: preview supports delimited text files only")
+
+    dialect = sniff(sample, complete=complete)
+    text = sample.decode(dialect.encoding, errors="ignore")
+    lines = text.splitlines()
+    if not complete and len(lines) > 1:
+        lines = lines[:-1]  # dernière ligne peut-être coupée
+    rows = [
+        split_line(line, dialect.delimiter)
+        for line in lines[dialect.skip_lines:]
+        if line.strip() and not line.lstrip().startswith(COMMENT_PREFIXES)
+    ]
+
+    width = len(dialect.header) if dialect.header else max((len(row) for row in rows), default=0)
+    columns, suggested = [], []
+    for index in range(width):
+        values = [row[index] if index < len(row) else "" for row in rows]
+        name = dialect.header[index] if dialect.header else f"column_{index + 1}"
+        dtype = column_dtype(values)
+        unit, unit_label = guess_unit(name if dialect.header else "", dtype)
+        column = {"index": index, "name": name, "dtype": dtype, "unit": unit, "header_unit": unit_label}
+        if dtype == "numeric":
+            numbers = [float(value) for value in values if value]
+            column["min"], column["max"] = min(numbers), max(numbers)
+        columns.append(column)
+        suggested.append({"name": name, "description": "", "unit": unit, "dataType": dtype})
+
+    return {
+        "encoding": dialect.encoding,
+        "delimiter": DELIMITER_LABELS.get(dialect.delimiter, dialect.delimiter),
+        "has_header": bool(dialect.header),
+        "skip_lines": dialect.skip_lines,
+        "sample_bytes": len(sample),
+        "complete": complete,
+        "rows_sampled": len(rows),
+        "columns": columns,
+        "suggested_mapping": suggested,
+        "rows": rows[:PREVIEW_ROWS],
+    }
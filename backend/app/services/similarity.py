@@ -0,0 +1,297 @@
+"""
+Recherche de courbes similaires : vecteurs normalisés et index IVF sur disque.
+
+- Vecteur d'une courbe 1D (curve_vector) : dose rééchantillonnée sur
+  VECTOR_DIM points régulièrement espacés de la première à la dernière
+  abscisse, normalisée au maximum, centrée et de norme 1. Le produit
+  scalaire de deux vecteurs est leur corrélation : la comparaison porte sur
+  la forme de la courbe, indépendamment de l'unité de dose. Calculé à
+  l'ingestion (app/services/features.py) et stocké dans donnee_vectors.
+- Index IVF par type de donnée (build_index, scripts/build_similarity_index.py) :
+  k-means sphérique sur les vecteurs, vecteurs rangés par liste. Fichiers
+  .npy dans SIMILARITY_INDEX_DIR, ouverts en mmap (mémoire partagée par les
+  workers) ; un fichier pointeur <type>.json désigne la version courante,
+  remplacée de façon atomique à chaque reconstruction et rechargée par les
+  workers quand elle change.
+- Recherche (search) : les SIMILARITY_NPROBE listes dont le centroïde est le
+  plus proche de la requête sont parcourues, puis la "queue" des vecteurs
+  ajoutés depuis la construction de l'index (data_id > max_data_id de
+  l'index), lue en base, est comparée exhaustivement. Sans index, toute la
+  table est parcourue.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from app.models.donnee import Donnee
+from app.models.donnee_vector import DonneeVector
+
+logger = logging.getLogger(__name__)
+
+VECTOR_DIM = 64
+SIMILARITY_INDEX_DIR = os.getenv("SIMILARITY_INDEX_DIR", "data/similarity")
+SIMILARITY_NPROBE = int(os.getenv("SIMILARITY_NPROBE", "8"))
+SIMILARITY_CHECK_INTERVAL = float(os.getenv("SIMILARITY_CHECK_INTERVAL", "5"))
+INDEX_FORMAT = "rdh-ivf/1"
+
+# Types de données qui ne sont pas des courbes 1D (grilles de dose)
+NON_CURVE_TYPES = {"dose_grid", "dose_distribution"}
+
+
+# --- Vecteurs ---
+
+def curve_vector(x, y):
+    """
+    Vecteur de forme d'une courbe (x croissants).
+
+    Returns:
+        numpy.ndarray | None: float32 de taille VECTOR_DIM, None si la courbe
+                              est plate ou n'a pas d'étendue
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.size < 2 or x[-1] <= x[0]:
+        return None
+    peak = np.max(np.abs(y))
+    if peak == 0:
+        return None
+    vector = np.interp(np.linspace(x[0], x[-1], VECTOR_DIM), x, y / peak)
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    if norm < 1e-9:
+        return None
+    return (vector / norm).astype(np.float32)
+
+
+def to_bytes(vector) -> bytes:
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def from_bytes(raw) -> np.ndarray:
+    return np.frombuffer(raw, dtype="<f4")
+
+
+def _stack(rows):
+    """[(data_id, octets)] -> (ids int64, matrice float32)."""
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, VECTOR_DIM), dtype=np.float32)
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    matrix = np.frombuffer(b"".join(row[1] for row in rows), dtype="<f4").reshape(len(rows), VECTOR_DIM)
+    return ids, matrix
+
+
+# --- Index IVF ---
+
+def _safe_name(data_type):
+    return re.sub(r"[^a-z0-9_]", "_", data_type.lower())
+
+
+class IVFIndex:
+    """Index IVF d'un type de donnée, fichiers ouverts en mmap."""
+
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.max_data_id = meta["max_data_id"]
+        self.centroids = np.load(os.path.join(directory, "centroids.npy"))
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"))
+        self.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        self.data_ids = np.load(os.path.join(directory, "data_ids.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.data_ids)
+
+    def candidates(self, query, nprobe):
+        """(ids, scores) des vecteurs des `nprobe` listes les plus proches de la requête."""
+        lists = np.argsort(self.centroids @ query)[::-1][:nprobe]
+        ids, scores = [], []
+        for cluster in lists:
+            start, end = self.offsets[cluster], self.offsets[cluster + 1]
+            if end > start:
+                ids.append(self.data_ids[start:end])
+                scores.append(self.vectors[start:end] @ query)
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(ids), np.concatenate(scores)
+
+
+class IndexRegistry:
+    """Index courant de chaque type de donnée, rechargé quand son pointeur change."""
+
+    def __init__(self, root, check_interval=SIMILARITY_CHECK_INTERVAL):
+        self.root = root
+        self.check_interval = check_interval
+        self._entries = {}  # type -> (vérifié à, mtime du pointeur, IVFIndex | None)
+        self._lock = threading.Lock()
+
+    def get(self, data_type):
+        now = time.monotonic()
+        entry = self._entries.get(data_type)
+        if entry is not None and now - entry[0] < self.check_interval:
+            return entry[2]
+        with self._lock:
+            pointer = os.path.join(self.root, f"{_safe_name(data_type)}.json")
+            try:
+                mtime = os.stat(pointer).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            index = entry[2] if entry is not None and entry[1] == mtime else None
+            if mtime is not None and index is None:
+                try:
+                    with open(pointer, encoding="utf-8") as f:
+                        meta = json.load(f)
+                    index = IVFIndex(os.path.join(self.root, meta["directory"]), meta)
+                    logger.info("Similarity index loaded",
+                                extra={"data_type": data_type, "vectors": len(index)})
+                except (OSError, ValueError, KeyError) as e:
+                    logger.error("Invalid similarity index for %s: %s", data_type, e)
+                    index = entry[2] if entry is not None else None
+            self._entries[data_type] = (now, mtime, index)
+            return index
+
+
+registry = IndexRegistry(SIMILARITY_INDEX_DIR)
+
+
+def _tail(db, data_type, after_id):
+    rows = db.execute(
+        select(DonneeVector.data_id, DonneeVector.vector)
+        .join(Donnee, Donnee.data_id == DonneeVector.data_id)
+        .where(DonneeVector.data_id > after_id, Donnee.data_type == data_type)
+    ).all()
+    return _stack(rows)
+
+
+def search(db, data_type, query, k=10, nprobe=SIMILARITY_NPROBE):
+    """
+    Plus proches voisins d'un vecteur requête parmi les données d'un type.
+
+    Returns:
+        tuple: (liste de (data_id, score) par score décroissant,
+                statistiques {"indexed", "scanned", "tail"})
+    """
+    index = registry.get(data_type)
+    ids, scores = [], []
+    indexed = 0
+    if index is not None:
+        indexed = len(index)
+        probe_ids, probe_scores = index.candidates(query, nprobe)
+        ids.append(probe_ids)
+        scores.append(probe_scores)
+    tail_ids, tail_vectors = _tail(db, data_type, index.max_data_id if index is not None else 0)
+    ids.append(tail_ids)
+    scores.append(tail_vectors @ query)
+
+    ids, scores = np.concatenate(ids), np.concatenate(scores)
+    stats = {"indexed": indexed, "scanned": int(ids.size), "tail": int(tail_ids.size)}
+    if ids.size > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+        ids, scores = ids[top], scores[top]
+    order = np.argsort(-scores, kind="stable")
+    return [(int(ids[i]), float(scores[i])) for i in order], stats
+
+
+# --- Construction ---
+
+def _spherical_kmeans(vectors, n_lists, iterations, rng):
+    sample = vectors[rng.choice(len(vectors), size=min(len(vectors), 256 * n_lists), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        filled = norms[:, 0] > 0  # liste vide : centroïde conservé
+        centroids[filled] = sums[filled] / norms[filled]
+    return centroids
+
+
+def _assign(vectors, centroids, chunk=65536):
+    assign = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk):
+        assign[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+    return assign
+
+
+def build_index(engine, data_type, root=SIMILARITY_INDEX_DIR, n_lists=None, iterations=10, seed=0,
+                chunk_size=50000):
+    """
+    Construit l'index IVF d'un type de donnée et le publie.
+
+    Args:
+        engine: Engine SQLAlchemy
+        data_type: Type de donnée (Donnee.data_type)
+        root: Répertoire des index
+        n_lists: Nombre de listes (défaut : ~sqrt(n), au plus 4096)
+        iterations: Itérations du k-means
+        chunk_size: Vecteurs lus par requête
+
+    Returns:
+        dict: {"vectors": n, "lists": k, "max_data_id": id}
+    """
+    parts_ids, parts_vectors = [], []
+    after_id = 0
+    with engine.connect() as conn:
+        while True:
+            rows = conn.execute(
+                select(DonneeVector.data_id, DonneeVector.vector)
+                .join(Donnee, Donnee.data_id == DonneeVector.data_id)
+                .where(DonneeVector.data_id > after_id, Donnee.data_type == data_type)
+                .order_by(DonneeVector.data_id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            ids, vectors = _stack(rows)
+            parts_ids.append(ids)
+            parts_vectors.append(vectors)
+            after_id = int(ids[-1])
+    if not parts_ids:
+        return {"vectors": 0, "lists": 0, "max_data_id": 0}
+    data_ids = np.concatenate(parts_ids)
+    vectors = np.concatenate(parts_vectors)
+
+    n_lists = n_lists or int(min(4096, max(1, round(np.sqrt(len(vectors))))))
+    n_lists = min(n_lists, len(vectors))
+    centroids = _spherical_kmeans(vectors, n_lists, iterations, np.random.default_rng(seed))
+    assign = _assign(vectors, centroids)
+    order = np.argsort(assign, kind="stable")
+    offsets = np.searchsorted(assign[order], np.arange(n_lists + 1))
+
+    name = _safe_name(data_type)
+    directory = f"{name}-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+    path = os.path.join(root, directory)
+    os.makedirs(path)
+    np.save(os.path.join(path, "centroids.npy"), centroids.astype(np.float32))
+    np.save(os.path.join(path, "offsets.npy"), offsets.astype(np.int64))
+    np.save(os.path.join(path, "vectors.npy"), vectors[order])
+    np.save(os.path.join(path, "data_ids.npy"), data_ids[order])
+    meta = {
+        "format": INDEX_FORMAT, "data_type": data_type, "directory": directory,
+        "vectors": int(len(vectors)), "lists": int(n_lists), "max_data_id": int(data_ids.max()),
+    }
+
+    pointer = os.path.join(root, f"{name}.json")
+    previous = None
+    try:
+        with open(pointer, encoding="utf-8") as f:
+            previous = json.load(f).get("directory")
+    except (OSError, ValueError):
+        pass
+    tmp_pointer = pointer + ".tmp"
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_pointer, pointer)
+
+    # Versions plus anciennes : la précédente reste lisible par les workers
+    # qui ne l'ont pas encore quittée
+    for entry in os.listdir(root):
+        if entry.startswith(f"{name}-") and entry not in (directory, previous):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    return {"vectors": meta["vectors"], "lists": meta["lists"], "max_data_id": meta["max_data_id"]}
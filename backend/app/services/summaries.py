@@ -0,0 +1,174 @@
+"""
+Résumés d'expériences (équipements liés et données) pour l'assistant et
+les pages article / tableau de bord.
+
+build_summaries construit les résumés d'un ensemble d'expériences avec un
+nombre fixe de requêtes (une par table, filtrées par IN), quel que soit le
+nombre d'expériences : GET /experiences/{id}/summary et
+POST /experiences/summaries partagent ce code.
+
+Les résumés sont conservés en mémoire par expérience (LRU de
+SUMMARY_CACHE_SIZE entrées, 0 pour désactiver), valides pour la génération
+du cache HTTP (app/cache.py) qui les a produits : toute écriture les
+invalide. Seules les sessions du primaire lisent et alimentent ce cache :
+un résumé lu sur une réplique en retard serait sinon servi aux clients
+routés vers le primaire (lecture de leurs propres écritures).
+"""
+import os
+import threading
+from collections import OrderedDict, defaultdict
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.cache import generation
+from app.database import engine
+from app.models.detector import Detector
+from app.models.donnee import Donnee
+from app.models.experience import Experience
+from app.models.experience_detector import ExperienceDetector
+from app.models.experience_machine import ExperienceMachine
+from app.models.experience_phantom import ExperiencePhantom
+from app.models.machine import Machine
+from app.models.phantom import Phantom
+from app.serialization import rows_to_dicts
+
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "10000"))
+# Identifiants par requête POST /experiences/summaries
+SUMMARY_BATCH_MAX = int(os.getenv("SUMMARY_BATCH_MAX", "500"))
+
+
+class SummaryCache:
+    """LRU experience_id -> (génération, résumé)."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, experience_ids, current_generation):
+        found = {}
+        if self.max_entries <= 0:
+            return found
+        with self._lock:
+            for experience_id in experience_ids:
+                entry = self._entries.get(experience_id)
+                if entry is None:
+                    continue
+                if entry[0] != current_generation:
+                    del self._entries[experience_id]
+                    continue
+                self._entries.move_to_end(experience_id)
+                found[experience_id] = entry[1]
+        return found
+
+    def set_many(self, summaries, current_generation):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            for experience_id, summary in summaries.items():
+                self._entries[experience_id] = (current_generation, summary)
+                self._entries.move_to_end(experience_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+summary_cache = SummaryCache(SUMMARY_CACHE_SIZE)
+
+
+def _grouped(db, query):
+    """Lignes de `query` (première colonne : experience_id) groupées par expérience."""
+    grouped = defaultdict(list)
+    for row in rows_to_dicts(db.execute(query)):
+        grouped[row.pop("experience_id")].append(row)
+    return grouped
+
+
+def _query_summaries(db: Session, experience_ids) -> dict:
+    experiences = db.execute(
+        select(Experience.experience_id, Experience.description, Experience.article_id)
+        .where(Experience.experience_id.in_(experience_ids))
+    ).all()
+    found = [row.experience_id for row in experiences]
+    if not found:
+        return {}
+
+    machines = _grouped(db, (
+        select(
+            ExperienceMachine.experience_id, Machine.constructeur, Machine.modele, Machine.type_machine,
+            ExperienceMachine.energy, ExperienceMachine.collimation, ExperienceMachine.settings,
+            ExperienceMachine.energy_min, ExperienceMachine.energy_max, ExperienceMachine.energy_unit,
+            ExperienceMachine.field_size_cm2,
+        )
+        .join(Machine, Machine.machine_id == ExperienceMachine.machine_id)
+        .where(ExperienceMachine.experience_id.in_(found))
+        .order_by(ExperienceMachine.experience_id, ExperienceMachine.machine_id)
+    ))
+    phantoms = _grouped(db, (
+        select(
+            ExperiencePhantom.experience_id, Phantom.phantom_type, Phantom.manufacturer, Phantom.model,
+            Phantom.dimensions, Phantom.material, ExperiencePhantom.position, ExperiencePhantom.orientation,
+        )
+        .join(Phantom, Phantom.phantom_id == ExperiencePhantom.phantom_id)
+        .where(ExperiencePhantom.experience_id.in_(found))
+        .order_by(ExperiencePhantom.experience_id, ExperiencePhantom.phantom_id)
+    ))
+    detectors = _grouped(db, (
+        select(
+            ExperienceDetector.experience_id, Detector.type_detecteur, Detector.modele, Detector.constructeur,
+            ExperienceDetector.position, ExperienceDetector.depth, ExperienceDetector.orientation,
+            ExperienceDetector.depth_min_mm, ExperienceDetector.depth_max_mm, ExperienceDetector.position_mm,
+        )
+        .join(Detector, Detector.detecteur_id == ExperienceDetector.detector_id)
+        .where(ExperienceDetector.experience_id.in_(found))
+        .order_by(ExperienceDetector.experience_id, ExperienceDetector.detector_id)
+    ))
+    data_files = _grouped(db, (
+        select(
+            Donnee.experience_id, Donnee.data_id, Donnee.file_path, Donnee.data_type,
+            Donnee.file_format, Donnee.description,
+        )
+        .where(Donnee.experience_id.in_(found))
+        .order_by(Donnee.experience_id, Donnee.data_id)
+    ))
+
+    return {
+        row.experience_id: {
+            "experience_id": row.experience_id,
+            "article_id": row.article_id,
+            "description": row.description,
+            "machines": machines[row.experience_id],
+            "phantoms": phantoms[row.experience_id],
+            "detectors": detectors[row.experience_id],
+            "data": data_files[row.experience_id],
+        }
+        for row in experiences
+    }
+
+
+def build_summaries(db: Session, experience_ids, use_cache=True) -> dict:
+    """
+    Résumés des expériences demandées.
+
+    Args:
+        db: Session de base de données
+        experience_ids: Identifiants (doublons ignorés)
+        use_cache: Lire et alimenter le cache par expérience (ignoré pour une
+            session liée à une réplique)
+
+    Returns:
+        dict: experience_id -> résumé ; les expériences inexistantes sont absentes
+    """
+    wanted = list(dict.fromkeys(experience_ids))
+    if not wanted:
+        return {}
+    use_cache = use_cache and db.get_bind() is engine
+    current = generation.current() if use_cache else None
+    summaries = summary_cache.get_many(wanted, current) if use_cache else {}
+    missing = [experience_id for experience_id in wanted if experience_id not in summaries]
+    if missing:
+        fresh = _query_summaries(db, missing)
+        if use_cache:
+            summary_cache.set_many(fresh, current)
+        summaries.update(fresh)
+    return summaries
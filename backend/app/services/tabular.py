@@ -0,0 +1,141 @@
+"""
+Lecture des fichiers de données tabulaires (CSV, TSV, texte à colonnes).
+
+- sniff : à partir d'un échantillon du début du fichier, encodage (UTF-8,
+  sinon Latin-1), séparateur (",", ";", tabulation ou espaces) et ligne
+  d'en-tête éventuelle ;
+- read_numeric_columns : colonnes numériques choisies, lues par
+  numpy.loadtxt (analyse en C) en tableaux float64.
+
+Le séparateur décimal est le point, comme dans app/services/units.py.
+"""
+import io
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+SNIFF_BYTES = 64 * 1024
+DELIMITERS = (",", ";", "\t")
+COMMENT_PREFIXES = ("#", "%", "//")
+
+_NUMBER_RE = re.compile(r"^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$")
+# "Dose (Gy)", "depth [mm]", "x/cm"
+_HEADER_UNIT_RE = re.compile(r"[\(\[]\s*([^\)\]]+?)\s*[\)\]]\s*$|/\s*([a-z%]+)\s*$", re.IGNORECASE)
+
+
+@dataclass
+class Dialect:
+    encoding: str
+    # None : colonnes séparées par des espaces
+    delimiter: str
+    header: list
+    # Lignes à sauter avant les données (commentaires et en-tête)
+    skip_lines: int
+
+
+def decode_sample(sample: bytes):
+    """(texte, encodage) ; un caractère multi-octets coupé en fin d'échantillon est ignoré."""
+    if sample.startswith(b"\xef\xbb\xbf"):
+        return sample[3:].decode("utf-8", errors="ignore"), "utf-8-sig"
+    try:
+        return sample.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError as e:
+        if e.start >= len(sample) - 3:
+            return sample[:e.start].decode("utf-8"), "utf-8"
+    return sample.decode("latin-1"), "latin-1"
+
+
+def is_number(token: str) -> bool:
+    return bool(_NUMBER_RE.match(token.strip()))
+
+
+def split_line(line: str, delimiter):
+    if delimiter is None:
+        return line.split()
+    return [token.strip().strip('"') for token in line.split(delimiter)]
+
+
+def header_unit(name: str):
+    """Unité indiquée dans un nom de colonne ("Dose (Gy)" -> "gy"), ou None."""
+    match = _HEADER_UNIT_RE.search(name or "")
+    if match is None:
+        return None
+    return (match.group(1) or match.group(2)).strip().lower()
+
+
+def _is_comment(line: str) -> bool:
+    return line.lstrip().startswith(COMMENT_PREFIXES)
+
+
+def sniff(sample: bytes, complete: bool = False) -> Dialect:
+    """
+    Déduit le format d'un fichier de son début.
+
+    Args:
+        sample: Premiers octets du fichier (SNIFF_BYTES suffisent)
+        complete: True si l'échantillon est le fichier entier (sa dernière
+                  ligne n'est pas tronquée)
+    """
+    text, encoding = decode_sample(sample)
+    lines = text.splitlines()
+    if not complete and len(lines) > 1:
+        lines = lines[:-1]  # dernière ligne peut-être coupée
+    skip = 0
+    while skip < len(lines) and (not lines[skip].strip() or _is_comment(lines[skip])):
+        skip += 1
+    body = [line for line in lines[skip:skip + 50] if line.strip() and not _is_comment(line)]
+
+    # Séparateur : celui qui découpe les lignes en un même nombre (> 1) de champs
+    delimiter, best = None, 0
+    for candidate in DELIMITERS:
+        counts = {len(split_line(line, candidate)) for line in body}
+        if len(counts) == 1 and (fields := counts.pop()) > best and fields > 1:
+            delimiter, best = candidate, fields
+    if delimiter is None and body and len(body[0].split()) <= 1:
+        delimiter = ","
+
+    header = []
+    if body:
+        first = split_line(body[0], delimiter)
+        # En-tête : première ligne dont un champ n'est pas numérique
+        if any(token and not is_number(token) for token in first):
+            header = first
+            skip = lines.index(body[0]) + 1
+    return Dialect(encoding=encoding, delimiter=delimiter, header=header, skip_lines=skip)
+
+
+def read_numeric_columns(raw: bytes, dialect: Dialect, columns, truncated=False):
+    """
+    Lit des colonnes numériques d'un fichier.
+
+    Args:
+        raw: Contenu du fichier (lu depuis app/storage.py), ou son début
+        dialect: Format (voir sniff)
+        columns: Indices des colonnes à lire
+        truncated: `raw` est le début du fichier : la dernière ligne,
+                   peut-être coupée, est ignorée
+
+    Returns:
+        numpy.ndarray: tableau (lignes, len(columns)) ; les lignes contenant
+                       une valeur non numérique sont ignorées
+    """
+    if truncated:
+        raw = raw[:raw.rfind(b"\n") + 1]
+    text = raw.decode(dialect.encoding, errors="ignore")
+    try:
+        # Cas courant : analyse de tout le fichier en C
+        return np.loadtxt(
+            io.StringIO(text), delimiter=dialect.delimiter, usecols=tuple(columns), ndmin=2,
+            comments=COMMENT_PREFIXES, skiprows=dialect.skip_lines,
+        )
+    except ValueError:
+        pass
+    # Valeurs entre guillemets, lignes non numériques (notes, cellules vides)
+    wanted = max(columns) + 1
+    rows = []
+    for line in text.splitlines()[dialect.skip_lines:]:
+        tokens = split_line(line, dialect.delimiter)
+        if len(tokens) >= wanted and all(is_number(tokens[i]) for i in columns):
+            rows.append([float(tokens[i]) for i in columns])
+    return np.array(rows, dtype=float).reshape(-1, len(columns))
@@ -0,0 +1,175 @@
+"""
+Lecture des paramètres d'expérience saisis en texte libre, en unités normalisées.
+
+- énergie : "6 MV", "6, 10, 15 MV", "9 MeV", "6X", "12E", "6 FFF", "120 kV"
+  -> (minimum, maximum, unité) avec l'unité en MV (photons) ou MeV
+  (particules) ; kV et keV sont convertis. Sans unité, l'unité dépend du
+  type de machine choisi dans l'assistant (proton, cobalt : MeV ; sinon MV) ;
+- taille de champ : "10x10", "10 x 10 cm", "100x100 mm", "5 cm" (carré)
+  -> surface en cm² ;
+- longueur (profondeur, position) : "10 cm", "5, 10 mm", "15" -> mm ; sans
+  unité, celle de la colonne de profondeur/position déclarée dans l'étape
+  "Column mapping" de l'assistant, sinon le cm (usage en dosimétrie).
+
+Une valeur illisible (ex. "dmax", "X-jaw") donne None : le texte d'origine
+est toujours conservé dans sa colonne. Pour l'énergie, un nombre suivi d'un
+mot inconnu ("15MU") rend le texte illisible plutôt que d'être pris pour des
+MV, et les étiquettes d'isotope ("Co-60", "60Co") ne sont pas des énergies.
+Pour les longueurs, "0-300 mm" est un intervalle ; le signe moins n'est lu
+qu'en début de texte ou après une espace ou une virgule.
+"""
+import re
+
+PARTICLE_MACHINE_TYPES = {"proton", "cobalt"}
+LENGTH_FACTORS_MM = {"mm": 1.0, "cm": 10.0, "m": 1000.0}
+DEFAULT_LENGTH_UNIT = "cm"
+LENGTH_COLUMN_WORDS = {"depth", "profondeur", "position", "pos", "distance", "x", "y", "z", "r"}
+
+# Séparateur décimal "." ; la virgule sépare les valeurs d'une liste ("5,10 cm")
+_NUMBER = r"\d+(?:\.\d+)?"
+_ENERGY_UNITS = {
+    "mv": ("MV", 1.0), "x": ("MV", 1.0), "fff": ("MV", 1.0), "kv": ("MV", 0.001),
+    "mev": ("MeV", 1.0), "e": ("MeV", 1.0), "kev": ("MeV", 0.001),
+}
+# Nombre isolé (ni collé à un mot, ni partie d'un nombre plus long), suivi d'un éventuel mot
+_ENERGY_RE = re.compile(rf"(?<![\w.])({_NUMBER})(?![\d.])\s*([a-z]+)?", re.IGNORECASE)
+# Sources radioactives : "Co-60", "Ir192", "60Co", "60-Co"
+_ISOTOPES = r"(?:co|cs|ir|i|pd|ru|sr|y|ra|au|se|yb)"
+_ISOTOPE_RE = re.compile(
+    rf"(?<![a-z]){_ISOTOPES}-?\d+(?![\d.])|(?<![\w.])\d+-?{_ISOTOPES}(?![a-z])", re.IGNORECASE
+)
+_FIELD_RE = re.compile(
+    rf"({_NUMBER})\s*(mm|cm)?\s*[x×\*]\s*({_NUMBER})\s*(mm|cm)?|({_NUMBER})\s*(mm|cm)\b", re.IGNORECASE
+)
+# "0-300 mm", "0–300 mm" : intervalle ; "-5" : signe en début de texte ou après une espace ou une virgule
+_LENGTH_RE = re.compile(
+    rf"((?<![^\s,])-)?({_NUMBER})(?:\s*[-–]\s*({_NUMBER}))?\s*(mm|cm|m)?(?![a-z])", re.IGNORECASE
+)
+
+
+def _number(text):
+    return float(text)
+
+
+def _with_trailing_units(found):
+    # "6, 10, 15 MV" : l'unité finale s'applique aux nombres qui n'en ont pas
+    trailing = ""
+    for i in range(len(found) - 1, -1, -1):
+        value, unit = found[i]
+        trailing = unit or trailing
+        found[i] = (value, unit or trailing)
+    return found
+
+
+def parse_energy_values(text, machine_type=None):
+    """
+    Énergies nominales saisies, par unité normalisée.
+
+    Returns:
+        dict: {"MV" ou "MeV": [valeurs]} ; vide si rien n'est lisible
+    """
+    if not text:
+        return {}
+    text = _ISOTOPE_RE.sub(" ", str(text))
+    found = [(_number(m.group(1)), (m.group(2) or "").lower()) for m in _ENERGY_RE.finditer(text)]
+    if any(unit and unit not in _ENERGY_UNITS for _, unit in found):
+        return {}  # "15MU", "6 and 10 MV" : illisible plutôt que deviné
+    found = _with_trailing_units(found)
+    default_unit = "mev" if (machine_type or "").strip().lower() in PARTICLE_MACHINE_TYPES else "mv"
+    values = {}
+    for value, unit in found:
+        unit_name, factor = _ENERGY_UNITS[unit or default_unit]
+        values.setdefault(unit_name, []).append(value * factor)
+    return values
+
+
+def parse_energy(text, machine_type=None):
+    """
+    Énergie nominale.
+
+    Returns:
+        tuple | None: (minimum, maximum, "MV" ou "MeV")
+    """
+    values = parse_energy_values(text, machine_type)
+    if len(values) != 1:  # rien de lisible, ou photons et électrons mélangés
+        return None
+    unit_name, numbers = values.popitem()
+    return min(numbers), max(numbers), unit_name
+
+
+def parse_field_size_cm2(text):
+    """Surface du champ en cm² (côté unique : champ carré), ou None."""
+    if not text:
+        return None
+    match = _FIELD_RE.search(str(text))
+    if match is None:
+        return None
+    if match.group(5) is not None:
+        side = _number(match.group(5)) * (0.1 if match.group(6).lower() == "mm" else 1.0)
+        return round(side * side, 4)
+    # "100x100 mm" : l'unité finale vaut pour les deux côtés ; cm par défaut
+    unit = (match.group(4) or match.group(2) or "cm").lower()
+    first_unit = (match.group(2) or unit).lower()
+    to_cm = {"mm": 0.1, "cm": 1.0}
+    x = _number(match.group(1)) * to_cm[first_unit]
+    y = _number(match.group(3)) * to_cm[unit]
+    return round(x * y, 4)
+
+
+def parse_length_mm(text, default_unit=DEFAULT_LENGTH_UNIT):
+    """
+    Longueur(s) en mm.
+
+    Returns:
+        tuple | None: (minimum, maximum) en mm
+    """
+    if not text:
+        return None
+    found = []
+    for m in _LENGTH_RE.finditer(str(text)):
+        unit = (m.group(4) or "").lower()
+        first = _number(m.group(2)) * (-1 if m.group(1) else 1)
+        found.append((first, unit))
+        if m.group(3) is not None:
+            found.append((_number(m.group(3)), unit))
+    found = _with_trailing_units(found)
+    if not found:
+        return None
+    values = [value * LENGTH_FACTORS_MM[unit or default_unit] for value, unit in found]
+    return round(min(values), 4), round(max(values), 4)
+
+
+def length_unit_from_mappings(column_mappings):
+    """
+    Unité de longueur déclarée dans l'assistant pour la colonne de profondeur
+    ou de position du fichier (liste de {"name", "unit", ...}), sinon le défaut.
+    """
+    for column in column_mappings or []:
+        words = set(re.findall(r"[a-z]+", (column.get("name") or column.get("column_name") or "").lower()))
+        unit = (column.get("unit") or "").lower()
+        if unit in LENGTH_FACTORS_MM and words & LENGTH_COLUMN_WORDS:
+            return unit
+    return DEFAULT_LENGTH_UNIT
+
+
+def machine_link_values(energy, collimation, machine_type=None) -> dict:
+    """Colonnes typées d'une liaison expérience-machine."""
+    parsed_energy = parse_energy(energy, machine_type)
+    energy_min, energy_max, energy_unit = parsed_energy or (None, None, None)
+    return {
+        "energy_min": energy_min,
+        "energy_max": energy_max,
+        "energy_unit": energy_unit,
+        "field_size_cm2": parse_field_size_cm2(collimation),
+    }
+
+
+def detector_link_values(position, depth, length_unit=DEFAULT_LENGTH_UNIT) -> dict:
+    """Colonnes typées d'une liaison expérience-détecteur."""
+    depth_mm = parse_length_mm(depth, length_unit)
+    position_mm = parse_length_mm(position, length_unit)
+    return {
+        "depth_min_mm": depth_mm[0] if depth_mm else None,
+        "depth_max_mm": depth_mm[1] if depth_mm else None,
+        "position_mm": position_mm[0] if position_mm else None,
+    }
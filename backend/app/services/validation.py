@@ -1,6 +1,232 @@
-def validate_experiment_machine(machine, energy):
-    if energy not in machine.allowed_energies:
-        raise ValueError(
-            f"Énergie {energy} incompatible avec la machine {machine.model}"
-        )
+"""
+Compatibilité des énergies saisies avec le catalogue de référence des machines.
+
+- Catalogue : fichier JSON (MACHINE_SPECS_PATH, défaut
+  app/reference/machine_specs.json) qui liste, par gamme de modèles d'un
+  fabricant, les modalités disponibles (photons en MV, électrons, protons
+  ou gamma en MeV) et leurs énergies nominales (liste ou plage).
+- Table précalculée : le fichier est compilé en un dict
+  "fabricant|modèle" normalisé (règles de app/services/catalog.py) ->
+  MachineSpec, dont les énergies sont des ensembles. Valider une liaison
+  revient à une recherche dans le dict puis une appartenance à un ensemble
+  par énergie saisie : O(1), sans requête SQL.
+- Rechargement : la date de modification du fichier est relue au plus
+  toutes les MACHINE_SPECS_CHECK_INTERVAL secondes ; un fichier modifié
+  est recompilé, un fichier invalide est signalé et la table précédente
+  conservée.
+- ENERGY_VALIDATION : "strict" (défaut, la soumission est refusée),
+  "warn" (incompatibilités journalisées seulement) ou "off".
+
+Une machine absente du catalogue, ou une énergie illisible, n'est pas
+validée : le catalogue de l'application reste ouvert à tout équipement.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from app.services.catalog import normalize_label, normalize_manufacturer
+from app.services.units import parse_energy_values
+
+logger = logging.getLogger(__name__)
+
+SPECS_FORMAT = "rdh-machine-specs/1"
+MACHINE_SPECS_PATH = os.getenv(
+    "MACHINE_SPECS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "reference", "machine_specs.json"),
+)
+MACHINE_SPECS_CHECK_INTERVAL = float(os.getenv("MACHINE_SPECS_CHECK_INTERVAL", "5"))
+ENERGY_VALIDATION = os.getenv("ENERGY_VALIDATION", "strict").lower()
+
+# Libellé d'une modalité absente de la fiche (message d'erreur)
+UNIT_MODALITIES = {"MV": "photons", "MeV": "électrons ou particules"}
+
+
+class SpecsFormatError(ValueError):
+    """Fichier de catalogue de référence invalide."""
+
+
+class EnergyValidationError(ValueError):
+    """Énergies incompatibles avec les machines ; `issues` : une entrée par liaison."""
+
+    def __init__(self, issues):
+        self.issues = issues
+        super().__init__("; ".join(issue["reason"] for issue in issues))
+
+
+def _energy_key(value):
+    return round(float(value), 2)
+
+
+@dataclass(frozen=True)
+class Modality:
+    name: str
+    unit: str
+    energies: frozenset
+    # (minimum, maximum) pour les faisceaux à énergie variable (protons)
+    range: tuple = None
+
+    def accepts(self, value) -> bool:
+        if self.range is not None:
+            return self.range[0] <= value <= self.range[1]
+        return _energy_key(value) in self.energies
+
+    def describe(self) -> str:
+        if self.range is not None:
+            return f"{self.range[0]:g}-{self.range[1]:g} {self.unit}"
+        return ", ".join(f"{e:g}" for e in sorted(self.energies)) + f" {self.unit}"
+
+
+@dataclass(frozen=True)
+class MachineSpec:
+    manufacturer: str
+    model: str
+    # unité normalisée ("MV", "MeV") -> Modality
+    modalities: dict
+
+    @property
+    def label(self) -> str:
+        return f"{self.manufacturer} {self.model}"
 
+
+def spec_key(manufacturer, model) -> str:
+    """Clé de la table : "fabricant|modèle" normalisé, sans le type de machine."""
+    return f"{normalize_manufacturer(manufacturer)}|{normalize_label(model)}"
+
+
+def compile_specs(document) -> dict:
+    """
+    Compile le JSON du catalogue en table de recherche.
+
+    Returns:
+        dict: spec_key -> MachineSpec (un alias de modèle donne une entrée de plus)
+    """
+    if not isinstance(document, dict) or document.get("format") != SPECS_FORMAT:
+        raise SpecsFormatError(f"Format attendu : {SPECS_FORMAT}")
+    table = {}
+    for entry in document.get("machines", []):
+        manufacturer, models = entry.get("manufacturer"), entry.get("models") or []
+        if not manufacturer or not models:
+            raise SpecsFormatError(f"Fabricant et modèles requis : {entry!r}")
+        modalities = {}
+        for modality in entry.get("modalities", []):
+            unit = modality.get("unit")
+            if unit not in UNIT_MODALITIES:
+                raise SpecsFormatError(f"Unité inconnue pour {manufacturer} {models[0]} : {unit!r}")
+            if unit in modalities:
+                raise SpecsFormatError(f"Deux modalités en {unit} pour {manufacturer} {models[0]}")
+            energy_range = modality.get("range")
+            modalities[unit] = Modality(
+                name=modality.get("name") or UNIT_MODALITIES[unit],
+                unit=unit,
+                energies=frozenset(_energy_key(e) for e in modality.get("energies", [])),
+                range=tuple(float(e) for e in energy_range) if energy_range else None,
+            )
+        spec = MachineSpec(manufacturer, models[0], modalities)
+        for model in models:
+            key = spec_key(manufacturer, model)
+            if key in table:
+                raise SpecsFormatError(f"Modèle en double dans le catalogue : {manufacturer} {model}")
+            table[key] = spec
+    return table
+
+
+class MachineSpecTable:
+    """Table de référence compilée, rechargée quand le fichier change."""
+
+    def __init__(self, path, check_interval=MACHINE_SPECS_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._table = {}
+        self._mtime = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            if self._checked is not None and now - self._checked < self.check_interval:
+                return
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime == self._mtime:
+                return
+            self._mtime = mtime
+            if mtime is None:
+                logger.warning("Machine specs file not found: %s", self.path)
+                self._table = {}
+                return
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    table = compile_specs(json.load(f))
+            except (OSError, ValueError) as e:
+                # json.JSONDecodeError et SpecsFormatError sont des ValueError
+                logger.error("Invalid machine specs file %s, keeping previous table: %s", self.path, e)
+                return
+            self._table = table
+            logger.info("Machine specs loaded", extra={"path": self.path, "models": len(table)})
+
+    def lookup(self, manufacturer, model):
+        """Fiche du modèle, ou None s'il n'est pas au catalogue."""
+        self._refresh()
+        return self._table.get(spec_key(manufacturer, model))
+
+
+machine_specs = MachineSpecTable(MACHINE_SPECS_PATH)
+
+
+def check_machine_energy(manufacturer, model, machine_type, energy):
+    """
+    Vérifie l'énergie saisie pour une machine.
+
+    Returns:
+        str | None: motif de l'incompatibilité, None si compatible ou non vérifiable
+    """
+    if ENERGY_VALIDATION == "off" or not energy:
+        return None
+    spec = machine_specs.lookup(manufacturer, model)
+    if spec is None:
+        return None
+    for unit, values in parse_energy_values(energy, machine_type).items():
+        modality = spec.modalities.get(unit)
+        if modality is None:
+            return f"{spec.label} : pas de faisceau {UNIT_MODALITIES[unit]} ({unit})"
+        rejected = [value for value in values if not modality.accepts(value)]
+        if rejected:
+            listed = ", ".join(f"{value:g} {unit}" for value in rejected)
+            return f"{spec.label} : énergie {listed} non disponible en {modality.name} ({modality.describe()})"
+    return None
+
+
+def validate_machine_links(links):
+    """
+    Vérifie un ensemble de liaisons expérience-machine.
+
+    Args:
+        links: Itérable de tuples (constructeur, modele, type_machine, energy)
+
+    Raises:
+        EnergyValidationError: en mode "strict", si au moins une liaison est incompatible
+    """
+    issues = []
+    for manufacturer, model, machine_type, energy in links:
+        reason = check_machine_energy(manufacturer, model, machine_type, energy)
+        if reason:
+            issues.append({"manufacturer": manufacturer, "model": model, "energy": energy, "reason": reason})
+    if not issues:
+        return
+    if ENERGY_VALIDATION == "strict":
+        raise EnergyValidationError(issues)
+    logger.warning("Energy incompatible with machine specs", extra={"issues": issues})
+
+
+def validate_experiment_machine(machine, energy):
+    """Vérifie l'énergie d'une liaison avec une Machine existante."""
+    validate_machine_links([(machine.constructeur, machine.modele, machine.type_machine, energy)])
@@ -0,0 +1,77 @@
+"""
+Gestionnaire minimal des URL signées du stockage local (/storage/<clé>).
+
+Application ASGI montée à côté des routes : ni dépendances FastAPI, ni
+session de base, ni parsing multipart. PUT écrit le corps brut tel qu'il
+arrive (fichier temporaire puis lien vers la clé : un envoi interrompu ne
+laisse pas de fichier partiel), GET renvoie le fichier. PUT ne crée que des
+fichiers nouveaux (409 sinon) : une URL d'envoi encore valide ne peut pas
+remplacer le fichier d'une donnée déjà déclarée. La signature
+(app/storage.py) fixe la méthode, la clé et l'expiration ; la création de
+la donnée reste à l'API (POST /donnees/upload-complete/{experience_id}).
+"""
+import os
+import uuid
+
+import anyio
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import FileResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from app.storage import CHUNK_SIZE, LocalStorage, content_disposition, storage, verify
+
+# Fichiers signés : toujours sur le volume local, même avec STORAGE_BACKEND=s3
+local = storage if isinstance(storage, LocalStorage) else LocalStorage()
+
+
+def _valid_key(key) -> bool:
+    return bool(key) and "/" not in key and "\\" not in key and key not in (".", "..")
+
+
+async def _receive_file(request: Request, location):
+    """Raises: FileExistsError"""
+    tmp_path = f"{location}.{uuid.uuid4().hex}.part"
+    try:
+        async with await anyio.open_file(tmp_path, "wb") as f:
+            buffer = bytearray()
+            async for chunk in request.stream():
+                buffer += chunk
+                # Écritures groupées : un passage par le pool de threads par Mio
+                if len(buffer) >= CHUNK_SIZE:
+                    await f.write(bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await f.write(bytes(buffer))
+        # Création seule et atomique : échoue si la clé existe (envoi concurrent)
+        os.link(tmp_path, location)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+async def signed_file(request: Request):
+    key = request.path_params["key"]
+    method = "GET" if request.method == "HEAD" else request.method
+    params = request.query_params
+    if not _valid_key(key) or not verify(method, key, params.get("expires"), params.get("signature")):
+        return PlainTextResponse("Invalid or expired signature", status_code=403)
+
+    location = local.location(key)
+    if method == "PUT":
+        if os.path.exists(location):
+            return PlainTextResponse("File already uploaded", status_code=409)
+        try:
+            await _receive_file(request, location)
+        except FileExistsError:
+            return PlainTextResponse("File already uploaded", status_code=409)
+        return Response(status_code=201)
+    if not os.path.isfile(location):
+        return PlainTextResponse("Not found", status_code=404)
+    filename = params.get("filename") or key
+    return FileResponse(location, headers={"Content-Disposition": content_disposition(filename)})
+
+
+storage_app = Starlette(routes=[
+    Route("/{key:path}", signed_file, methods=["GET", "HEAD", "PUT"]),
+])
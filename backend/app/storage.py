@@ -0,0 +1,327 @@
+"""
+Stockage des fichiers de données (uploads, imports en masse).
+
+- STORAGE_BACKEND=local (défaut) : fichiers sous UPLOAD_DIR ;
+  Donnee.file_path est le chemin ("data/uploads/12_mesure.csv").
+- STORAGE_BACKEND=s3 : objets du bucket S3_BUCKET (préfixe S3_PREFIX), sur
+  S3 ou un service compatible (MinIO : S3_ENDPOINT_URL) ; file_path est
+  l'URI ("s3://bucket/uploads/12_mesure.csv"). boto3 requis, importé au
+  premier accès. Envois multipart en parallèle au-delà de
+  S3_MULTIPART_THRESHOLD (S3_MULTIPART_CHUNKSIZE, S3_MAX_CONCURRENCY
+  parts simultanées), un client par worker dont le pool de connexions
+  (S3_MAX_POOL_CONNECTIONS) est partagé par les threads, lectures en flux.
+
+Le backend d'un fichier existant se déduit de son emplacement : les
+fichiers déjà stockés restent lisibles après un changement de
+STORAGE_BACKEND. UPLOAD_DIR reste le volume local de travail (extraction
+des imports) quel que soit le backend.
+
+URL signées (upload_url, download_url), valables STORAGE_URL_TTL_SECONDS :
+les octets vont directement du client au stockage, l'API ne traite que les
+métadonnées. S3 : URL pré-signées par boto3 (PUT / GET sur le bucket).
+Local : /storage/<clé>?expires=…&signature=… (HMAC-SHA256 de
+STORAGE_SIGNING_KEY, commune à tous les workers), servies par le
+gestionnaire minimal de app/signed_storage.py.
+Les envois sont en création seule : une URL d'envoi ne peut pas remplacer
+un fichier existant (donnée déjà déclarée, ETag fort, grandeurs
+calculées). S3 : écriture conditionnelle If-None-Match: *, en-tête signé
+que le client doit renvoyer (UploadUrlOut.headers).
+"""
+import hashlib
+import hmac
+import os
+import shutil
+import threading
+import time
+from urllib.parse import quote, urlencode
+from contextlib import closing
+from dataclasses import dataclass
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "data/uploads")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "uploads").strip("/")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION") or None
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32"))
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(16 * 1024 * 1024)))
+S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE", str(16 * 1024 * 1024)))
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "8"))
+
+STORAGE_URL_TTL_SECONDS = int(os.getenv("STORAGE_URL_TTL_SECONDS", "900"))
+STORAGE_SIGNING_KEY = os.getenv("STORAGE_SIGNING_KEY", "")
+# Préfixe des URL locales vu par les clients (ex. "/api" derrière nginx) ;
+# vide : URL de la requête
+STORAGE_PUBLIC_URL = os.getenv("STORAGE_PUBLIC_URL", "").rstrip("/")
+SIGNED_PATH = "/storage"
+
+CHUNK_SIZE = 1024 * 1024
+S3_SCHEME = "s3://"
+
+
+class StorageError(RuntimeError):
+    """Backend mal configuré ou indisponible."""
+
+
+@dataclass(frozen=True)
+class FileStat:
+    size: int
+    mtime_ns: int
+
+
+def content_disposition(filename) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+# --- Signature des URL locales ---
+
+def _signing_key() -> bytes:
+    if not STORAGE_SIGNING_KEY:
+        raise StorageError("Signed URLs on local storage require STORAGE_SIGNING_KEY")
+    return STORAGE_SIGNING_KEY.encode()
+
+
+def sign(method, key, expires) -> str:
+    message = f"{method}\n{key}\n{expires}".encode()
+    return hmac.new(_signing_key(), message, hashlib.sha256).hexdigest()
+
+
+def verify(method, key, expires, signature) -> bool:
+    """Signature valide et non expirée pour (méthode, clé)."""
+    try:
+        if int(expires) < time.time():
+            return False
+        return hmac.compare_digest(sign(method, key, int(expires)), signature or "")
+    except (StorageError, ValueError):
+        return False
+
+
+class LocalStorage:
+    """Fichiers dans un répertoire local (volume du conteneur)."""
+
+    def __init__(self, root=UPLOAD_DIR):
+        self.root = root
+
+    def location(self, key) -> str:
+        return f"{self.root}/{key}"
+
+    def save(self, key, fileobj) -> str:
+        location = self.location(key)
+        with open(location, "wb") as buffer:
+            shutil.copyfileobj(fileobj, buffer, CHUNK_SIZE)
+        return location
+
+    def save_file(self, source_path, key) -> str:
+        location = self.location(key)
+        shutil.copyfile(source_path, location)
+        return location
+
+    def open(self, location):
+        return open(location, "rb")
+
+    def stat(self, location) -> FileStat:
+        """Raises: FileNotFoundError"""
+        st = os.stat(location)
+        return FileStat(st.st_size, st.st_mtime_ns)
+
+    def delete(self, location):
+        try:
+            os.remove(location)
+        except FileNotFoundError:
+            pass
+
+    def key_of(self, location) -> str:
+        return location[len(self.root) + 1:]
+
+    def _signed(self, method, key, ttl, params=None) -> str:
+        # Chemin relatif : préfixé par STORAGE_PUBLIC_URL ou l'URL de la requête
+        expires = int(time.time()) + ttl
+        query = {"expires": expires, "signature": sign(method, key, expires), **(params or {})}
+        return f"{SIGNED_PATH}/{quote(key)}?{urlencode(query)}"
+
+    def upload_url(self, key, ttl=STORAGE_URL_TTL_SECONDS):
+        """(URL, en-têtes à envoyer) ; création seule, voir app/signed_storage.py."""
+        return self._signed("PUT", key, ttl), {}
+
+    def download_url(self, location, filename, ttl=STORAGE_URL_TTL_SECONDS) -> str:
+        return self._signed("GET", self.key_of(location), ttl, {"filename": filename})
+
+
+class S3Storage:
+    """Objets d'un bucket S3 ou compatible (MinIO)."""
+
+    def __init__(self, bucket=S3_BUCKET, prefix=S3_PREFIX):
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = None
+        self._transfer = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        # Client boto3 créé une fois par worker (thread-safe) ; import différé
+        # pour ne pas allonger le démarrage quand le stockage est local
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    try:
+                        import boto3
+                        from boto3.s3.transfer import TransferConfig
+                        from botocore.config import Config
+                    except ImportError:
+                        raise StorageError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+                    config = Config(
+                        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                        # URL pré-signées SigV4 : les en-têtes signés (If-None-Match) sont imposés
+                        signature_version="s3v4",
+                        retries={"mode": "standard"},
+                        # Services compatibles (MinIO) : bucket dans le chemin de l'URL
+                        s3={"addressing_style": "path" if S3_ENDPOINT_URL else "auto"},
+                    )
+                    self._transfer = TransferConfig(
+                        multipart_threshold=S3_MULTIPART_THRESHOLD,
+                        multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+                        max_concurrency=S3_MAX_CONCURRENCY,
+                    )
+                    self._client = boto3.session.Session().client(
+                        "s3", endpoint_url=S3_ENDPOINT_URL, region_name=S3_REGION, config=config,
+                    )
+        return self._client
+
+    def key(self, key) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def location(self, key) -> str:
+        return f"{S3_SCHEME}{self.bucket}/{self.key(key)}"
+
+    @staticmethod
+    def split(location):
+        """URI s3://bucket/clé -> (bucket, clé)."""
+        bucket, _, key = location[len(S3_SCHEME):].partition("/")
+        return bucket, key
+
+    def _writer(self):
+        if not self.bucket:
+            raise StorageError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        return self.client()
+
+    def save(self, key, fileobj) -> str:
+        client = self._writer()
+        client.upload_fileobj(fileobj, self.bucket, self.key(key), Config=self._transfer)
+        return self.location(key)
+
+    def save_file(self, source_path, key) -> str:
+        client = self._writer()
+        client.upload_file(source_path, self.bucket, self.key(key), Config=self._transfer)
+        return self.location(key)
+
+    def open(self, location):
+        """Corps de l'objet, lu en flux (read(n), iter_chunks)."""
+        bucket, key = self.split(location)
+        client = self.client()
+        try:
+            return client.get_object(Bucket=bucket, Key=key)["Body"]
+        except client.exceptions.NoSuchKey:
+            raise FileNotFoundError(location)
+
+    def stat(self, location) -> FileStat:
+        """Raises: FileNotFoundError"""
+        from botocore.exceptions import ClientError
+
+        bucket, key = self.split(location)
+        try:
+            head = self.client().head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                raise FileNotFoundError(location)
+            raise
+        return FileStat(head["ContentLength"], int(head["LastModified"].timestamp() * 1e9))
+
+    def delete(self, location):
+        bucket, key = self.split(location)
+        self.client().delete_object(Bucket=bucket, Key=key)
+
+    def upload_url(self, key, ttl=STORAGE_URL_TTL_SECONDS):
+        """
+        (URL, en-têtes à envoyer) : PUT direct vers le bucket (objet de 5 Gio
+        au plus), refusé (412) si l'objet existe déjà.
+        """
+        url = self._writer().generate_presigned_url(
+            "put_object",
+            Params={"Bucket": self.bucket, "Key": self.key(key), "IfNoneMatch": "*"},
+            ExpiresIn=ttl,
+        )
+        return url, {"If-None-Match": "*"}
+
+    def download_url(self, location, filename, ttl=STORAGE_URL_TTL_SECONDS) -> str:
+        bucket, key = self.split(location)
+        return self.client().generate_presigned_url(
+            "get_object",
+            Params={"Bucket": bucket, "Key": key, "ResponseContentDisposition": content_disposition(filename)},
+            ExpiresIn=ttl,
+        )
+
+
+def _configured():
+    if STORAGE_BACKEND == "s3":
+        return S3Storage()
+    if STORAGE_BACKEND != "local":
+        raise StorageError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return LocalStorage()
+
+
+# Backend des nouveaux fichiers
+storage = _configured()
+_local = storage if isinstance(storage, LocalStorage) else LocalStorage()
+_s3 = storage if isinstance(storage, S3Storage) else None
+
+
+def backend_for(location):
+    """Backend qui contient le fichier `location` (Donnee.file_path)."""
+    global _s3
+    if location.startswith(S3_SCHEME):
+        if _s3 is None:
+            _s3 = S3Storage()
+        return _s3
+    return _local
+
+
+def is_local(location) -> bool:
+    return not location.startswith(S3_SCHEME)
+
+
+def open_file(location):
+    """Fichier binaire lisible (gestionnaire de contexte). Raises: FileNotFoundError"""
+    return closing(backend_for(location).open(location))
+
+
+def file_stat(location) -> FileStat:
+    """Raises: FileNotFoundError"""
+    return backend_for(location).stat(location)
+
+
+def read_bytes(location, max_bytes=None) -> bytes:
+    """Contenu du fichier, au plus `max_bytes` octets."""
+    with open_file(location) as f:
+        return f.read(max_bytes) if max_bytes else f.read()
+
+
+def iter_chunks(location, chunk_size=CHUNK_SIZE):
+    with open_file(location) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def delete_file(location):
+    backend_for(location).delete(location)
+
+
+def download_url(location, filename, ttl=STORAGE_URL_TTL_SECONDS) -> str:
+    """URL signée de lecture (relative pour le stockage local). Raises: StorageError"""
+    return backend_for(location).download_url(location, filename, ttl)
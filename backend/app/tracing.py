@@ -0,0 +1,207 @@
+"""
+Traçage des étapes du chemin critique (soumissions, uploads).
+
+`span("nom")` mesure la durée d'un bloc et l'ajoute à la trace de la requête
+en cours. À la fin de la requête, RequestContextMiddleware émet les spans :
+- en DEBUG sur le logger "app.trace" (une ligne par requête) ;
+- si TRACE_FILE est défini, au format Chrome Trace Event (tableau JSON),
+  lisible directement par chrome://tracing ou https://ui.perfetto.dev.
+
+Comme pour les logs (voir logging_config), le fichier est écrit par un
+thread dédié via une file : aucun I/O synchrone dans la requête.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from app.logging_config import request_id_var
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+
+logger = logging.getLogger("app.trace")
+
+# Spans de la requête en cours (liste partagée avec les threads du threadpool)
+_spans_var: ContextVar = ContextVar("trace_spans", default=None)
+
+_file_logger = None
+_file_listener = None
+_file_logger_lock = threading.Lock()
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Mesure un bloc de code et l'enregistre dans la trace de la requête.
+
+    Exemple :
+        with span("file_write", experience_id=12):
+            shutil.copyfileobj(...)
+    """
+    spans = _spans_var.get()
+    if spans is None:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        spans.append({
+            "name": name,
+            "start_ns": start,
+            "dur_ns": time.perf_counter_ns() - start,
+            "tid": threading.get_ident(),
+            "args": attrs,
+        })
+
+
+def start_trace():
+    """Démarre une trace vide pour la requête en cours ; retourne le jeton de contexte."""
+    return _spans_var.set([])
+
+
+def finish_trace(token, name, start_ns, **attrs):
+    """
+    Clôt la trace de la requête : ajoute le span racine et exporte le tout.
+    """
+    spans = _spans_var.get() or []
+    _spans_var.reset(token)
+    spans.insert(0, {
+        "name": name,
+        "start_ns": start_ns,
+        "dur_ns": time.perf_counter_ns() - start_ns,
+        "tid": threading.get_ident(),
+        "args": attrs,
+    })
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "trace",
+            extra={"spans": {s["name"]: round(s["dur_ns"] / 1e6, 3) for s in spans}},
+        )
+    if TRACE_FILE:
+        _export_chrome(spans)
+
+
+def _trace_file_logger():
+    """Logger dédié au fichier de traces, écrit via une file (non bloquant)."""
+    global _file_logger, _file_listener
+    with _file_logger_lock:
+        if _file_logger is None:
+            directory = os.path.dirname(TRACE_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            new_file = not os.path.exists(TRACE_FILE) or os.path.getsize(TRACE_FILE) == 0
+            file_handler = logging.FileHandler(TRACE_FILE)
+            file_handler.terminator = ",\n"
+            if new_file:
+                # Format "JSON Array" : le ']' final est optionnel pour les visualiseurs
+                file_handler.stream.write("[\n")
+
+            trace_queue = queue.SimpleQueue()
+            _file_listener = QueueListener(trace_queue, file_handler)
+            _file_listener.start()
+
+            _file_logger = logging.getLogger("app.trace.file")
+            _file_logger.propagate = False
+            _file_logger.setLevel(logging.INFO)
+            _file_logger.addHandler(QueueHandler(trace_queue))
+    return _file_logger
+
+
+def shutdown_tracing():
+    """Vide la file du fichier de traces (arrêt du worker)."""
+    global _file_logger, _file_listener
+    with _file_logger_lock:
+        if _file_listener is not None:
+            _file_listener.stop()
+            for handler in _file_listener.handlers:
+                handler.close()
+            _file_logger.handlers = []
+            _file_logger = _file_listener = None
+
+
+def _export_chrome(spans):
+    """Exporte les spans au format Chrome Trace Event ("X" = événement complet)."""
+    file_logger = _trace_file_logger()
+    pid = os.getpid()
+    request_id = request_id_var.get()
+    for s in spans:
+        file_logger.info(json.dumps({
+            "name": s["name"],
+            "ph": "X",
+            "ts": s["start_ns"] // 1000,
+            "dur": s["dur_ns"] // 1000,
+            "pid": pid,
+            "tid": s["tid"],
+            "args": {"request_id": request_id, **s["args"]},
+        }, default=str))
+
+
+class RequestContextMiddleware:
+    """
+    Middleware ASGI : identifiant de corrélation, trace et log d'accès par requête.
+
+    Réutilise l'en-tête X-Request-ID entrant s'il existe, sinon en génère un,
+    et le renvoie dans la réponse.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.access_logger = logging.getLogger("app.access")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+
+        id_token = request_id_var.set(request_id)
+        trace_token = start_trace()
+        start_ns = time.perf_counter_ns()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter_ns() - start_ns) / 1e6
+            finish_trace(
+                trace_token,
+                f"{scope['method']} {scope['path']}",
+                start_ns,
+                status=status_code,
+            )
+            self.access_logger.info(
+                "%s %s %s %.1fms",
+                scope["method"], scope["path"], status_code, duration_ms,
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 3),
+                },
+            )
+            request_id_var.reset(id_token)
@@ -0,0 +1,320 @@
+"""
+Benchmark des chemins d'écriture et de lecture de l'API.
+
+Pour chaque échelle (nombre d'articles), la base est vidée puis remplie avec
+le générateur déterministe (benchmarks/synthetic.py), un serveur uvicorn est lancé
+localement, puis chaque scénario est joué avec N requêtes et C clients
+concurrents. Le débit, la latence p50/p99 et les erreurs sont enregistrés
+dans un fichier JSON (benchmarks/results/) pour comparer les commits entre
+eux (voir benchmarks/compare.py).
+
+Par défaut la base est un fichier SQLite temporaire ; --database-url permet
+de viser un PostgreSQL local (base vide dédiée, le schéma est migré).
+
+Usage :
+    cd backend
+    python -m benchmarks.bench_api [--scales 100 1000 10000] [--requests 200] [--concurrency 8]
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+DEFAULT_SCALES = (100, 1000, 10000)
+
+
+# --- Construction des requêtes ---
+
+def _multipart(fields, files):
+    """Encode un corps multipart/form-data ; files = {nom: (filename, bytes)}."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: text/csv\r\n\r\n".encode() + content + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def _csv_payload(rows):
+    lines = ["depth_mm,dose_pct"] + [f"{i * 0.5:.1f},{100 - i * 0.01:.3f}" for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _submission_fields(rng):
+    return {
+        "title": f"Benchmark article {uuid.uuid4().hex[:8]}",
+        "authors": "Bench Author",
+        "experience_description": "Benchmark PDD",
+        "machines": json.dumps([{"manufacturer": "Varian", "model": "TrueBeam",
+                                 "machineType": "Linear Accelerator", "energy": "6 MV"}]),
+        "detectors": json.dumps([{"detectorType": "Ion Chamber", "model": "31010 Semiflex",
+                                  "manufacturer": "PTW", "depth": "10"}]),
+        "phantoms": json.dumps([{"model": "MP3 Water Phantom", "manufacturer": "PTW",
+                                 "phantom_type": "homogeneous"}]),
+        "data_type": "pdd",
+        "columnMapping": json.dumps([
+            {"name": "depth_mm", "dataType": "numeric", "unit": "mm"},
+            {"name": "dose_pct", "dataType": "numeric", "unit": "%"},
+        ]),
+    }
+
+
+def build_scenarios(n_articles, n_experiences, upload_rows):
+    """Scénario -> fonction(rng) qui retourne (méthode, chemin, corps, en-têtes)."""
+    payload = _csv_payload(upload_rows)
+
+    def get(path):
+        return lambda rng: ("GET", path, None, {})
+
+    def summary(rng):
+        return "GET", f"/experiences/{rng.randint(1, n_experiences)}/summary", None, {}
+
+    def article_experiences(rng):
+        article_id = rng.randint(1, n_articles)
+        return "GET", f"/articles/{article_id}/experiences", None, {}
+
+    def complete_submit(rng):
+        body, content_type = _multipart(_submission_fields(rng), {"file": ("bench.csv", payload)})
+        return "POST", "/complete/submit", body, {"Content-Type": content_type}
+
+    def donnees_upload(rng):
+        fields = {
+            "data_type": "pdd",
+            "columnMapping": json.dumps([{"name": "depth_mm", "dataType": "numeric", "unit": "mm"}]),
+        }
+        body, content_type = _multipart(fields, {"file": (f"{uuid.uuid4().hex[:8]}.csv", payload)})
+        path = f"/donnees/upload/{rng.randint(1, n_experiences)}"
+        return "POST", path, body, {"Content-Type": content_type}
+
+    return {
+        "list_articles": get("/articles/"),
+        "list_experiences": get("/experiences/"),
+        "list_donnees": get("/donnees/"),
+        "list_machines": get("/machines/"),
+        "article_experiences": article_experiences,
+        "experiment_summary": summary,
+        "complete_submit": complete_submit,
+        "donnees_upload": donnees_upload,
+    }
+
+
+# --- Exécution ---
+
+class _Client(threading.local):
+    """Une connexion keep-alive par thread client."""
+
+    def __init__(self, port):
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+
+
+def run_scenario(port, make_request, n_requests, concurrency, seed):
+    client = _Client(port)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def one(i):
+        rng = random.Random(f"{seed}:{i}")
+        method, path, body, headers = make_request(rng)
+        start = time.perf_counter()
+        try:
+            client.conn.request(method, path, body=body, headers=headers)
+            response = client.conn.getresponse()
+            response.read()
+            status = response.status
+        except (http.client.HTTPException, OSError) as e:
+            client.conn.close()
+            client.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+            status = repr(e)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if status not in (200, 201):
+                errors.append(status)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(n_requests)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "throughput_rps": round(n_requests / wall, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "errors": len(errors),
+        "error_samples": sorted({str(e) for e in errors})[:5],
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir, database_url, workers):
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        PYTHONPATH=BACKEND_DIR,
+        LOG_LEVEL="WARNING",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--no-access-log", "--log-level", "warning"],
+        cwd=workdir,
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return proc, port
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("Le serveur n'a pas démarré")
+
+
+def reset_database(engine, metadata):
+    """Vide toutes les tables (le schéma migré est conservé)."""
+    tables = [t.name for t in reversed(metadata.sorted_tables)]
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.exec_driver_sql(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE")
+        else:
+            for table in tables:
+                conn.exec_driver_sql(f"DELETE FROM {table}")
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'API Radiotherapy Data Hub")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES),
+                        help="nombres d'articles (croissants)")
+    parser.add_argument("--experiences-per-article", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=200, help="requêtes par scénario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=1, help="workers uvicorn")
+    parser.add_argument("--upload-rows", type=int, default=2000, help="lignes du CSV envoyé")
+    parser.add_argument("--scenarios", nargs="+", help="sous-ensemble de scénarios")
+    parser.add_argument("--database-url", help="base dédiée (défaut : SQLite temporaire)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="fichier JSON de sortie")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rdh-bench-")
+    upload_dir = os.path.join(workdir, "data", "uploads")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    # L'application lit DATABASE_URL à l'import
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, BACKEND_DIR)
+    from alembic import command
+    from alembic.config import Config
+    from app.database import Base, engine
+    import app.models  # noqa: F401
+    from benchmarks.synthetic import SyntheticConfig, generate
+
+    alembic_cfg = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    alembic_cfg.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    command.upgrade(alembic_cfg, "head")
+
+    results = []
+    for scale in sorted(args.scales):
+        started = time.perf_counter()
+        reset_database(engine, Base.metadata)
+        config = SyntheticConfig(
+            articles=scale,
+            experiences_per_article=args.experiences_per_article,
+            machines=50,
+            detectors=40,
+            phantoms=20,
+            file_pool=50,
+            seed=args.seed,
+        )
+        print(f"\n== {scale} articles")
+        table_counts = generate(engine, config, upload_dir, log=lambda line: None)
+        print(f"   {table_counts} rempli en {time.perf_counter() - started:.1f} s")
+
+        scenarios = build_scenarios(table_counts["articles"], table_counts["experiences"], args.upload_rows)
+        proc, port = start_server(workdir, database_url, args.workers)
+        try:
+            for name, make_request in scenarios.items():
+                if args.scenarios and name not in args.scenarios:
+                    continue
+                result = run_scenario(port, make_request, args.requests, args.concurrency, args.seed)
+                result.update({"scale": scale, "scenario": name})
+                results.append(result)
+                print(f"  {name:22s} {result['throughput_rps']:9.1f} req/s  "
+                      f"p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+                      f"erreurs {result['errors']}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    revision = _git_revision()
+    report = {
+        "revision": revision,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "database": engine.dialect.name,
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "upload_rows": args.upload_rows,
+            "experiences_per_article": args.experiences_per_article,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}_{revision}_{engine.dialect.name}.json"
+    )
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nRésultats : {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Micro-benchmark de la sérialisation des listes (lignes par seconde).
+
+Compare, sur la table articles d'une base SQLite en mémoire remplie par le
+générateur synthétique :
+- orm_jsonable : db.query(Article).all() + jsonable_encoder + JSONResponse
+  (chemin d'origine des routes de liste) ;
+- core_json    : lignes Core (tuples) + json de la bibliothèque standard ;
+- core_orjson  : lignes Core + orjson (chemin de app/serialization.py).
+
+Usage :
+    cd backend
+    python -m benchmarks.bench_serialization [--rows 10000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de sérialisation JSON")
+    parser.add_argument("--rows", type=int, default=10000, help="articles dans la liste")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = "sqlite://"
+    sys.path.insert(0, BACKEND_DIR)
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    from app.database import Base
+    import app.models  # noqa: F401
+    from app.models.article import Article
+    from app.serialization import FastJSONResponse, orjson, rows_to_dicts
+    from benchmarks.synthetic import SyntheticConfig, article_rows
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    config = SyntheticConfig(articles=args.rows)
+    with engine.begin() as conn:
+        conn.execute(
+            Article.__table__.insert(),
+            [dict(zip(("article_id", "titre", "auteurs", "doi"), row)) for row in article_rows(config)],
+        )
+
+    def orm_jsonable():
+        with Session(engine) as db:
+            return JSONResponse(jsonable_encoder(db.query(Article).all())).body
+
+    def core_rows(response_class):
+        def run():
+            with Session(engine) as db:
+                result = db.execute(select(*Article.__table__.columns))
+                return response_class(rows_to_dicts(result)).body
+        return run
+
+    class StdlibJSONResponse(FastJSONResponse):
+        def render(self, content):
+            return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+    variants = [("orm_jsonable", orm_jsonable), ("core_json", core_rows(StdlibJSONResponse))]
+    if orjson is not None:
+        variants.append(("core_orjson", core_rows(FastJSONResponse)))
+    else:
+        print("orjson non installé : variante core_orjson ignorée")
+
+    # Même contenu JSON pour toutes les variantes
+    reference = json.loads(orm_jsonable())
+    for name, fn in variants[1:]:
+        assert json.loads(fn()) == reference, name
+
+    baseline = None
+    print(f"{args.rows} lignes, meilleur de {args.repeat}")
+    for name, fn in variants:
+        elapsed = _best_of(args.repeat, fn)
+        rate = args.rows / elapsed
+        baseline = baseline or rate
+        print(f"  {name:14s} {elapsed * 1000:9.1f} ms  {rate:12,.0f} lignes/s  x{rate / baseline:.1f}")
+
+
+if __name__ == "__main__":
+    main()
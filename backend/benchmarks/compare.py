@@ -0,0 +1,54 @@
+"""
+Compare deux fichiers de résultats de benchmarks/bench_api.py.
+
+Affiche, pour chaque (échelle, scénario) commun, l'évolution du débit et des
+latences p50/p99, et échoue (code 1) si une régression dépasse le seuil.
+
+Usage :
+    cd backend
+    python -m benchmarks.compare results/avant.json results/apres.json [--threshold 0.10]
+"""
+import argparse
+import json
+import sys
+
+
+def _index(report):
+    return {(r["scale"], r["scenario"]): r for r in report["results"]}
+
+
+def _change(before, after):
+    return (after - before) / before if before else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare deux résultats de benchmark")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="régression tolérée (0.10 = 10 %%)")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"{baseline['revision']} -> {candidate['revision']}")
+    before, after = _index(baseline), _index(candidate)
+    regressions = 0
+    for key in sorted(before.keys() & after.keys()):
+        b, a = before[key], after[key]
+        throughput = _change(b["throughput_rps"], a["throughput_rps"])
+        p50 = _change(b["p50_ms"], a["p50_ms"])
+        p99 = _change(b["p99_ms"], a["p99_ms"])
+        regressed = throughput < -args.threshold or p50 > args.threshold or p99 > args.threshold
+        regressions += regressed
+        print(f"{'REGR' if regressed else '    '}  {key[0]:>8} {key[1]:22s} "
+              f"débit {throughput:+7.1%}  p50 {p50:+7.1%}  p99 {p99:+7.1%}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,393 @@
+"""
+Générateur de jeu de données synthétique pour les tests de montée en charge.
+
+Remplit le schéma avec des volumes réalistes (par défaut 100 000 articles et
+1 000 000 d'expériences), de façon déterministe à partir d'une graine :
+- catalogue de machines, détecteurs et fantômes dont la popularité suit
+  une loi de Zipf (quelques modèles très utilisés, une longue traîne) ;
+- tables de liaison avec paramètres (énergie, collimation, profondeur...) ;
+- données (PDD, profils, grilles de dose) et leurs ColumnMapping.
+
+Chaque table est produite par un flux indépendant (graine dérivée de
+seed/table/article) et chargée par COPY ... FROM STDIN sur PostgreSQL, sans
+passer par l'ORM ni tout garder en mémoire. Sur SQLite, chargement par lots
+d'executemany. Les fichiers de données forment une réserve de courbes
+(--file-pool) partagée par les lignes Donnee, pour que le volume disque reste
+raisonnable à grande échelle.
+
+Usage :
+    cd backend
+    python -m benchmarks.synthetic --articles 100000 --experiences-per-article 10
+    python -m benchmarks.synthetic --articles 1000 --database-url sqlite:///synthetic.db
+
+Depuis un autre benchmark :
+    from benchmarks.synthetic import SyntheticConfig, generate
+    generate(engine, SyntheticConfig(articles=1000), upload_dir="data/uploads")
+"""
+import argparse
+import csv
+import itertools
+import math
+import os
+import random
+import sys
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+
+from app.services.bulk_load import loader_for
+from app.services.catalog import match_key
+from app.services.units import detector_link_values, machine_link_values
+
+
+MACHINE_LINES = [
+    ("Varian", "Linear Accelerator", ["TrueBeam", "Clinac iX", "Clinac 2100", "Halcyon", "Ethos", "VitalBeam", "Edge"]),
+    ("Elekta", "Linear Accelerator", ["Versa HD", "Synergy", "Infinity", "Precise", "Harmony"]),
+    ("Elekta", "MR-Linac", ["Unity"]),
+    ("Accuray", "Robotic", ["CyberKnife M6", "CyberKnife S7"]),
+    ("Accuray", "Helical", ["TomoTherapy HD", "Radixact"]),
+    ("Siemens", "Linear Accelerator", ["Artiste", "Oncor", "Primus"]),
+    ("ViewRay", "MR-Linac", ["MRIdian"]),
+    ("IBA", "Proton", ["Proteus Plus", "Proteus One"]),
+]
+DETECTOR_LINES = [
+    ("PTW", "Ion Chamber", ["31010 Semiflex", "31021 Semiflex 3D", "30013 Farmer", "31016 PinPoint 3D", "34045 Advanced Markus"]),
+    ("IBA", "Ion Chamber", ["FC65-G", "CC13", "CC04", "Razor Chamber", "PPC05"]),
+    ("PTW", "Diode", ["microDiamond 60019", "60017 Diode E", "60018 Diode SRS"]),
+    ("Sun Nuclear", "Diode", ["EDGE", "QA3", "MapCHECK 2"]),
+    ("Standard Imaging", "Ion Chamber", ["Exradin A1SL", "Exradin A12", "Exradin W2"]),
+    ("Ashland", "Film", ["EBT3", "EBT-XD", "MD-V3"]),
+    ("Landauer", "OSL", ["nanoDot", "InLight"]),
+]
+PHANTOM_LINES = [
+    ("PTW", "homogeneous", "water", ["MP3 Water Phantom", "BEAMSCAN", "MP1"]),
+    ("IBA", "homogeneous", "water", ["Blue Phantom 2", "Blue Phantom", "SP34"]),
+    ("Sun Nuclear", "slab", "solid water", ["Solid Water HE", "SRS MapCHECK"]),
+    ("CIRS", "anthropomorphic", "tissue-equivalent", ["Thorax 002LFC", "ATOM 701", "Head 038"]),
+    ("Standard Imaging", "slab", "plastic water", ["Virtual Water", "Lucy 3D"]),
+]
+PHOTON_ENERGIES = ["6 MV", "10 MV", "15 MV", "18 MV", "6 FFF", "10 FFF"]
+ELECTRON_ENERGIES = ["6 MeV", "9 MeV", "12 MeV", "16 MeV", "20 MeV"]
+FIELD_SIZES = ["2x2", "3x3", "5x5", "10x10", "15x15", "20x20", "30x30", "40x40"]
+DATA_TYPES = [("pdd", 0.5), ("profile", 0.4), ("dose_grid", 0.1)]
+COLUMN_MAPPINGS = {
+    "pdd": [("depth", "Profondeur sur l'axe", "numeric", "mm"), ("dose", "Dose relative", "numeric", "%")],
+    "profile": [("position", "Position hors axe", "numeric", "mm"), ("dose", "Dose relative", "numeric", "%")],
+    "dose_grid": [("x", "Position x", "numeric", "mm"), ("y", "Position y", "numeric", "mm"),
+                  ("dose", "Dose absolue", "numeric", "Gy")],
+}
+
+
+@dataclass
+class SyntheticConfig:
+    articles: int = 100_000
+    experiences_per_article: int = 10
+    donnees_per_experience: int = 1
+    machines: int = 400
+    detectors: int = 250
+    phantoms: int = 150
+    zipf_exponent: float = 1.1
+    file_pool: int = 300
+    seed: int = 42
+
+
+# --- Popularité et catalogue ---
+
+def _zipf_cumulative(n, exponent):
+    """Poids cumulés d'une loi de Zipf sur n éléments (rang 1 = plus populaire)."""
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+def _pick(rng, cumulative):
+    """Index tiré selon les poids cumulés (1 tirage, O(log n))."""
+    return bisect_left(cumulative, rng.random() * cumulative[-1])
+
+
+def _catalog(lines, count, seed, kind):
+    """Déroule les gammes (fabricant, modèle) en variantes jusqu'à `count` entrées."""
+    rng = random.Random(f"{seed}:{kind}")
+    base = [(line, model) for line in lines for model in line[-1]]
+    entries = []
+    for i in range(count):
+        line, model = base[i % len(base)]
+        generation = i // len(base)
+        entries.append((line, model if generation == 0 else f"{model} v{generation + 1}"))
+    rng.shuffle(entries)  # la popularité ne suit pas l'ordre des gammes
+    return entries
+
+
+def machine_rows(config):
+    for machine_id, ((constructeur, type_machine, _), modele) in enumerate(
+        _catalog(MACHINE_LINES, config.machines, config.seed, "machines"), start=1
+    ):
+        yield (machine_id, constructeur, modele, type_machine, match_key(type_machine, constructeur, modele))
+
+
+def detector_rows(config):
+    for detecteur_id, ((constructeur, type_detecteur, _), modele) in enumerate(
+        _catalog(DETECTOR_LINES, config.detectors, config.seed, "detectors"), start=1
+    ):
+        yield (detecteur_id, type_detecteur, modele, constructeur,
+               match_key(type_detecteur, constructeur, modele))
+
+
+def phantom_rows(config):
+    rng = random.Random(f"{config.seed}:phantom_dimensions")
+    for phantom_id, ((manufacturer, phantom_type, material, _), model) in enumerate(
+        _catalog(PHANTOM_LINES, config.phantoms, config.seed, "phantoms"), start=1
+    ):
+        dimensions = "x".join(str(rng.choice([20, 30, 40, 48, 50, 60])) for _ in range(3))
+        yield (phantom_id, phantom_type, manufacturer, model, dimensions, material,
+               match_key(phantom_type, manufacturer, model))
+
+
+# --- Articles, expériences et liaisons ---
+
+def _experience_ids(config, article_id):
+    first = (article_id - 1) * config.experiences_per_article + 1
+    return range(first, first + config.experiences_per_article)
+
+
+def article_rows(config):
+    for article_id in range(1, config.articles + 1):
+        rng = random.Random(f"{config.seed}:article:{article_id}")
+        authors = ", ".join(f"Author{rng.randint(1, 20000)}" for _ in range(rng.randint(1, 6)))
+        yield (article_id, f"Dosimetric study {article_id}", authors, f"10.5555/synthetic.{config.seed}.{article_id}")
+
+
+def experience_rows(config):
+    for article_id in range(1, config.articles + 1):
+        for experience_id in _experience_ids(config, article_id):
+            yield (experience_id, f"Measurement series {experience_id}", article_id)
+
+
+def _distinct_picks(rng, cumulative, count):
+    count = min(count, len(cumulative))
+    picked = []
+    while len(picked) < count:
+        index = _pick(rng, cumulative) + 1
+        if index not in picked:
+            picked.append(index)
+    return picked
+
+
+def experience_machine_rows(config):
+    cumulative = _zipf_cumulative(config.machines, config.zipf_exponent)
+    for experience_id in range(1, config.articles * config.experiences_per_article + 1):
+        rng = random.Random(f"{config.seed}:experience_machine:{experience_id}")
+        for machine_id in _distinct_picks(rng, cumulative, 1 + (rng.random() < 0.15)):
+            energy = rng.choice(ELECTRON_ENERGIES if rng.random() < 0.15 else PHOTON_ENERGIES)
+            collimation = rng.choice(FIELD_SIZES)
+            yield (experience_id, machine_id, energy, collimation, f"{rng.choice([100, 300, 600, 1400])} MU/min",
+                   *machine_link_values(energy, collimation).values())
+
+
+def experience_detector_rows(config):
+    cumulative = _zipf_cumulative(config.detectors, config.zipf_exponent)
+    for experience_id in range(1, config.articles * config.experiences_per_article + 1):
+        rng = random.Random(f"{config.seed}:experience_detector:{experience_id}")
+        for detector_id in _distinct_picks(rng, cumulative, rng.randint(1, 3)):
+            position = rng.choice(["central axis", "off-axis", "isocenter"])
+            depth = f"{rng.choice([0.5, 1.5, 2.5, 5, 10, 20])} cm"
+            yield (experience_id, detector_id, position, depth, rng.choice(["parallel", "perpendicular"]),
+                   *detector_link_values(position, depth).values())
+
+
+def experience_phantom_rows(config):
+    cumulative = _zipf_cumulative(config.phantoms, config.zipf_exponent)
+    for experience_id in range(1, config.articles * config.experiences_per_article + 1):
+        rng = random.Random(f"{config.seed}:experience_phantom:{experience_id}")
+        yield (experience_id, _pick(rng, cumulative) + 1, "isocenter", rng.choice(["gantry 0", "gantry 90"]))
+
+
+# --- Données et fichiers ---
+
+def _data_type(rng):
+    r, acc = rng.random(), 0.0
+    for data_type, weight in DATA_TYPES:
+        acc += weight
+        if r < acc:
+            return data_type
+    return DATA_TYPES[-1][0]
+
+
+def _file_path(upload_dir, data_type, index):
+    return f"{upload_dir}/synthetic/{data_type}_{index:05d}.csv"
+
+
+def donnee_rows(config, upload_dir, ingested_at):
+    per_experience = config.donnees_per_experience
+    for experience_id in range(1, config.articles * config.experiences_per_article + 1):
+        rng = random.Random(f"{config.seed}:donnee:{experience_id}")
+        for k in range(per_experience):
+            data_id = (experience_id - 1) * per_experience + k + 1
+            data_type = _data_type(rng)
+            yield (data_id, experience_id, data_type, "csv",
+                   _file_path(upload_dir, data_type, rng.randrange(config.file_pool)),
+                   f"{data_type} {data_id}", ingested_at)
+
+
+def column_mapping_rows(config, upload_dir, ingested_at):
+    for data_id, _, data_type, *_ in donnee_rows(config, upload_dir, ingested_at):
+        for column_name, description, col_type, unit in COLUMN_MAPPINGS[data_type]:
+            yield (data_id, column_name, description, col_type, unit, ingested_at)
+
+
+def pdd_curve(rng):
+    """Rendement en profondeur : build-up jusqu'à d_max puis décroissance ~exponentielle."""
+    d_max = rng.uniform(12, 35)
+    mu = rng.uniform(0.0035, 0.006)
+    surface = rng.uniform(35, 60)
+    rows = []
+    for depth in range(0, 301, 2):
+        if depth < d_max:
+            dose = surface + (100 - surface) * math.sin(math.pi / 2 * depth / d_max)
+        else:
+            dose = 100 * math.exp(-mu * (depth - d_max))
+        rows.append((depth, round(dose, 3)))
+    return rows
+
+
+def profile_curve(rng):
+    """Profil de dose : plateau de largeur = taille de champ, pénombre sigmoïde."""
+    half_field = rng.choice([10, 20, 30, 50, 100, 150, 200, 300]) / 2
+    penumbra = rng.uniform(2.5, 7.0)  # largeur 80/20 en mm
+    scale = penumbra / (2 * math.log(4))  # 80/20 d'une logistique = 2 ln(4) * scale
+    horn = rng.uniform(0, 3)  # surdosage relatif (%) en bord de champ
+    rows = []
+    for x in range(-int(half_field) - 40, int(half_field) + 41):
+        edge = 1 / (1 + math.exp((abs(x) - half_field) / scale))
+        shape = 1 + horn / 100 * min(abs(x) / half_field, 1) ** 2
+        rows.append((x, round(100 * edge * shape, 3)))
+    return rows
+
+
+def dose_grid(rng):
+    half_field = rng.choice([20, 30, 50])
+    sigma = rng.uniform(1.5, 3.0)
+    rows = []
+    for x in range(-60, 61, 4):
+        for y in range(-60, 61, 4):
+            fx = 1 / (1 + math.exp((abs(x) - half_field) / sigma))
+            fy = 1 / (1 + math.exp((abs(y) - half_field) / sigma))
+            rows.append((x, y, round(2.0 * fx * fy, 5)))
+    return rows
+
+
+def write_file_pool(config, upload_dir):
+    """Écrit la réserve de fichiers de courbes référencés par les Donnee."""
+    directory = os.path.join(upload_dir, "synthetic")
+    os.makedirs(directory, exist_ok=True)
+    generators = {"pdd": pdd_curve, "profile": profile_curve, "dose_grid": dose_grid}
+    for data_type, generator in generators.items():
+        header = [name for name, *_ in COLUMN_MAPPINGS[data_type]]
+        for index in range(config.file_pool):
+            rng = random.Random(f"{config.seed}:file:{data_type}:{index}")
+            with open(_file_path(upload_dir, data_type, index), "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(generator(rng))
+
+
+# --- Chargement ---
+
+# (table, colonnes, générateur de lignes)
+def _tables(config, upload_dir):
+    # Données et colonnes d'une même date d'ingestion (partition de column_mappings)
+    ingested_at = datetime.now(timezone.utc).replace(tzinfo=None).isoformat(sep=" ", timespec="microseconds")
+    return [
+        ("machines", ("machine_id", "constructeur", "modele", "type_machine", "match_key"), machine_rows(config)),
+        ("detecteurs", ("detecteur_id", "type_detecteur", "modele", "constructeur", "match_key"),
+         detector_rows(config)),
+        ("phantoms", ("phantom_id", "phantom_type", "manufacturer", "model", "dimensions", "material", "match_key"),
+         phantom_rows(config)),
+        ("articles", ("article_id", "titre", "auteurs", "doi"), article_rows(config)),
+        ("experiences", ("experience_id", "description", "article_id"), experience_rows(config)),
+        ("experience_machine", ("experience_id", "machine_id", "energy", "collimation", "settings",
+                                "energy_min", "energy_max", "energy_unit", "field_size_cm2"),
+         experience_machine_rows(config)),
+        ("experience_detecteur", ("experience_id", "detector_id", "position", "depth", "orientation",
+                                  "depth_min_mm", "depth_max_mm", "position_mm"),
+         experience_detector_rows(config)),
+        ("experience_phantom", ("experience_id", "phantom_id", "position", "orientation"),
+         experience_phantom_rows(config)),
+        ("donnees", ("data_id", "experience_id", "data_type", "file_format", "file_path", "description",
+                     "ingested_at"),
+         donnee_rows(config, upload_dir, ingested_at)),
+        ("column_mappings", ("data_id", "column_name", "column_description", "data_type", "unit", "ingested_at"),
+         column_mapping_rows(config, upload_dir, ingested_at)),
+    ]
+
+
+# Séquences à recaler après un chargement avec identifiants explicites
+SERIAL_COLUMNS = [
+    ("machines", "machine_id"),
+    ("detecteurs", "detecteur_id"),
+    ("phantoms", "phantom_id"),
+    ("articles", "article_id"),
+    ("experiences", "experience_id"),
+    ("donnees", "data_id"),
+]
+
+
+def generate(engine, config, upload_dir="data/uploads", log=print):
+    """
+    Charge le jeu de données dans une base vide (schéma migré).
+
+    Returns:
+        dict: nombre de lignes chargées par table
+    """
+    write_file_pool(config, upload_dir)
+
+    load = loader_for(engine.dialect.name)
+
+    counts = {}
+    raw = engine.raw_connection()
+    try:
+        for table, columns, rows in _tables(config, upload_dir):
+            started = time.perf_counter()
+            counts[table] = load(raw.driver_connection, table, columns, rows)
+            elapsed = time.perf_counter() - started
+            log(f"  {table:22s} {counts[table]:>12,} lignes  {elapsed:7.1f} s")
+
+        if engine.dialect.name == "postgresql":
+            with raw.driver_connection.cursor() as cursor:
+                for table, column in SERIAL_COLUMNS:
+                    cursor.execute(
+                        f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+                        f"COALESCE((SELECT MAX({column}) FROM {table}), 1))"
+                    )
+                cursor.execute("ANALYZE")
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    return counts
+
+
+def main():
+    defaults = SyntheticConfig()
+    parser = argparse.ArgumentParser(description="Générateur de données synthétiques")
+    for field, value in asdict(defaults).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--upload-dir", default="data/uploads")
+    parser.add_argument("--database-url", help="défaut : DATABASE_URL")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.database import engine
+
+    config = SyntheticConfig(**{field: getattr(args, field) for field in asdict(defaults)})
+    print(f"Génération {asdict(config)} -> {engine.url.render_as_string(hide_password=True)}")
+    started = time.perf_counter()
+    generate(engine, config, args.upload_dir)
+    print(f"Terminé en {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
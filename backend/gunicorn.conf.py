@@ -0,0 +1,62 @@
+"""
+Configuration gunicorn : mode production avec plusieurs workers uvicorn.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Variables d'environnement :
+- WEB_CONCURRENCY : nombre de workers (défaut : 2 x CPU + 1, plafonné par
+  GUNICORN_MAX_WORKERS) ; les CPU sont ceux alloués au conteneur (quota
+  cgroup), pas ceux de l'hôte ;
+- GUNICORN_MAX_WORKERS : plafond du défaut (6) ; chaque worker a son propre
+  pool de connexions (5 + 10 en débordement par défaut), le total doit rester
+  sous max_connections de PostgreSQL ;
+- GRACEFUL_TIMEOUT : délai laissé aux requêtes en cours (uploads) à l'arrêt ;
+- BIND : adresse d'écoute (0.0.0.0:8000).
+"""
+import math
+import os
+
+
+def _available_cpus():
+    # Quota cgroup v2 (docker run --cpus / limits.cpus)
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or min(
+    2 * _available_cpus() + 1, int(os.getenv("GUNICORN_MAX_WORKERS", "6"))
+)
+
+# L'application est importée une fois dans le maître puis partagée par fork
+# (démarrage plus rapide, mémoire partagée en copie sur écriture)
+preload_app = True
+
+# Arrêt : les workers cessent d'accepter des connexions, /readyz répond 503,
+# les requêtes en cours ont graceful_timeout secondes pour se terminer
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "120"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+keepalive = 5
+
+# Journal d'accès produit par l'application (app.access)
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+
+def post_fork(server, worker):
+    # Les connexions éventuellement ouvertes dans le maître ne doivent pas
+    # être partagées entre processus : le worker repart d'un pool vide
+    from app.database import engine
+
+    engine.dispose(close=False)
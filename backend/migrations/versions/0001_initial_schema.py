@@ -0,0 +1,129 @@
+"""Schéma initial (identique à l'ancien Base.metadata.create_all)
+
+Les bases créées avant l'introduction d'Alembic ont déjà ce schéma :
+les marquer avec `alembic stamp 0001` puis lancer `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "articles",
+        sa.Column("article_id", sa.Integer(), primary_key=True),
+        sa.Column("titre", sa.String(), nullable=False),
+        sa.Column("auteurs", sa.String()),
+        sa.Column("doi", sa.String(), unique=True),
+    )
+    op.create_index("ix_articles_article_id", "articles", ["article_id"])
+
+    op.create_table(
+        "machines",
+        sa.Column("machine_id", sa.Integer(), primary_key=True),
+        sa.Column("constructeur", sa.String()),
+        sa.Column("modele", sa.String(), nullable=False),
+        sa.Column("type_machine", sa.String()),
+    )
+    op.create_index("ix_machines_machine_id", "machines", ["machine_id"])
+
+    op.create_table(
+        "detecteurs",
+        sa.Column("detecteur_id", sa.Integer(), primary_key=True),
+        sa.Column("type_detecteur", sa.String()),
+        sa.Column("modele", sa.String()),
+        sa.Column("constructeur", sa.String()),
+    )
+
+    op.create_table(
+        "phantoms",
+        sa.Column("phantom_id", sa.Integer(), primary_key=True),
+        sa.Column("phantom_type", sa.String()),
+        sa.Column("manufacturer", sa.String()),
+        sa.Column("model", sa.String()),
+        sa.Column("dimensions", sa.String()),
+        sa.Column("material", sa.String()),
+    )
+
+    op.create_table(
+        "experiences",
+        sa.Column("experience_id", sa.Integer(), primary_key=True),
+        sa.Column("description", sa.String()),
+        sa.Column("article_id", sa.Integer(), sa.ForeignKey("articles.article_id")),
+    )
+    op.create_index("ix_experiences_experience_id", "experiences", ["experience_id"])
+
+    op.create_table(
+        "donnees",
+        sa.Column("data_id", sa.Integer(), primary_key=True),
+        sa.Column("experience_id", sa.Integer(), sa.ForeignKey("experiences.experience_id"), nullable=False),
+        sa.Column("data_type", sa.String(), nullable=False),
+        sa.Column("file_format", sa.String()),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("description", sa.String()),
+    )
+    op.create_index("ix_donnees_data_id", "donnees", ["data_id"])
+
+    op.create_table(
+        "column_mappings",
+        sa.Column("mapping_id", sa.Integer(), primary_key=True),
+        sa.Column("data_id", sa.Integer(), sa.ForeignKey("donnees.data_id"), nullable=False),
+        sa.Column("column_name", sa.String(), nullable=False),
+        sa.Column("column_description", sa.String()),
+        sa.Column("data_type", sa.String(), nullable=False),
+        sa.Column("unit", sa.String()),
+    )
+    op.create_index("ix_column_mappings_mapping_id", "column_mappings", ["mapping_id"])
+
+    op.create_table(
+        "experience_machine",
+        sa.Column("experience_id", sa.Integer(), sa.ForeignKey("experiences.experience_id"), primary_key=True),
+        sa.Column("machine_id", sa.Integer(), sa.ForeignKey("machines.machine_id"), primary_key=True),
+        sa.Column("energy", sa.String()),
+        sa.Column("collimation", sa.String()),
+        sa.Column("settings", sa.String()),
+    )
+
+    op.create_table(
+        "experience_detecteur",
+        sa.Column("experience_id", sa.Integer(), sa.ForeignKey("experiences.experience_id"), primary_key=True),
+        sa.Column("detector_id", sa.Integer(), sa.ForeignKey("detecteurs.detecteur_id"), primary_key=True),
+        sa.Column("position", sa.String()),
+        sa.Column("depth", sa.String()),
+        sa.Column("orientation", sa.String()),
+    )
+
+    op.create_table(
+        "experience_phantom",
+        sa.Column("experience_id", sa.Integer(), sa.ForeignKey("experiences.experience_id"), primary_key=True),
+        sa.Column("phantom_id", sa.Integer(), sa.ForeignKey("phantoms.phantom_id"), primary_key=True),
+        sa.Column("position", sa.String(), nullable=True),
+        sa.Column("orientation", sa.String(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("experience_phantom")
+    op.drop_table("experience_detecteur")
+    op.drop_table("experience_machine")
+    op.drop_index("ix_column_mappings_mapping_id", table_name="column_mappings")
+    op.drop_table("column_mappings")
+    op.drop_index("ix_donnees_data_id", table_name="donnees")
+    op.drop_table("donnees")
+    op.drop_index("ix_experiences_experience_id", table_name="experiences")
+    op.drop_table("experiences")
+    op.drop_table("phantoms")
+    op.drop_table("detecteurs")
+    op.drop_index("ix_machines_machine_id", table_name="machines")
+    op.drop_table("machines")
+    op.drop_index("ix_articles_article_id", table_name="articles")
+    op.drop_table("articles")
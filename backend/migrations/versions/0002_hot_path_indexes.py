@@ -0,0 +1,44 @@
+"""Index sur les clés étrangères et les colonnes de recherche des équipements
+
+- clés étrangères parcourues par les routes de lecture
+  (expériences d'un article, données d'une expérience, colonnes d'une donnée) ;
+- sens inverse des tables de liaison (expériences utilisant un équipement),
+  la clé primaire composite ne couvrant que experience_id en premier ;
+- index composites pour les listes en cascade type -> fabricant -> modèle
+  et pour la recherche exacte des fonctions get_or_create_*.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_experiences_article_id", "experiences", ["article_id"]),
+    ("ix_donnees_experience_id", "donnees", ["experience_id"]),
+    ("ix_column_mappings_data_id", "column_mappings", ["data_id"]),
+    ("ix_experience_machine_machine_id", "experience_machine", ["machine_id"]),
+    ("ix_experience_detecteur_detector_id", "experience_detecteur", ["detector_id"]),
+    ("ix_experience_phantom_phantom_id", "experience_phantom", ["phantom_id"]),
+    ("ix_machines_type_constructeur_modele", "machines", ["type_machine", "constructeur", "modele"]),
+    ("ix_detecteurs_type_constructeur_modele", "detecteurs", ["type_detecteur", "constructeur", "modele"]),
+    ("ix_phantoms_type_manufacturer_model", "phantoms", ["phantom_type", "manufacturer", "model"]),
+    ("ix_phantoms_model", "phantoms", ["model"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,59 @@
+"""Clés de correspondance normalisées des équipements (match_key)
+
+- colonne match_key ("type|fabricant|modèle" normalisé) sur machines,
+  detecteurs et phantoms, calculée pour les lignes existantes ;
+- les doublons exacts après normalisation sont fusionnés sur l'entité la
+  plus ancienne (liaisons réécrites), puis un index unique est posé ;
+- PostgreSQL : extension pg_trgm (si disponible) et index GIN trigramme sur
+  "fabricant modèle", utilisés par scripts/dedup_catalog.py.
+
+La fusion des doublons n'est pas annulée par le downgrade.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.catalog import CATALOGS, NAME_EXPRESSION, backfill_match_keys
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def _pg_trgm_available(conn):
+    return conn.execute(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    )).first() is not None
+
+
+def upgrade():
+    conn = op.get_bind()
+    for catalog in CATALOGS.values():
+        op.add_column(catalog.table, sa.Column("match_key", sa.String()))
+        backfill_match_keys(conn, catalog)
+        with op.batch_alter_table(catalog.table) as batch:
+            batch.alter_column("match_key", existing_type=sa.String(), nullable=False)
+        op.create_index(f"ux_{catalog.table}_match_key", catalog.table, ["match_key"], unique=True)
+
+    if conn.dialect.name == "postgresql" and _pg_trgm_available(conn):
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for catalog in CATALOGS.values():
+            op.execute(
+                f"CREATE INDEX ix_{catalog.table}_match_name_trgm ON {catalog.table} "
+                f"USING gin ({NAME_EXPRESSION.format(alias='')} gin_trgm_ops)"
+            )
+
+
+def downgrade():
+    conn = op.get_bind()
+    for catalog in reversed(list(CATALOGS.values())):
+        if conn.dialect.name == "postgresql":
+            op.execute(f"DROP INDEX IF EXISTS ix_{catalog.table}_match_name_trgm")
+        op.drop_index(f"ux_{catalog.table}_match_key", table_name=catalog.table)
+        with op.batch_alter_table(catalog.table) as batch:
+            batch.drop_column("match_key")
@@ -0,0 +1,116 @@
+"""Valeurs numériques normalisées des paramètres d'expérience
+
+- experience_machine : energy_min / energy_max / energy_unit (MV ou MeV) et
+  field_size_cm2, lus dans energy et collimation ;
+- experience_detecteur : depth_min_mm / depth_max_mm et position_mm, lus
+  dans depth et position (unité par défaut : celle des colonnes de
+  profondeur/position des données de l'expérience, sinon le cm) ;
+- index B-tree pour les filtres par plage de GET /experiences/.
+
+Les colonnes texte d'origine sont conservées. Le calcul est fait par
+tranches d'expériences (BACKFILL_CHUNK) pour borner la mémoire.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.units import (
+    LENGTH_FACTORS_MM,
+    detector_link_values,
+    length_unit_from_mappings,
+    machine_link_values,
+)
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK = 50000
+
+COLUMNS = [
+    ("experience_machine", "energy_min", sa.Float()),
+    ("experience_machine", "energy_max", sa.Float()),
+    ("experience_machine", "energy_unit", sa.String()),
+    ("experience_machine", "field_size_cm2", sa.Float()),
+    ("experience_detecteur", "depth_min_mm", sa.Float()),
+    ("experience_detecteur", "depth_max_mm", sa.Float()),
+    ("experience_detecteur", "position_mm", sa.Float()),
+]
+
+INDEXES = [
+    ("ix_experience_machine_energy", "experience_machine", ["energy_unit", "energy_min", "energy_max"]),
+    ("ix_experience_machine_field_size", "experience_machine", ["field_size_cm2"]),
+    ("ix_experience_detecteur_depth", "experience_detecteur", ["depth_min_mm", "depth_max_mm"]),
+    ("ix_experience_detecteur_position", "experience_detecteur", ["position_mm"]),
+]
+
+
+def _backfill(conn):
+    last_id = conn.execute(sa.text("SELECT MAX(experience_id) FROM experiences")).scalar() or 0
+    length_units = tuple(LENGTH_FACTORS_MM)
+    for start in range(0, last_id + 1, BACKFILL_CHUNK):
+        window = {"start": start, "end": start + BACKFILL_CHUNK}
+
+        machines = conn.execute(sa.text(
+            "SELECT l.experience_id, l.machine_id, l.energy, l.collimation, m.type_machine "
+            "FROM experience_machine l JOIN machines m ON m.machine_id = l.machine_id "
+            "WHERE l.experience_id >= :start AND l.experience_id < :end"
+        ), window).all()
+        if machines:
+            conn.execute(sa.text(
+                "UPDATE experience_machine SET energy_min = :energy_min, energy_max = :energy_max, "
+                "energy_unit = :energy_unit, field_size_cm2 = :field_size_cm2 "
+                "WHERE experience_id = :experience_id AND machine_id = :machine_id"
+            ), [
+                {"experience_id": experience_id, "machine_id": machine_id,
+                 **machine_link_values(energy, collimation, type_machine)}
+                for experience_id, machine_id, energy, collimation, type_machine in machines
+            ])
+
+        detectors = conn.execute(sa.text(
+            "SELECT experience_id, detector_id, position, depth FROM experience_detecteur "
+            "WHERE experience_id >= :start AND experience_id < :end"
+        ), window).all()
+        if not detectors:
+            continue
+        mappings = defaultdict(list)
+        for experience_id, name, unit in conn.execute(sa.text(
+            "SELECT d.experience_id, c.column_name, c.unit FROM column_mappings c "
+            "JOIN donnees d ON d.data_id = c.data_id "
+            "WHERE d.experience_id >= :start AND d.experience_id < :end AND LOWER(c.unit) IN :units"
+        ).bindparams(sa.bindparam("units", expanding=True)), {**window, "units": list(length_units)}):
+            mappings[experience_id].append({"name": name, "unit": unit})
+        conn.execute(sa.text(
+            "UPDATE experience_detecteur SET depth_min_mm = :depth_min_mm, depth_max_mm = :depth_max_mm, "
+            "position_mm = :position_mm "
+            "WHERE experience_id = :experience_id AND detector_id = :detector_id"
+        ), [
+            {"experience_id": experience_id, "detector_id": detector_id,
+             **detector_link_values(position, depth, length_unit_from_mappings(mappings.get(experience_id)))}
+            for experience_id, detector_id, position, depth in detectors
+        ])
+
+
+def upgrade():
+    for table, column, column_type in COLUMNS:
+        op.add_column(table, sa.Column(column, column_type))
+    _backfill(op.get_bind())
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    for table in ("experience_detecteur", "experience_machine"):
+        with op.batch_alter_table(table) as batch:
+            for column_table, column, _ in reversed(COLUMNS):
+                if column_table == table:
+                    batch.drop_column(column)
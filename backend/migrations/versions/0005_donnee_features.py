@@ -0,0 +1,47 @@
+"""Grandeurs dosimétriques extraites des données (table donnee_features)
+
+- une ligne par donnée : statut du calcul, version de l'extracteur et
+  grandeurs (d_max, D10, D20, R50 des PDD ; largeur de champ, pénombre
+  80/20 et planéité des profils) ;
+- un index B-tree par grandeur, pour les recherches par plage de
+  GET /donnees/search.
+
+Les lignes ne sont pas calculées ici (lecture des fichiers) : lancer
+scripts/extract_features.py pour les données existantes.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+FEATURE_COLUMNS = (
+    "dmax_mm", "d10_pct", "d20_pct", "r50_mm",
+    "field_width_mm", "penumbra_mm", "flatness_pct",
+)
+
+
+def upgrade():
+    op.create_table(
+        "donnee_features",
+        sa.Column("data_id", sa.Integer(), sa.ForeignKey("donnees.data_id"), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("detail", sa.String()),
+        sa.Column("version", sa.Integer(), nullable=False),
+        *(sa.Column(name, sa.Float()) for name in FEATURE_COLUMNS),
+    )
+    for name in FEATURE_COLUMNS:
+        op.create_index(f"ix_donnee_features_{name}", "donnee_features", [name])
+
+
+def downgrade():
+    for name in reversed(FEATURE_COLUMNS):
+        op.drop_index(f"ix_donnee_features_{name}", table_name="donnee_features")
+    op.drop_table("donnee_features")
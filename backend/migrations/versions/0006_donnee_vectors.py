@@ -0,0 +1,34 @@
+"""Vecteurs de forme des courbes (table donnee_vectors)
+
+Une ligne par donnée dont le fichier est une courbe 1D : dose
+rééchantillonnée, normalisée (VECTOR_DIM float32), source des index de
+recherche de courbes similaires (POST /donnees/similar).
+
+Les vecteurs ne sont pas calculés ici (lecture des fichiers) : lancer
+scripts/extract_features.py puis scripts/build_similarity_index.py.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "donnee_vectors",
+        sa.Column("data_id", sa.Integer(), sa.ForeignKey("donnees.data_id"), primary_key=True),
+        sa.Column("vector", sa.LargeBinary(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("donnee_vectors")
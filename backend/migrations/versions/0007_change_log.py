@@ -0,0 +1,36 @@
+"""Journal des changements (table change_log)
+
+Une ligne par article, expérience, donnée ou liaison d'équipement créé,
+écrite dans la même transaction que la création. change_id sert de
+curseur à GET /changes et au flux SSE /changes/stream.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "change_log",
+        sa.Column("change_id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("entity", sa.String(), nullable=False),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("experience_id", sa.Integer()),
+        sa.Column("article_id", sa.Integer()),
+        sqlite_autoincrement=True,
+    )
+
+
+def downgrade():
+    op.drop_table("change_log")
@@ -0,0 +1,127 @@
+"""Date d'ingestion des données, column_mappings partitionnée par mois
+
+- donnees.ingested_at (UTC) et index BRIN (PostgreSQL) : quelques pages
+  quelle que soit la taille de la table, les dates croissant avec data_id ;
+- column_mappings.ingested_at, égal à celui de la donnée ;
+- PostgreSQL : column_mappings recréée partitionnée par plage sur
+  ingested_at (partitions mensuelles et partition par défaut, voir
+  app/services/partitions.py), clé primaire (mapping_id, ingested_at).
+  Les lignes existantes sont recopiées dans la partition du mois courant ;
+  la séquence de mapping_id est conservée.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.changes import utcnow
+from app.services.partitions import DEFAULT_PARTITION, ensure_partitions
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+UTC_NOW = "(now() AT TIME ZONE 'utc')"
+
+MAPPING_COLUMNS = "mapping_id, data_id, column_name, column_description, data_type, unit"
+
+
+def _upgrade_postgresql(conn):
+    op.add_column("donnees", sa.Column("ingested_at", sa.DateTime(), nullable=False,
+                                       server_default=sa.text(UTC_NOW)))
+    op.execute("CREATE INDEX ix_donnees_ingested_at ON donnees USING brin (ingested_at)")
+
+    op.execute("ALTER TABLE column_mappings RENAME TO column_mappings_legacy")
+    op.execute("ALTER SEQUENCE column_mappings_mapping_id_seq OWNED BY NONE")
+    op.execute(f"""
+        CREATE TABLE column_mappings (
+            mapping_id integer NOT NULL DEFAULT nextval('column_mappings_mapping_id_seq'),
+            data_id integer NOT NULL,
+            column_name varchar NOT NULL,
+            column_description varchar,
+            data_type varchar NOT NULL,
+            unit varchar,
+            ingested_at timestamp without time zone NOT NULL DEFAULT {UTC_NOW}
+        ) PARTITION BY RANGE (ingested_at)
+    """)
+    op.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF column_mappings DEFAULT")
+    ensure_partitions(conn)
+    op.execute(f"""
+        INSERT INTO column_mappings ({MAPPING_COLUMNS}, ingested_at)
+        SELECT m.mapping_id, m.data_id, m.column_name, m.column_description, m.data_type, m.unit, d.ingested_at
+        FROM column_mappings_legacy m JOIN donnees d ON d.data_id = m.data_id
+    """)
+    op.execute("DROP TABLE column_mappings_legacy")
+    op.execute("ALTER SEQUENCE column_mappings_mapping_id_seq OWNED BY column_mappings.mapping_id")
+
+    # Contraintes et index déclarés sur la table mère : créés sur chaque partition
+    op.execute("ALTER TABLE column_mappings ADD CONSTRAINT column_mappings_pkey PRIMARY KEY (mapping_id, ingested_at)")
+    op.execute("ALTER TABLE column_mappings ADD CONSTRAINT column_mappings_data_id_fkey "
+               "FOREIGN KEY (data_id) REFERENCES donnees (data_id)")
+    op.execute("CREATE INDEX ix_column_mappings_data_id ON column_mappings (data_id, ingested_at)")
+
+
+def _upgrade_other():
+    # Valeur fixée côté Python : même format que les paramètres de SQLAlchemy
+    # (les DateTime SQLite sont comparés comme du texte)
+    now = sa.bindparam("now", utcnow(), type_=sa.DateTime())
+    for table in ("donnees", "column_mappings"):
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column("ingested_at", sa.DateTime(), nullable=True))
+    op.get_bind().execute(sa.text("UPDATE donnees SET ingested_at = :now").bindparams(now))
+    op.execute("""
+        UPDATE column_mappings SET ingested_at = (
+            SELECT d.ingested_at FROM donnees d WHERE d.data_id = column_mappings.data_id
+        )
+    """)
+    for table in ("donnees", "column_mappings"):
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column("ingested_at", existing_type=sa.DateTime(), nullable=False)
+    op.create_index("ix_donnees_ingested_at", "donnees", ["ingested_at"])
+
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        _upgrade_postgresql(conn)
+    else:
+        _upgrade_other()
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        op.execute("ALTER SEQUENCE column_mappings_mapping_id_seq OWNED BY NONE")
+        op.execute("""
+            CREATE TABLE column_mappings_plain (
+                mapping_id integer NOT NULL DEFAULT nextval('column_mappings_mapping_id_seq'),
+                data_id integer NOT NULL,
+                column_name varchar NOT NULL,
+                column_description varchar,
+                data_type varchar NOT NULL,
+                unit varchar
+            )
+        """)
+        op.execute(f"INSERT INTO column_mappings_plain ({MAPPING_COLUMNS}) "
+                   f"SELECT {MAPPING_COLUMNS} FROM column_mappings")
+        op.execute("DROP TABLE column_mappings")
+        op.execute("ALTER TABLE column_mappings_plain RENAME TO column_mappings")
+        op.execute("ALTER SEQUENCE column_mappings_mapping_id_seq OWNED BY column_mappings.mapping_id")
+        op.execute("ALTER TABLE column_mappings ADD CONSTRAINT column_mappings_pkey PRIMARY KEY (mapping_id)")
+        op.execute("ALTER TABLE column_mappings ADD CONSTRAINT column_mappings_data_id_fkey "
+                   "FOREIGN KEY (data_id) REFERENCES donnees (data_id)")
+        op.create_index("ix_column_mappings_mapping_id", "column_mappings", ["mapping_id"])
+        op.create_index("ix_column_mappings_data_id", "column_mappings", ["data_id"])
+        op.drop_index("ix_donnees_ingested_at", table_name="donnees")
+        op.drop_column("donnees", "ingested_at")
+        return
+
+    op.drop_index("ix_donnees_ingested_at", table_name="donnees")
+    for table in ("column_mappings", "donnees"):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("ingested_at")
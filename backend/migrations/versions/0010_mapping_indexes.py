@@ -0,0 +1,35 @@
+"""Index de column_mappings identiques sur toutes les bases
+
+La migration 0009 a recréé column_mappings sur PostgreSQL avec l'index
+(data_id, ingested_at) et sans index séparé sur mapping_id (tête de la clé
+primaire). Les autres bases (SQLite) gardaient les index de 0001 et 0002 :
+elles sont alignées ici, pour que les modèles décrivent un seul schéma
+(alembic check sans écart).
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        return
+    op.drop_index("ix_column_mappings_mapping_id", table_name="column_mappings")
+    op.drop_index("ix_column_mappings_data_id", table_name="column_mappings")
+    op.create_index("ix_column_mappings_data_id", "column_mappings", ["data_id", "ingested_at"])
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        return
+    op.drop_index("ix_column_mappings_data_id", table_name="column_mappings")
+    op.create_index("ix_column_mappings_data_id", "column_mappings", ["data_id"])
+    op.create_index("ix_column_mappings_mapping_id", "column_mappings", ["mapping_id"])
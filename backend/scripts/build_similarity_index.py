@@ -0,0 +1,52 @@
+"""
+Construction des index de recherche de courbes similaires (POST /donnees/similar).
+
+Un index IVF par type de donnée est construit à partir de donnee_vectors et
+publié dans SIMILARITY_INDEX_DIR ; les workers de l'API le rechargent sans
+redémarrage. Les données ajoutées entre deux constructions restent
+trouvables (parcours exhaustif de la "queue") : relancer périodiquement
+(cron) pour garder cette queue courte.
+
+Usage :
+    cd backend
+    python scripts/build_similarity_index.py [--data-type pdd] [--lists 256]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+
+from app.database import engine
+from app.models.donnee import Donnee
+from app.models.donnee_vector import DonneeVector
+from app.services.similarity import SIMILARITY_INDEX_DIR, build_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construction des index de courbes similaires")
+    parser.add_argument("--data-type", action="append", help="type de donnée (défaut : tous)")
+    parser.add_argument("--lists", type=int, help="nombre de listes IVF (défaut : ~racine du nombre de vecteurs)")
+    parser.add_argument("--iterations", type=int, default=10, help="itérations du k-means")
+    parser.add_argument("--index-dir", default=SIMILARITY_INDEX_DIR)
+    args = parser.parse_args()
+
+    data_types = args.data_type
+    if not data_types:
+        with engine.connect() as conn:
+            data_types = sorted(conn.execute(
+                select(Donnee.data_type).join(DonneeVector, DonneeVector.data_id == Donnee.data_id).distinct()
+            ).scalars())
+    os.makedirs(args.index_dir, exist_ok=True)
+    for data_type in data_types:
+        started = time.perf_counter()
+        stats = build_index(engine, data_type, args.index_dir, args.lists, args.iterations)
+        print(f"{data_type} : {stats} en {time.perf_counter() - started:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
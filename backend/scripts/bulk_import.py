@@ -0,0 +1,75 @@
+"""
+Import en masse d'un export (archive ou répertoire) dans la base DATABASE_URL.
+
+Le répertoire (ou l'archive zip/tar, extraite à côté) doit contenir un
+manifest.json au format de GET /articles/{id}/export. Relancer la même
+commande après une interruption reprend au dernier lot committé
+(checkpoint .import-checkpoint.json dans le répertoire source).
+
+Usage :
+    cd backend
+    python scripts/bulk_import.py chemin/vers/export.zip
+    python scripts/bulk_import.py chemin/vers/repertoire [--batch-size 200] [--workers 8]
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.cache import bump_generation
+from app.database import engine
+from app.services.bulk_import import (
+    IMPORT_BATCH_SIZE,
+    IMPORT_COPY_WORKERS,
+    ImportManifestError,
+    extract_archive,
+    import_directory,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import en masse d'un export")
+    parser.add_argument("source", help="répertoire contenant manifest.json, ou archive zip/tar")
+    parser.add_argument("--upload-dir", help="répertoire local de destination (défaut : STORAGE_BACKEND)")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="articles par transaction")
+    parser.add_argument("--workers", type=int, default=IMPORT_COPY_WORKERS, help="threads de copie")
+    parser.add_argument("--checkpoint", help="fichier de reprise (défaut : dans le répertoire source)")
+    args = parser.parse_args()
+
+    source_dir = args.source
+    if os.path.isfile(source_dir):
+        # Extraction à côté de l'archive : la reprise réutilise le même répertoire
+        source_dir = os.path.splitext(args.source)[0] + ".import"
+        if not os.path.isdir(source_dir):
+            partial_dir = source_dir + ".partial"
+            shutil.rmtree(partial_dir, ignore_errors=True)
+            os.makedirs(partial_dir)
+            extract_archive(args.source, partial_dir)
+            os.rename(partial_dir, source_dir)
+
+    started = time.perf_counter()
+    try:
+        stats = import_directory(
+            engine,
+            source_dir,
+            upload_dir=args.upload_dir,
+            checkpoint_path=args.checkpoint,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            log=print,
+        )
+    except ImportManifestError as e:
+        print(f"Erreur : {e}")
+        return 2
+    finally:
+        # Les réponses en cache de l'API ne reflètent plus la base
+        bump_generation()
+    print(f"Terminé en {time.perf_counter() - started:.1f} s : {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Dédoublonnage du catalogue d'équipements (machines, détecteurs, fantômes).
+
+Propose des fusions pour les entrées de même type dont le "fabricant modèle"
+normalisé est proche (similarité par trigrammes, pg_trgm sur PostgreSQL) ;
+avec --apply, les fusions sont appliquées dans une transaction par catalogue
+(liaisons reportées sur l'entrée la plus référencée, doublons supprimés).
+Prévu pour une exécution périodique (cron) : sans --apply, rien n'est modifié.
+
+Usage :
+    cd backend
+    python scripts/dedup_catalog.py [--catalog machines] [--threshold 0.6]
+    python scripts/dedup_catalog.py --apply
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.cache import bump_generation
+from app.database import engine
+from app.services.catalog import CATALOGS, DEFAULT_SIMILARITY_THRESHOLD, merge_entities, propose_merges
+
+
+def _labels(conn, catalog, ids):
+    columns = ", ".join(catalog.key_columns)
+    rows = conn.execute(
+        text(f"SELECT {catalog.id_column}, {columns} FROM {catalog.table} "
+             f"WHERE {catalog.id_column} IN ({', '.join(str(int(i)) for i in ids)})")
+    ).all()
+    return {row[0]: " / ".join(str(value) for value in row[1:] if value) for row in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dédoublonnage du catalogue d'équipements")
+    parser.add_argument("--catalog", choices=sorted(CATALOGS), action="append",
+                        help="catalogue à traiter (défaut : tous)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_SIMILARITY_THRESHOLD,
+                        help="similarité minimale (0-1)")
+    parser.add_argument("--apply", action="store_true", help="appliquer les fusions proposées")
+    args = parser.parse_args()
+
+    merged = 0
+    for name in args.catalog or sorted(CATALOGS):
+        catalog = CATALOGS[name]
+        with engine.begin() as conn:
+            proposals = propose_merges(conn, catalog, args.threshold)
+            print(f"{name} : {len(proposals)} groupe(s) de doublons probables")
+            if not proposals:
+                continue
+            labels = _labels(conn, catalog, {i for p in proposals for i in [p["keep"], *p["merge"]]})
+            for proposal in proposals:
+                print(f"  garder #{proposal['keep']} {labels.get(proposal['keep'])}")
+                for entity_id in proposal["merge"]:
+                    score = max(s for a, b, s in proposal["pairs"] if entity_id in (a, b))
+                    print(f"    <- #{entity_id} {labels.get(entity_id)} (similarité {score:.2f})")
+            if args.apply:
+                mapping = {entity_id: p["keep"] for p in proposals for entity_id in p["merge"]}
+                stats = merge_entities(conn, catalog, mapping)
+                merged += stats["entities_removed"]
+                print(f"  appliqué : {stats}")
+
+    if merged:
+        # Les réponses en cache de l'API ne reflètent plus la base
+        bump_generation()
+    if not args.apply:
+        print("Aucune modification (relancer avec --apply pour fusionner)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
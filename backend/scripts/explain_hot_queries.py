@@ -0,0 +1,150 @@
+"""
+Vérifie que les requêtes fréquentes de l'API utilisent un index.
+
+Chaque requête est passée à EXPLAIN sur la base DATABASE_URL (schéma à jour
+via `alembic upgrade head`). Le script échoue (code 1) si une requête retombe
+sur un parcours séquentiel de la table ciblée.
+
+- PostgreSQL : enable_seqscan est désactivé pour la transaction, de sorte que
+  le planificateur ne choisit un Seq Scan que si aucun index n'est utilisable
+  (le résultat ne dépend donc pas du volume de données).
+- SQLite : EXPLAIN QUERY PLAN, un "SCAN <table>" sans index est un échec.
+
+Usage :
+    cd backend
+    python scripts/explain_hot_queries.py
+"""
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, text
+
+from app.database import engine
+from app.models.article import Article
+from app.models.column_mapping import ColumnMapping
+from app.models.detector import Detector
+from app.models.donnee import Donnee
+from app.models.donnee_features import DonneeFeatures
+from app.models.experience import Experience
+from app.models.experience_detector import ExperienceDetector
+from app.models.experience_machine import ExperienceMachine
+from app.models.experience_phantom import ExperiencePhantom
+from app.models.machine import Machine
+from app.models.phantom import Phantom
+
+
+# (nom, table qui ne doit pas être parcourue séquentiellement, requête)
+HOT_QUERIES = [
+    ("article par DOI", "articles",
+     select(Article).where(Article.doi == "10.0000/x")),
+    ("expériences d'un article", "experiences",
+     select(Experience).where(Experience.article_id == 1)),
+    ("données d'une expérience", "donnees",
+     select(Donnee).where(Donnee.experience_id == 1)),
+    ("colonnes d'une donnée", "column_mappings",
+     select(ColumnMapping).where(ColumnMapping.data_id == 1, ColumnMapping.ingested_at == datetime(2026, 1, 1))),
+    ("expériences utilisant une machine", "experience_machine",
+     select(ExperienceMachine).where(ExperienceMachine.machine_id == 1)),
+    ("expériences utilisant un détecteur", "experience_detecteur",
+     select(ExperienceDetector).where(ExperienceDetector.detector_id == 1)),
+    ("expériences utilisant un fantôme", "experience_phantom",
+     select(ExperiencePhantom).where(ExperiencePhantom.phantom_id == 1)),
+    ("liaisons machine par plage d'énergie", "experience_machine",
+     select(ExperienceMachine.experience_id).where(
+         ExperienceMachine.energy_unit == "MV",
+         ExperienceMachine.energy_min <= 10,
+         ExperienceMachine.energy_max >= 6,
+     )),
+    ("liaisons détecteur par profondeur", "experience_detecteur",
+     select(ExperienceDetector.experience_id).where(ExperienceDetector.depth_min_mm <= 50)),
+    ("données par pénombre", "donnee_features",
+     select(DonneeFeatures.data_id).where(DonneeFeatures.penumbra_mm <= 4)),
+    ("données par d_max", "donnee_features",
+     select(DonneeFeatures.data_id).where(DonneeFeatures.dmax_mm >= 10, DonneeFeatures.dmax_mm <= 20)),
+    ("fabricants de machines par type", "machines",
+     select(Machine.constructeur).where(Machine.type_machine == "Linac").distinct()),
+    ("modèles de machines par type et fabricant", "machines",
+     select(Machine.modele).where(
+         Machine.type_machine == "Linac", Machine.constructeur == "Varian"
+     ).distinct()),
+    ("get_or_create_machine", "machines",
+     select(Machine).where(Machine.match_key == "linac|varian|truebeam").limit(1)),
+    ("fabricants de détecteurs par type", "detecteurs",
+     select(Detector.constructeur).where(Detector.type_detecteur == "Ion Chamber").distinct()),
+    ("get_or_create_detector", "detecteurs",
+     select(Detector).where(Detector.match_key == "ionchamber|ptw|ptw31010").limit(1)),
+    ("modèles de fantômes par type", "phantoms",
+     select(Phantom.model).where(Phantom.phantom_type == "homogeneous").distinct()),
+    ("dimensions de fantômes", "phantoms",
+     select(Phantom.dimensions).where(
+         Phantom.phantom_type == "homogeneous",
+         Phantom.manufacturer == "IAEA",
+         Phantom.model == "Water Phantom",
+     ).distinct()),
+    ("get_or_create_phantom", "phantoms",
+     select(Phantom).where(Phantom.match_key == "homogeneous|iaea|waterphantom").limit(1)),
+]
+
+
+def _compile(conn, stmt):
+    return str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def _postgres_seq_scans(plan):
+    """Retourne les tables parcourues séquentiellement dans un plan JSON."""
+    tables = []
+    if plan.get("Node Type") == "Seq Scan":
+        tables.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        tables.extend(_postgres_seq_scans(child))
+    return tables
+
+
+def explain_postgres(conn, stmt):
+    conn.execute(text("SET LOCAL enable_seqscan = off"))
+    raw = conn.execute(text("EXPLAIN (FORMAT JSON) " + _compile(conn, stmt))).scalar()
+    plan = raw if isinstance(raw, list) else json.loads(raw)
+    return _postgres_seq_scans(plan[0]["Plan"]), json.dumps(plan[0]["Plan"], indent=2)
+
+
+def explain_sqlite(conn, stmt):
+    rows = conn.execute(text("EXPLAIN QUERY PLAN " + _compile(conn, stmt))).fetchall()
+    details = [row[-1] for row in rows]
+    scans = [
+        d.split()[1] for d in details
+        if d.startswith("SCAN ") and " USING " not in d
+    ]
+    return scans, "\n".join(details)
+
+
+def main():
+    explain = {
+        "postgresql": explain_postgres,
+        "sqlite": explain_sqlite,
+    }.get(engine.dialect.name)
+    if explain is None:
+        print(f"Dialecte non supporté : {engine.dialect.name}")
+        return 2
+
+    failures = 0
+    with engine.connect() as conn:
+        for name, table, stmt in HOT_QUERIES:
+            with conn.begin():
+                scanned, plan = explain(conn, stmt)
+            if table in scanned:
+                failures += 1
+                print(f"FAIL  {name} : parcours séquentiel de {table}")
+                print(plan)
+            else:
+                print(f"ok    {name}")
+
+    print(f"\n{len(HOT_QUERIES) - failures}/{len(HOT_QUERIES)} requêtes indexées")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Calcul des grandeurs dosimétriques (table donnee_features) des données existantes.
+
+Traite les données sans grandeurs, ou calculées par une version antérieure
+de l'extracteur (app/services/features.py), par lots committés : une
+interruption ne perd que le lot en cours, relancer reprend où le calcul
+s'est arrêté. Les uploads de l'API sont traités automatiquement ; ce script
+sert après la migration 0005, un import en masse par la ligne de commande
+ou un changement de FEATURES_VERSION.
+
+Usage :
+    cd backend
+    python scripts/extract_features.py [--workers 4] [--data-type profile]
+    python scripts/extract_features.py --recompute
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.services.features import extract_pending
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcul des grandeurs dosimétriques des données")
+    parser.add_argument("--chunk-size", type=int, default=500, help="données par transaction")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processus de calcul")
+    parser.add_argument("--data-type", help="limiter à un type de donnée (pdd, profile...)")
+    parser.add_argument("--recompute", action="store_true", help="recalculer toutes les données")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            totals = extract_pending(engine, args.chunk_size, pool, args.recompute, args.data_type, log=print)
+    else:
+        totals = extract_pending(engine, args.chunk_size, None, args.recompute, args.data_type, log=print)
+    print(f"Terminé en {time.perf_counter() - started:.1f} s : {totals or 'rien à calculer'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
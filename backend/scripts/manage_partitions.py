@@ -0,0 +1,80 @@
+"""
+Maintenance des partitions mensuelles de column_mappings (PostgreSQL).
+
+- ensure : crée les partitions du mois courant et des
+  PARTITION_PREMAKE_MONTHS suivants (tâche mensuelle : les insertions ne
+  tombent jamais dans la partition par défaut) ;
+- archive : fige (VACUUM FREEZE) puis déplace vers un tablespace moins cher
+  (ARCHIVE_TABLESPACE ou --tablespace, créé au préalable par
+  l'administrateur : CREATE TABLESPACE archive LOCATION '/mnt/archive')
+  les partitions terminées depuis plus de PARTITION_ARCHIVE_AFTER_MONTHS
+  mois ; elles restent attachées et lisibles ;
+- list : partitions, lignes (estimation), taille avec index et tablespace.
+
+Usage :
+    cd backend
+    python scripts/manage_partitions.py ensure
+    python scripts/manage_partitions.py archive --tablespace archive --after-months 12
+    python scripts/manage_partitions.py list
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.services.partitions import (
+    ARCHIVE_TABLESPACE,
+    PARTITION_ARCHIVE_AFTER_MONTHS,
+    PARTITION_PREMAKE_MONTHS,
+    archive_partition,
+    cold_partitions,
+    ensure_partitions,
+    is_partitioned,
+    list_partitions,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure", help="Créer les partitions à venir")
+    ensure.add_argument("--ahead", type=int, default=PARTITION_PREMAKE_MONTHS, help="Mois créés d'avance")
+    archive = commands.add_parser("archive", help="Déplacer les partitions froides")
+    archive.add_argument("--tablespace", default=ARCHIVE_TABLESPACE, help="Tablespace d'archive")
+    archive.add_argument("--after-months", type=int, default=PARTITION_ARCHIVE_AFTER_MONTHS,
+                         help="Âge (mois) à partir duquel une partition est archivée")
+    archive.add_argument("--dry-run", action="store_true", help="Afficher les partitions sans les déplacer")
+    commands.add_parser("list", help="Lister les partitions")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            print("column_mappings n'est pas partitionnée (PostgreSQL et migration 0009 requis)")
+            return 0
+
+    if args.command == "ensure":
+        with engine.begin() as conn:
+            created = ensure_partitions(conn, ahead=args.ahead)
+        print(f"{len(created)} partition(s) créée(s)" + (f" : {', '.join(created)}" if created else ""))
+    elif args.command == "archive":
+        if not args.tablespace:
+            parser.error("--tablespace ou ARCHIVE_TABLESPACE requis")
+        with engine.connect() as conn:
+            cold = cold_partitions(conn, args.tablespace, after_months=args.after_months)
+        for partition in cold:
+            print(f"{partition['name']} ({partition['bytes'] / 2**20:.1f} Mio) -> {args.tablespace}")
+            if not args.dry_run:
+                archive_partition(engine, partition["name"], args.tablespace)
+        print(f"{len(cold)} partition(s) {'à archiver' if args.dry_run else 'archivée(s)'}")
+    else:
+        with engine.connect() as conn:
+            for partition in list_partitions(conn):
+                print(f"{partition['name']:<32} {partition['rows']:>12} lignes "
+                      f"{partition['bytes'] / 2**20:>10.1f} Mio  {partition['tablespace']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Applique les migrations Alembic avant le démarrage des workers (CMD du
+Dockerfile).
+
+Une base créée avant l'introduction des migrations (tables de l'ancien
+create_all, sans table alembic_version) est d'abord marquée à la révision
+0001, le schéma initial : sans cela, `alembic upgrade head` échoue sur
+CREATE TABLE articles et le conteneur redémarre en boucle.
+
+Usage :
+    cd backend
+    python scripts/migrate.py
+"""
+import logging
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from app.database import engine
+
+BASELINE_REVISION = "0001"
+
+logger = logging.getLogger("migrate")
+
+
+def needs_baseline_stamp(conn) -> bool:
+    """Schéma déjà peuplé (articles) mais jamais versionné par Alembic."""
+    tables = set(inspect(conn).get_table_names())
+    return "articles" in tables and "alembic_version" not in tables
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(levelname)-5.5s [%(name)s] %(message)s")
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+
+    with engine.connect() as conn:
+        stamp = needs_baseline_stamp(conn)
+    if stamp:
+        logger.info("Existing schema without alembic_version: stamping revision %s", BASELINE_REVISION)
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
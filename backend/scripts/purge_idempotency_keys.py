@@ -0,0 +1,28 @@
+"""
+Purge des clés d'idempotence expirées (plus de IDEMPOTENCY_TTL_HOURS heures).
+
+Prévu pour une exécution périodique (cron) ; sans purge, une clé expirée
+est supprimée au premier renvoi qui la réutilise.
+
+Usage :
+    cd backend
+    python scripts/purge_idempotency_keys.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.services.idempotency import IDEMPOTENCY_TTL_HOURS, purge_expired
+
+
+def main():
+    with SessionLocal() as db:
+        removed = purge_expired(db)
+    print(f"{removed} clé(s) d'idempotence de plus de {IDEMPOTENCY_TTL_HOURS:g} h supprimée(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Configuration commune des tests : base SQLite temporaire migrée par Alembic
+(alembic upgrade head, comme en production), stockage local et cache dans
+un répertoire temporaire.
+
+Les variables d'environnement sont fixées avant tout import de app : les
+modules lisent leur configuration à l'import.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIR = tempfile.mkdtemp(prefix="rdh-tests-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{TEST_DIR}/test.db",
+    "UPLOAD_DIR": os.path.join(TEST_DIR, "uploads"),
+    "CACHE_DIR": os.path.join(TEST_DIR, "cache"),
+    "STORAGE_BACKEND": "local",
+    "ENERGY_VALIDATION": "off",
+    "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+})
+os.environ.pop("READ_REPLICA_URLS", None)
+os.makedirs(os.environ["UPLOAD_DIR"], exist_ok=True)
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    command.upgrade(config, "head")
+    yield
+    from app.database import engine
+    engine.dispose()
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def db():
+    from app.database import SessionLocal
+
+    with SessionLocal() as session:
+        yield session
@@ -0,0 +1,59 @@
+"""Invalidation du cache des réponses par les écritures (app/cache.py)."""
+import asyncio
+
+import pytest
+
+from app.cache import ResponseCacheMiddleware, generation
+
+
+def _scope(method, path):
+    return {"type": "http", "method": method, "path": path, "query_string": b"", "headers": []}
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+def test_write_bumps_generation_before_response_is_sent():
+    """Le client qui relit juste après son 201 ne doit pas recevoir d'entrée antérieure."""
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["during_call"] = generation.current()
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+        # BackgroundTasks : s'exécutent après l'envoi de la réponse
+        await asyncio.sleep(0)
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            seen["at_response"] = generation.current()
+
+    before = generation.current()
+    asyncio.run(ResponseCacheMiddleware(app)(_scope("POST", "/articles/"), _receive, send))
+    assert seen["during_call"] > before
+    assert seen["at_response"] > seen["during_call"]
+    assert generation.current() == seen["at_response"]
+
+
+def test_failed_write_still_bumps_generation():
+    async def app(scope, receive, send):
+        before_error["value"] = generation.current()
+        raise RuntimeError("boom")
+
+    async def send(message):
+        pass
+
+    before_error = {}
+    with pytest.raises(RuntimeError):
+        asyncio.run(ResponseCacheMiddleware(app)(_scope("DELETE", "/articles/1"), _receive, send))
+    assert generation.current() > before_error["value"]
+
+
+def test_get_after_write_reflects_the_write(client):
+    assert client.get("/machines/").status_code == 200
+    created = client.post("/machines/", json={"constructeur": "Elekta", "modele": "Versa HD",
+                                              "type_machine": "linac"})
+    assert created.status_code in (200, 201), created.text
+    listed = client.get("/machines/").json()
+    assert any(machine["machine_id"] == created.json()["machine_id"] for machine in listed)
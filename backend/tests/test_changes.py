@@ -0,0 +1,78 @@
+"""Lecture du journal des changements et trous de numérotation (app/services/changes.py)."""
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import delete
+
+from app.models.change_log import ChangeLog
+from app.services.changes import CHANGES_GAP_SECONDS, latest_change_id, read_changes, utcnow
+
+
+@pytest.fixture
+def log(db):
+    """Insère des lignes d'identifiants choisis après le dernier existant ; les retire ensuite."""
+    base = latest_change_id(db) + 100
+    inserted = []
+
+    def insert(offsets, age_seconds=0.0):
+        created_at = utcnow() - timedelta(seconds=age_seconds)
+        for offset in offsets:
+            db.add(ChangeLog(change_id=base + offset, created_at=created_at, entity="article",
+                             action="created", entity_id=offset, article_id=offset))
+            inserted.append(base + offset)
+        db.commit()
+        return base
+
+    yield insert
+    db.execute(delete(ChangeLog).where(ChangeLog.change_id.in_(inserted)))
+    db.commit()
+
+
+def test_contiguous_rows_are_read(db, log):
+    base = log([1, 2, 3])
+    rows, cursor, more = read_changes(db, base)
+    assert [row["change_id"] for row in rows] == [base + 1, base + 2, base + 3]
+    assert cursor == base + 3
+    assert more is False
+    assert rows[0]["created_at"].endswith("Z")
+
+
+def test_recent_gap_holds_back_later_rows(db, log):
+    # Identifiant base + 3 attribué mais pas encore committé : on s'arrête avant
+    base = log([1, 2, 4])
+    rows, cursor, more = read_changes(db, base)
+    assert [row["change_id"] for row in rows] == [base + 1, base + 2]
+    assert cursor == base + 2
+    assert more is True
+
+
+def test_gap_at_cursor_holds_back_everything(db, log):
+    base = log([2, 3])
+    rows, cursor, more = read_changes(db, base)
+    assert rows == []
+    assert cursor == base
+    assert more is True
+
+
+def test_old_gap_is_a_rolled_back_transaction(db, log):
+    base = log([1, 2, 4], age_seconds=CHANGES_GAP_SECONDS + 1)
+    rows, cursor, more = read_changes(db, base)
+    assert [row["change_id"] for row in rows] == [base + 1, base + 2, base + 4]
+    assert cursor == base + 4
+    assert more is False
+
+
+def test_limit_reports_more(db, log):
+    base = log([1, 2, 3])
+    rows, cursor, more = read_changes(db, base, limit=2)
+    assert cursor == base + 2
+    assert more is True
+
+
+def test_changes_endpoint_pages_with_cursor(client, db, log):
+    base = log([1, 2, 3])
+    page = client.get("/changes/", params={"since": base, "limit": 2}).json()
+    assert [row["change_id"] for row in page["changes"]] == [base + 1, base + 2]
+    assert page["has_more"] is True
+    page = client.get("/changes/", params={"since": page["next"]}).json()
+    assert [row["change_id"] for row in page["changes"]] == [base + 3]
@@ -0,0 +1,31 @@
+"""Envoi de fichiers de données par l'API (app/routes/donnees.py)."""
+import pytest
+
+from app.storage import storage
+
+
+@pytest.fixture
+def experience_id(client):
+    response = client.post("/experiences/", json={"description": "Profils de dose"})
+    assert response.status_code == 201, response.text
+    return response.json()["experience_id"]
+
+
+def _upload(client, experience_id, content):
+    response = client.post(
+        f"/donnees/upload/{experience_id}",
+        files={"file": ("profile.csv", content, "text/csv")},
+        data={"data_type": "raw"},
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_same_filename_does_not_overwrite_previous_upload(client, experience_id):
+    first = _upload(client, experience_id, b"depth,dose\n0,100\n")
+    second = _upload(client, experience_id, b"depth,dose\n0,50\n")
+    assert first["file_path"] != second["file_path"]
+    with storage.open(first["file_path"]) as f:
+        assert f.read() == b"depth,dose\n0,100\n"
+    with storage.open(second["file_path"]) as f:
+        assert f.read() == b"depth,dose\n0,50\n"
@@ -0,0 +1,43 @@
+"""Rejeu des soumissions complètes avec Idempotency-Key (app/services/idempotency.py)."""
+import uuid
+
+from app.models.article import Article
+from app.services.idempotency import REPLAYED_HEADER
+
+SUBMISSION = {
+    "title": "Idempotence", "authors": "Test", "experience_description": "PDD 6 MV",
+    "machines": "[]", "detectors": "[]", "phantoms": "[]", "data_type": "pdd",
+}
+CSV = b"depth,dose\n0,50\n10,100\n20,80\n"
+
+
+def _submit(client, key, **fields):
+    return client.post(
+        "/complete/submit",
+        data={**SUBMISSION, **fields},
+        files={"file": ("pdd.csv", CSV)},
+        headers={"Idempotency-Key": key},
+    )
+
+
+def test_same_key_replays_original_response(client, db):
+    key = str(uuid.uuid4())
+    first = _submit(client, key)
+    assert first.status_code == 201
+    assert REPLAYED_HEADER.lower() not in first.headers
+
+    second = _submit(client, key)
+    assert second.status_code == 201
+    assert second.headers[REPLAYED_HEADER.lower()] == "true"
+    assert second.json() == first.json()
+    assert db.query(Article).filter(Article.titre == SUBMISSION["title"]).count() == 1
+
+
+def test_same_key_different_request_is_rejected(client):
+    key = str(uuid.uuid4())
+    assert _submit(client, key, title="Première").status_code == 201
+    assert _submit(client, key, title="Seconde").status_code == 422
+
+
+def test_invalid_key_is_rejected(client):
+    assert _submit(client, "k" * 256).status_code == 400
@@ -0,0 +1,14 @@
+"""Les requêtes fréquentes utilisent un index (scripts/explain_hot_queries.py)."""
+import pytest
+
+from scripts.explain_hot_queries import HOT_QUERIES, explain_postgres, explain_sqlite
+
+
+@pytest.mark.parametrize("name,table,stmt", HOT_QUERIES, ids=[name for name, _, _ in HOT_QUERIES])
+def test_hot_query_uses_index(name, table, stmt):
+    from app.database import engine
+
+    explain = explain_postgres if engine.dialect.name == "postgresql" else explain_sqlite
+    with engine.connect() as conn, conn.begin():
+        scanned, plan = explain(conn, stmt)
+    assert table not in scanned, f"{name} : parcours séquentiel de {table}\n{plan}"
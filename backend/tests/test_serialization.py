@@ -0,0 +1,50 @@
+"""Encodage JSON des réponses, avec orjson et avec le repli json (app/serialization.py)."""
+import json
+from datetime import date, datetime, timezone
+from uuid import UUID
+
+import pytest
+
+from app import serialization
+
+ROW = {
+    "data_id": 1,
+    "file_path": "uploads/1_a1b2_profil.csv",
+    "description": "Profil à 10 cm",
+    "ingested_at": datetime(2024, 3, 5, 14, 30, 12, 250000),
+    "created_at": datetime(2024, 3, 5, 14, 30, tzinfo=timezone.utc),
+    "acquired_on": date(2024, 3, 4),
+    "token": UUID("12345678-1234-5678-1234-567812345678"),
+    "dose": 1.5,
+}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+def test_row_with_datetime_is_encoded(encoder):
+    decoded = json.loads(serialization.dumps([ROW]))
+    assert decoded == [{
+        "data_id": 1,
+        "file_path": "uploads/1_a1b2_profil.csv",
+        "description": "Profil à 10 cm",
+        "ingested_at": "2024-03-05T14:30:12.250000",
+        "created_at": "2024-03-05T14:30:00+00:00",
+        "acquired_on": "2024-03-04",
+        "token": "12345678-1234-5678-1234-567812345678",
+        "dose": 1.5,
+    }]
+
+
+def test_both_encoders_give_the_same_bytes(monkeypatch):
+    orjson = pytest.importorskip("orjson")
+    encoded = serialization.dumps([ROW])
+    assert encoded == orjson.dumps([ROW])
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert serialization.dumps([ROW]) == encoded
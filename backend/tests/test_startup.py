@@ -0,0 +1,21 @@
+"""Démarrage à froid d'un worker dans le budget, sans connexion à la base (scripts/profile_startup.py)."""
+import os
+import statistics
+
+from scripts.profile_startup import STARTUP_BUDGET_SECONDS, UNREACHABLE_DATABASE_URL, parse_importtime, run_once
+
+RUNS = 3
+
+
+def test_cold_start_within_budget():
+    # Base injoignable : un démarrage qui se connecte ou exécute du DDL échoue
+    env = dict(os.environ, DATABASE_URL=UNREACHABLE_DATABASE_URL, PYTHONDONTWRITEBYTECODE="1")
+    timings = []
+    for _ in range(RUNS):
+        elapsed, stderr = run_once(env)
+        timings.append(elapsed)
+    assert any(name == "app.main" for name, _, _ in parse_importtime(stderr))
+    median = statistics.median(timings)
+    assert median <= STARTUP_BUDGET_SECONDS, (
+        f"Démarrage à froid {median:.3f} s > budget {STARTUP_BUDGET_SECONDS:.3f} s"
+    )
@@ -0,0 +1,41 @@
+"""Cache des résumés d'expériences et sessions de réplique (app/services/summaries.py)."""
+import pytest
+from sqlalchemy import create_engine
+
+from app.cache import generation
+from app.database import DATABASE_URL, SessionLocal
+from app.services.summaries import build_summaries, summary_cache
+
+
+@pytest.fixture
+def experience_id(client):
+    response = client.post("/experiences/", json={"description": "Rendement en profondeur"})
+    assert response.status_code == 201, response.text
+    return response.json()["experience_id"]
+
+
+@pytest.fixture
+def replica_db():
+    """Session liée à un autre moteur que le primaire, comme get_read_db pour une réplique."""
+    replica_engine = create_engine(DATABASE_URL)
+    with SessionLocal(bind=replica_engine) as session:
+        yield session
+    replica_engine.dispose()
+
+
+def test_primary_session_fills_the_cache(db, experience_id):
+    summary = build_summaries(db, [experience_id])[experience_id]
+    assert summary["description"] == "Rendement en profondeur"
+    assert summary_cache.get_many([experience_id], generation.current()) == {experience_id: summary}
+
+
+def test_replica_session_does_not_fill_the_cache(replica_db, experience_id):
+    assert experience_id in build_summaries(replica_db, [experience_id])
+    assert summary_cache.get_many([experience_id], generation.current()) == {}
+
+
+def test_replica_session_does_not_read_the_cache(replica_db, experience_id):
+    stale = {"experience_id": experience_id, "description": "état périmé"}
+    summary_cache.set_many({experience_id: stale}, generation.current())
+    summary = build_summaries(replica_db, [experience_id])[experience_id]
+    assert summary["description"] == "Rendement en profondeur"
@@ -0,0 +1,69 @@
+"""Lecture des paramètres saisis en texte libre (app/services/units.py)."""
+import pytest
+
+from app.services.units import parse_energy, parse_field_size_cm2, parse_length_mm
+
+
+@pytest.mark.parametrize("text, machine_type, expected", [
+    ("6 MV", None, (6.0, 6.0, "MV")),
+    ("6, 10, 15 MV", None, (6.0, 15.0, "MV")),
+    ("9 MeV", None, (9.0, 9.0, "MeV")),
+    ("6X", None, (6.0, 6.0, "MV")),
+    ("12E", None, (12.0, 12.0, "MeV")),
+    ("6 FFF", None, (6.0, 6.0, "MV")),
+    ("120 kV", None, (0.12, 0.12, "MV")),
+    ("6 MV photons", None, (6.0, 6.0, "MV")),
+    ("6.5", "linac", (6.5, 6.5, "MV")),
+    ("230", "proton", (230.0, 230.0, "MeV")),
+    ("6 MV, 9 MeV", None, None),
+    ("dmax", None, None),
+    ("X-jaw", None, None),
+    ("", None, None),
+    # Étiquettes d'isotope : pas des énergies
+    ("60Co", None, None),
+    ("60Co", "cobalt", None),
+    ("Co-60", "cobalt", None),
+    ("Co-60", "linac", None),
+    ("60-Co", "cobalt", None),
+    ("Ir-192", None, None),
+    ("Co-60, 1.25 MeV", "cobalt", (1.25, 1.25, "MeV")),
+    # Mot inconnu après un nombre : illisible plutôt que deviné
+    ("15MU", None, None),
+    ("6 MV, 100 MU", None, None),
+])
+def test_parse_energy(text, machine_type, expected):
+    assert parse_energy(text, machine_type) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("10x10", 100.0),
+    ("10 x 10 cm", 100.0),
+    ("100x100 mm", 100.0),
+    ("5 cm", 25.0),
+    ("open", None),
+])
+def test_parse_field_size_cm2(text, expected):
+    assert parse_field_size_cm2(text) == expected
+
+
+@pytest.mark.parametrize("text, default_unit, expected", [
+    ("10 cm", "cm", (100.0, 100.0)),
+    ("5, 10 mm", "cm", (5.0, 10.0)),
+    ("15", "cm", (150.0, 150.0)),
+    ("15", "mm", (15.0, 15.0)),
+    ("dmax", "cm", None),
+    ("X-jaw", "cm", None),
+    # Intervalles : pas de nombre négatif
+    ("0-300 mm", "cm", (0.0, 300.0)),
+    ("0–300 mm", "cm", (0.0, 300.0)),
+    ("0 - 30", "cm", (0.0, 300.0)),
+    ("1.5-2.5 cm", "mm", (15.0, 25.0)),
+    # Signe moins en début de texte ou après une espace ou une virgule
+    ("-5 cm", "cm", (-50.0, -50.0)),
+    ("-5, -10 mm", "cm", (-10.0, -5.0)),
+    ("x -5 cm", "cm", (-50.0, -50.0)),
+    ("-10-10 mm", "cm", (-10.0, 10.0)),
+    ("X-5 cm", "cm", (50.0, 50.0)),
+])
+def test_parse_length_mm(text, default_unit, expected):
+    assert parse_length_mm(text, default_unit) == expected
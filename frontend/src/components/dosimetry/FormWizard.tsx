@@ -202,6 +202,7 @@ export function FormWizard({ articleId, experienceId, draftMode = false, initial
             <ColumnMappingStep
               data={formData.data.columnMapping}
               fileName={formData.data.file?.name || null}
+              file={formData.data.file}
               onChange={(columnMapping) =>
                 updateFormData("data", { ...formData.data, columnMapping })
               }
@@ -262,6 +263,7 @@ export function FormWizard({ articleId, experienceId, draftMode = false, initial
             <ColumnMappingStep
               data={formData.data.columnMapping}
               fileName={formData.data.file?.name || null}
+              file={formData.data.file}
               onChange={(columnMapping) =>
                 updateFormData("data", { ...formData.data, columnMapping })
               }
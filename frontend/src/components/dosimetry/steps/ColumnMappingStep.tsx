@@ -1,4 +1,5 @@
-import { Plus, Trash2, FileSpreadsheet } from "lucide-react";
+import { useState } from "react";
+import { Plus, Trash2, FileSpreadsheet, Loader2, Wand2 } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Label } from "@/components/ui/label";
@@ -10,6 +11,7 @@ import {
   SelectValue,
 } from "@/components/ui/select";
 import { Textarea } from "@/components/ui/textarea";
+import { api } from "@/services/api";
 
 export interface ColumnMapping {
   name: string;
@@ -21,6 +23,7 @@ export interface ColumnMapping {
 interface ColumnMappingStepProps {
   data: ColumnMapping[];
   fileName: string | null;
+  file?: File | null;
   onChange: (data: ColumnMapping[]) => void;
 }
 
@@ -43,7 +46,25 @@ const commonUnits = [
   { value: "custom", label: "Custom..." },
 ];
 
-export function ColumnMappingStep({ data, fileName, onChange }: ColumnMappingStepProps) {
+export function ColumnMappingStep({ data, fileName, file, onChange }: ColumnMappingStepProps) {
+  const [detecting, setDetecting] = useState(false);
+  const [detectError, setDetectError] = useState<string | null>(null);
+
+  // Colonnes proposées à partir du début du fichier (POST /donnees/preview)
+  const detectColumns = async () => {
+    if (!file) return;
+    setDetecting(true);
+    setDetectError(null);
+    try {
+      const preview = await api.previewFile(file);
+      onChange(preview.suggested_mapping);
+    } catch (error) {
+      setDetectError(error instanceof Error ? error.message : "Could not read the file");
+    } finally {
+      setDetecting(false);
+    }
+  };
+
   const addColumn = () => {
     onChange([
       ...data,
@@ -81,8 +102,27 @@ export function ColumnMappingStep({ data, fileName, onChange }: ColumnMappingSte
         <div className="flex items-center gap-2 p-3 bg-muted/50 rounded-lg">
           <FileSpreadsheet className="h-5 w-5 text-primary" />
           <span className="text-sm font-medium">{fileName}</span>
+          {file && (
+            <Button
+              variant="outline"
+              size="sm"
+              className="ml-auto"
+              onClick={detectColumns}
+              disabled={detecting}
+            >
+              {detecting ? (
+                <Loader2 className="h-4 w-4 mr-2 animate-spin" />
+              ) : (
+                <Wand2 className="h-4 w-4 mr-2" />
+              )}
+              Detect columns
+            </Button>
+          )}
         </div>
       )}
+      {detectError && (
+        <p className="text-sm text-destructive">{detectError}</p>
+      )}
 
       {/* Info box */}
       <div className="bg-blue-50 dark:bg-blue-950/30 border border-blue-200 dark:border-blue-900 rounded-lg p-4">
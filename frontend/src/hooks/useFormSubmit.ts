@@ -100,8 +100,11 @@ export const useFormSubmit = () => {
       };
 
       console.log("📤 Submitting complete experiment to backend (atomic transaction)...");
+      // Même clé pour toutes les tentatives : une soumission déjà committée
+      // dont la réponse a été perdue est rejouée, pas dupliquée
+      const idempotencyKey = crypto.randomUUID();
       const result = await retryRequest(() =>
-        api.submitCompleteExperiment(submissionData)
+        api.submitCompleteExperiment(submissionData, idempotencyKey)
       );
 
       console.log("✅ Complete submission successful!");
@@ -208,8 +211,10 @@ export const useFormSubmit = () => {
       };
 
       console.log("📤 Submitting experience to backend...");
+      // Même clé pour toutes les tentatives (voir submitCompleteExperiment)
+      const idempotencyKey = crypto.randomUUID();
       const result = await retryRequest(() =>
-        api.submitExperienceToArticle(articleId, submissionData)
+        api.submitExperienceToArticle(articleId, submissionData, idempotencyKey)
       );
 
       console.log("✅ Experience submission successful!");
@@ -98,6 +98,30 @@ export interface DonneeResponse extends DonneeCreate {
   experience_id: number;
 }
 
+// Début du fichier envoyé à POST /donnees/preview (PREVIEW_BYTES côté backend)
+export const PREVIEW_BYTES = 64 * 1024;
+
+export interface FilePreview {
+  encoding: string;
+  delimiter: string;
+  has_header: boolean;
+  skip_lines: number;
+  sample_bytes: number;
+  complete: boolean;
+  rows_sampled: number;
+  columns: Array<{
+    index: number;
+    name: string;
+    dtype: ColumnMapping["dataType"];
+    unit: string;
+    header_unit: string | null;
+    min?: number;
+    max?: number;
+  }>;
+  suggested_mapping: ColumnMapping[];
+  rows: string[][];
+}
+
 export interface ColumnMapping {
   name: string;
   description: string;
@@ -126,8 +150,11 @@ async function handleResponse<T>(response: Response): Promise<T> {
     try {
       const errorData = await response.json();
       errorDetails = errorData;
-      if (errorData.detail) {
+      if (typeof errorData.detail === "string") {
         errorMessage = errorData.detail;
+      } else if (errorData.detail?.issues) {
+        // Énergies incompatibles avec le catalogue de référence des machines
+        errorMessage = errorData.detail.issues.map((issue: { reason: string }) => issue.reason).join("\n");
       } else if (errorData.message) {
         errorMessage = errorData.message;
       }
@@ -192,6 +219,16 @@ export const api = {
     return handleResponse<ExperienceResponse[]>(response);
   },
 
+  // Résumés de plusieurs expériences en une requête
+  async getExperimentSummaries(ids: number[]): Promise<{ summaries: any[]; missing: number[] }> {
+    const response = await fetch(`${API_BASE_URL}/experiences/summaries`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ ids }),
+    });
+    return handleResponse<{ summaries: any[]; missing: number[] }>(response);
+  },
+
   // Machines
   async createMachine(data: MachineCreate): Promise<MachineResponse> {
     const response = await fetch(`${API_BASE_URL}/machines/`, {
@@ -315,6 +352,16 @@ export const api = {
     return handleResponse<DonneeResponse>(response);
   },
 
+  // Aperçu du format et des colonnes : seul le début du fichier est envoyé
+  async previewFile(file: File): Promise<FilePreview> {
+    const response = await fetch(`${API_BASE_URL}/donnees/preview`, {
+      method: "POST",
+      headers: { "Content-Type": "application/octet-stream" },
+      body: file.slice(0, PREVIEW_BYTES),
+    });
+    return handleResponse<FilePreview>(response);
+  },
+
   // Complete submission - atomic transaction
   async submitCompleteExperiment(formData: {
     title: string;
@@ -328,7 +375,7 @@ export const api = {
     data_type: string;
     data_description?: string;
     columnMapping?: any[];
-  }): Promise<any> {
+  }, idempotencyKey?: string): Promise<any> {
     const data = new FormData();
     data.append("title", formData.title);
     data.append("authors", formData.authors);
@@ -346,6 +393,7 @@ export const api = {
 
     const response = await fetch(`${API_BASE_URL}/complete/submit`, {
       method: "POST",
+      headers: idempotencyKey ? { "Idempotency-Key": idempotencyKey } : undefined,
       body: data,
     });
     return handleResponse<any>(response);
@@ -361,7 +409,7 @@ export const api = {
     data_type: string;
     data_description?: string;
     columnMapping?: any[];
-  }): Promise<any> {
+  }, idempotencyKey?: string): Promise<any> {
     const data = new FormData();
     data.append("experience_description", formData.experience_description);
     data.append("machines", JSON.stringify(formData.machines));
@@ -376,6 +424,7 @@ export const api = {
 
     const response = await fetch(`${API_BASE_URL}/complete/submit-experience/${articleId}`, {
       method: "POST",
+      headers: idempotencyKey ? { "Idempotency-Key": idempotencyKey } : undefined,
       body: data,
     });
     return handleResponse<any>(response);